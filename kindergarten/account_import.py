@@ -0,0 +1,199 @@
+# Массовое создание учетных записей родителей и воспитателей по списку (обычно в сентябре, сотни родителей за раз).
+# Пароли генерируются случайные и хешируются в пуле процессов (password_hashing.py), пользователи, их роли,
+# профили Parent/Teacher и членство в саду записываются bulk-запросами. Пароли в открытом виде есть только
+# в листе учетных данных, который отдается администратору сразу после создания и нигде не сохраняется.
+import csv
+from django.contrib.auth.models import Group as AuthGroup, User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils.crypto import get_random_string
+from .models import KindergartenMember, Parent, Teacher
+from .normalization import normalize_fio, normalize_phone, normalize_text
+from .password_hashing import hash_passwords
+from .spreadsheets import ImportReport, read_table
+from .student_import import batched
+from .tenancy import tenant_atomic
+ACCOUNT_BATCH_SIZE = 500
+PASSWORD_LENGTH = 10
+# Без похожих символов (0/O, 1/l/I): пароль переписывают с бумаги
+PASSWORD_CHARS = 'abcdefghjkmnpqrstuvwxyzABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+HEADER_ALIASES = {
+    'fio': {'fio', 'full_name', 'фио', 'фио родителя', 'фио воспитателя'},
+    'role': {'role', 'роль'},
+    'phone': {'phone', 'телефон'},
+    'email': {'email', 'e-mail', 'почта', 'электронная почта'},
+    'username': {'username', 'login', 'логин'},
+}
+ROLE_VALUES = {
+    '': 'parent', 'родитель': 'parent', 'parent': 'parent',
+    'воспитатель': 'teacher', 'teacher': 'teacher',
+}
+# Роль: группа пользователей и подпись в листе учетных данных
+ROLES = {
+    'parent': ('Родители', 'Родитель'),
+    'teacher': ('Воспитатели', 'Воспитатель'),
+}
+def read_accounts(file, filename):
+    """Построчно читает список учетных записей из CSV или XLSX."""
+    return read_table(file, filename, HEADER_ALIASES, ['fio', 'phone'])
+class AccountReport(ImportReport):
+    def __init__(self, dry_run=False):
+        super().__init__(dry_run)
+        self.accounts_created = 0
+        self.profiles_created = 0
+        self.profiles_linked = 0
+        self.credentials = []
+    def credentials_csv_response(self, filename='accounts.csv'):
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        response.write('\ufeff')
+        self.write_credentials(response)
+        return response
+    def write_credentials(self, stream):
+        writer = csv.writer(stream, delimiter=';')
+        writer.writerow(['ФИО', 'Роль', 'Телефон', 'Логин', 'Пароль'])
+        writer.writerows(self.credentials)
+class AccountImporter:
+    """
+    Создает учетные записи по строкам списка: ФИО, телефон, роль (родитель или воспитатель), необязательно
+    почта и логин (по умолчанию - телефон цифрами). Учетная запись привязывается к существующему профилю
+    родителя (по телефону) или воспитателя (по ФИО), а если профиля нет - он создается.
+    Список применяется целиком: при любой ошибке ничего не создается, чтобы лист с паролями совпадал с файлом.
+    """
+    def run(self, records, dry_run=False):
+        report = AccountReport(dry_run)
+        accounts = self.collect(records, report)
+        self.check_usernames(accounts, report)
+        self.match_profiles(accounts, report)
+        report.errors.sort()
+        if report.errors:
+            return report
+        report.accounts_created = len(accounts)
+        report.profiles_linked = sum(1 for account in accounts if account['profile'] is not None)
+        report.profiles_created = report.accounts_created - report.profiles_linked
+        if dry_run:
+            return report
+        # Хешируем до начала транзакции: это самая долгая часть, а проверки выше идут по индексам
+        passwords = [get_random_string(PASSWORD_LENGTH, PASSWORD_CHARS) for _ in accounts]
+        hashes = hash_passwords(passwords)
+        try:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS), tenant_atomic():
+                self.save(accounts, hashes)
+        except IntegrityError:
+            raise ValidationError('Пока создавались учетные записи, логины или профили из списка изменились. Загрузите список еще раз')
+        report.credentials = [
+            (account['fio'], ROLES[account['role']][1], account['phone'], account['username'], password)
+            for account, password in zip(accounts, passwords)
+        ]
+        return report
+    def collect(self, records, report):
+        accounts = []
+        usernames = {}
+        profiles = {}
+        for line_number, record in records:
+            report.rows += 1
+            try:
+                account = self.parse_account(record)
+            except ValidationError as e:
+                report.add_error(line_number, e.messages[0])
+                continue
+            account['line'] = line_number
+            if account['username'] in usernames:
+                report.add_error(line_number, f'Логин {account["username"]} уже указан в строке {usernames[account["username"]]}')
+                continue
+            profile_key = (account['role'], account['phone_key'] if account['role'] == 'parent' else account['fio_key'])
+            if profile_key in profiles:
+                report.add_error(line_number, f'Этот человек уже указан в строке {profiles[profile_key]}')
+                continue
+            usernames[account['username']] = profiles[profile_key] = line_number
+            accounts.append(account)
+        return accounts
+    def check_usernames(self, accounts, report):
+        by_username = {account['username']: account for account in accounts}
+        for batch in batched(sorted(by_username)):
+            for username in User.objects.filter(username__in=batch).values_list('username', flat=True):
+                report.add_error(by_username[username]['line'], f'Логин {username} уже занят')
+    def match_profiles(self, accounts, report):
+        """Ищет существующие профили: родителей по Parent.phone_key, воспитателей по ФИО."""
+        parents = {account['phone_key']: account for account in accounts if account['role'] == 'parent'}
+        for batch in batched(sorted(parents)):
+            for pk, phone_key, fio, user_id in Parent.objects.filter(phone_key__in=batch).values_list(
+                'pk', 'phone_key', 'parent_fio', 'user_id'
+            ):
+                account = parents[phone_key]
+                if account['profile'] is not None:
+                    continue
+                if normalize_fio(fio) != account['fio_key']:
+                    report.add_error(account['line'], f'Телефон {account["phone"]} уже записан за родителем "{fio}"')
+                elif user_id is not None:
+                    report.add_error(account['line'], f'У родителя "{fio}" уже есть учетная запись')
+                account['profile'] = pk
+        teachers = {account['fio_key']: account for account in accounts if account['role'] == 'teacher'}
+        if teachers:
+            # Воспитателей в саду десятки: сравниваем ФИО в Python, как и названия групп при зачислении
+            for pk, fio, user_id in Teacher.objects.order_by('pk').values_list('pk', 'teacher_fio', 'user_id'):
+                account = teachers.get(normalize_fio(fio))
+                if account is None or account['profile'] is not None:
+                    continue
+                if user_id is not None:
+                    report.add_error(account['line'], f'У воспитателя "{fio}" уже есть учетная запись')
+                account['profile'] = pk
+    def save(self, accounts, hashes):
+        users = User.objects.bulk_create([
+            User(
+                username=account['username'], email=account['email'], password=password_hash,
+                is_staff=account['role'] == 'teacher',
+            )
+            for account, password_hash in zip(accounts, hashes)
+        ], batch_size=ACCOUNT_BATCH_SIZE)
+        for account, user in zip(accounts, users):
+            account['user_id'] = user.pk
+        groups = {role: AuthGroup.objects.get_or_create(name=name)[0].pk for role, (name, _) in ROLES.items()}
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=account['user_id'], group_id=groups[account['role']]) for account in accounts
+        ], batch_size=ACCOUNT_BATCH_SIZE)
+        parents = [account for account in accounts if account['role'] == 'parent']
+        teachers = [account for account in accounts if account['role'] == 'teacher']
+        # bulk_create не вызывает save(): ключ телефона и членство в саду (profile_user_linked) заполняем сами
+        Parent.objects.bulk_create([
+            Parent(parent_fio=account['fio'], parent_number=account['phone'], phone_key=account['phone_key'],
+                   user_id=account['user_id'])
+            for account in parents if account['profile'] is None
+        ], batch_size=ACCOUNT_BATCH_SIZE)
+        Teacher.objects.bulk_create([
+            Teacher(teacher_fio=account['fio'], teacher_number=account['phone'], user_id=account['user_id'])
+            for account in teachers if account['profile'] is None
+        ], batch_size=ACCOUNT_BATCH_SIZE)
+        for model, linked in ((Parent, parents), (Teacher, teachers)):
+            model.objects.bulk_update([
+                model(pk=account['profile'], user_id=account['user_id'])
+                for account in linked if account['profile'] is not None
+            ], ['user'], batch_size=ACCOUNT_BATCH_SIZE)
+        KindergartenMember.objects.bulk_create([
+            KindergartenMember(user_id=account['user_id']) for account in accounts
+        ], batch_size=ACCOUNT_BATCH_SIZE)
+    def parse_account(self, record):
+        fio = ' '.join(str(record.get('fio') or '').split())
+        if not fio:
+            raise ValidationError('Не указано ФИО')
+        role = ROLE_VALUES.get(normalize_text(record.get('role') or ''))
+        if role is None:
+            raise ValidationError(f'Неверная роль "{record.get("role")}", ожидается родитель или воспитатель')
+        phone = str(record.get('phone') or '').strip()
+        phone_key = normalize_phone(phone)
+        if len(phone_key) < 10:
+            raise ValidationError(f'Неверный телефон "{phone}"')
+        email = str(record.get('email') or '').strip()
+        if email:
+            validate_email(email)
+        username = str(record.get('username') or '').strip() or phone_key
+        if len(username) > 150:
+            raise ValidationError('Логин длиннее 150 символов')
+        User.username_validator(username)
+        return {
+            'fio': fio[:100], 'fio_key': normalize_fio(fio), 'role': role, 'phone': phone[:20],
+            'phone_key': phone_key, 'email': email, 'username': username, 'profile': None,
+        }
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Student, Teacher, Group, Parent, Attendance, StudentParent
+from .models import Student, Teacher, Group, Parent, Attendance, StudentParent, ArchivedStudent, ArchivedAttendance
+from .models import CalendarDay, GroupClosure, ReportSnapshot, JobRun, SchedulerLock, Kindergarten, KindergartenMember
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ('student_id', 'student_fio', 'student_birthday', 'group', 'student_date_in')
@@ -14,7 +15,8 @@ class TeacherAdmin(admin.ModelAdmin):
     search_fields = ('teacher_fio', 'teacher_number')
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('group_id', 'group_name', 'group_category', 'group_year', 'teacher')
+    list_display = ('group_id', 'group_name', 'group_category', 'group_year', 'teacher', 'students_count')
+    readonly_fields = ('students_count',)
     list_filter = ('group_category', 'group_year')
     search_fields = ('group_name',)
 @admin.register(Parent)
@@ -32,3 +34,49 @@ class StudentParentAdmin(admin.ModelAdmin):
     list_display = ('student', 'parent', 'relationship_type', 'is_primary')
     list_filter = ('relationship_type', 'is_primary')
     search_fields = ('student__student_fio', 'parent__parent_fio')
+@admin.register(ArchivedStudent)
+class ArchivedStudentAdmin(admin.ModelAdmin):
+    list_display = ('student_id', 'student_fio', 'student_birthday', 'group_name', 'student_date_out', 'archived_at')
+    list_filter = ('student_date_out',)
+    search_fields = ('student_fio',)
+    ordering = ('student_fio',)
+@admin.register(ArchivedAttendance)
+class ArchivedAttendanceAdmin(admin.ModelAdmin):
+    list_display = ('attendance_id', 'attendance_date', 'student_id', 'status', 'reason', 'school_year')
+    list_filter = ('school_year', 'status')
+@admin.register(CalendarDay)
+class CalendarDayAdmin(admin.ModelAdmin):
+    list_display = ('day', 'is_school_day', 'note')
+    list_editable = ('is_school_day', 'note')
+    list_filter = ('is_school_day',)
+    search_fields = ('note',)
+    date_hierarchy = 'day'
+@admin.register(GroupClosure)
+class GroupClosureAdmin(admin.ModelAdmin):
+    list_display = ('group', 'date_from', 'date_to', 'reason', 'comment')
+    list_filter = ('reason', 'group')
+    date_hierarchy = 'date_from'
+@admin.register(ReportSnapshot)
+class ReportSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'as_of', 'built_at')
+    list_filter = ('kind', 'as_of')
+    readonly_fields = ('built_at',)
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = ('job', 'status', 'started_at', 'duration', 'node')
+    list_filter = ('job', 'status')
+    date_hierarchy = 'started_at'
+    readonly_fields = ('job', 'node', 'started_at', 'finished_at', 'duration', 'status', 'output')
+@admin.register(SchedulerLock)
+class SchedulerLockAdmin(admin.ModelAdmin):
+    list_display = ('name', 'owner', 'locked_until')
+@admin.register(Kindergarten)
+class KindergartenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'domain', 'database', 'is_active')
+    list_filter = ('is_active', 'database')
+    search_fields = ('name', 'slug', 'domain')
+@admin.register(KindergartenMember)
+class KindergartenMemberAdmin(admin.ModelAdmin):
+    list_display = ('user', 'updated_at')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
\ No newline at end of file
@@ -0,0 +1,132 @@
+# Архив закрытых учебных лет. Посещаемость переносится в archived_attendance, выпускники - в archived_students.
+# Перенос идет пачками по диапазонам pk, каждая пачка - отдельная короткая транзакция, поэтому рабочие
+# таблицы не блокируются надолго, а прерванный перенос можно просто запустить заново.
+import time
+from collections import defaultdict
+from datetime import date
+from django.db.models import Count, Exists, Min, OuterRef, Q
+from .models import ArchivedAttendance, ArchivedStudent, Attendance, DeletionMark, Student, StudentParent
+from .school_year import school_year_of, school_year_start
+from .tenancy import current_tenant, tenant_atomic, tenant_connection
+ATTENDANCE_BATCH_SIZE = 5000
+STUDENTS_BATCH_SIZE = 500
+# Поля Attendance и соответствующие им поля ArchivedAttendance
+ATTENDANCE_FIELDS = [
+    ('attendance_id', 'attendance_id'),
+    ('attendance_date', 'attendance_date'),
+    ('status', 'status'),
+    ('student', 'student_id'),
+    ('reason', 'reason'),
+    ('noted_by', 'noted_by_id'),
+    ('updated_at', 'updated_at'),
+    ('tenant', 'tenant'),
+]
+def archive_cutoff(today=None, keep_years=1):
+    """Дата, раньше которой данные можно архивировать: начало самого старого из оставляемых учебных лет."""
+    return school_year_start(school_year_of(today or date.today()) - keep_years)
+def archivable_school_years(cutoff):
+    first = Attendance.objects.filter(attendance_date__lt=cutoff).aggregate(first=Min('attendance_date'))['first']
+    if first is None:
+        return []
+    return list(range(school_year_of(first), school_year_of(cutoff)))
+def archive_attendance_year(school_year, batch_size=ATTENDANCE_BATCH_SIZE, pause=0):
+    """Переносит отметки учебного года в архив; возвращает число перенесенных строк."""
+    start, end = school_year_start(school_year), school_year_start(school_year + 1)
+    rows = Attendance.objects.filter(attendance_date__gte=start, attendance_date__lt=end)
+    moved = 0
+    last_pk = 0
+    while True:
+        pks = list(rows.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return moved
+        with tenant_atomic():
+            moved += move_attendance(school_year, start, end, last_pk, pks[-1])
+        last_pk = pks[-1]
+        if pause:
+            time.sleep(pause)
+def move_attendance(school_year, start, end, after_pk, upper_pk):
+    # INSERT ... SELECT и DELETE по одному диапазону pk: строки не проходят через Python.
+    # Сигналы post_delete не нужны: живой дашборд показывает только сегодняшние отметки
+    connection = tenant_connection()
+    quote = connection.ops.quote_name
+    source = [quote(Attendance._meta.get_field(name).column) for name, _ in ATTENDANCE_FIELDS]
+    target = [quote(ArchivedAttendance._meta.get_field(name).column) for _, name in ATTENDANCE_FIELDS]
+    pk_column = quote(Attendance._meta.pk.column)
+    date_column = quote(Attendance._meta.get_field('attendance_date').column)
+    where = f'{pk_column} > %s AND {pk_column} <= %s AND {date_column} >= %s AND {date_column} < %s'
+    params = [after_pk, upper_pk, start, end]
+    tenant = current_tenant()
+    if tenant is not None:
+        # В диапазон pk попадают и отметки других садов той же БД
+        where += f' AND {quote(Attendance._meta.get_field("tenant").column)} = %s'
+        params.append(tenant.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(ArchivedAttendance._meta.db_table)} ({", ".join(target)}, '
+            f'{quote(ArchivedAttendance._meta.get_field("school_year").column)}) '
+            f'SELECT {", ".join(source)}, %s FROM {quote(Attendance._meta.db_table)} WHERE {where}',
+            [school_year] + params,
+        )
+        cursor.execute(f'DELETE FROM {quote(Attendance._meta.db_table)} WHERE {where}', params)
+        moved = cursor.rowcount
+    if moved and tenant is not None:
+        # DELETE в обход ORM: отметку удаления для ETag отчетов ставим сами
+        DeletionMark.mark(Attendance, tenant.pk)
+    return moved
+def archivable_graduates(cutoff):
+    # Выпускники закрытых лет, у которых в рабочей таблице не осталось отметок
+    return Student.objects.filter(student_date_out__lt=cutoff).exclude(
+        Exists(Attendance.objects.filter(student=OuterRef('pk')))
+    )
+def archive_graduates(cutoff, batch_size=STUDENTS_BATCH_SIZE, pause=0):
+    """Переносит выпускников в архив вместе со снимком связей с родителями; возвращает их число."""
+    moved = 0
+    last_pk = 0
+    while True:
+        batch = list(archivable_graduates(cutoff).filter(pk__gt=last_pk).select_related('group').order_by('pk')[:batch_size])
+        if not batch:
+            return moved
+        last_pk = batch[-1].pk
+        parents = defaultdict(list)
+        for link in StudentParent.objects.filter(student__in=batch).select_related('parent').order_by('pk'):
+            parents[link.student_id].append({
+                'parent_id': link.parent_id,
+                'parent_fio': link.parent.parent_fio,
+                'parent_number': link.parent.parent_number,
+                'relationship_type': link.relationship_type,
+                'is_primary': link.is_primary,
+            })
+        with tenant_atomic():
+            ArchivedStudent.objects.bulk_create([
+                ArchivedStudent(
+                    student_id=student.pk, student_fio=student.student_fio, student_birthday=student.student_birthday,
+                    student_gender=student.student_gender, student_address=student.student_address,
+                    student_date_in=student.student_date_in, student_date_out=student.student_date_out,
+                    group_id=student.group_id, group_name=student.group.group_name if student.group else '',
+                    parents=parents[student.pk], tenant_id=student.tenant_id,
+                )
+                for student in batch
+            ], ignore_conflicts=True)
+            # Связи с родителями удаляются каскадом; занятых мест в группах у выпускников нет
+            Student.objects.filter(pk__in=[student.pk for student in batch]).delete()
+        moved += len(batch)
+        if pause:
+            time.sleep(pause)
+def archived_attendance_by_year(student_id):
+    """Итоги посещаемости ученика по архивным учебным годам, от новых к старым."""
+    years = ArchivedAttendance.objects.filter(student_id=student_id).values('school_year').annotate(
+        total=Count('pk'),
+        present=Count('pk', filter=Q(status=True)),
+        sick=Count('pk', filter=Q(status=False, reason='Болезнь')),
+    ).order_by('-school_year')
+    return [
+        {
+            'school_year': f'{row["school_year"]}/{row["school_year"] + 1}',
+            'total_days': row['total'],
+            'present_days': row['present'],
+            'absent_days': row['total'] - row['present'],
+            'sick_days': row['sick'],
+            'attendance_percentage': round(row['present'] / row['total'] * 100, 1) if row['total'] else 0,
+        }
+        for row in years
+    ]
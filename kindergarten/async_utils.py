@@ -0,0 +1,23 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+def _run_in_worker(query):
+    # Поток из пула держит собственное соединение с БД; закрываем устаревшие по CONN_MAX_AGE,
+    # как это делает обработчик запроса
+    close_old_connections()
+    try:
+        return query()
+    finally:
+        close_old_connections()
+async def gather_queries(queries):
+    """
+    Выполняет независимые выборки одновременно, каждую в отдельном потоке со своим соединением.
+    queries: {имя: функция без аргументов}; возвращает {имя: результат}.
+    """
+    names = list(queries)
+    results = await asyncio.gather(*(
+        sync_to_async(_run_in_worker, thread_sensitive=False)(queries[name]) for name in names
+    ))
+    return dict(zip(names, results))
+def run_queries(queries):
+    return {name: query() for name, query in queries.items()}
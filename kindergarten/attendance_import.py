@@ -0,0 +1,182 @@
+from collections import defaultdict
+from datetime import date, datetime
+from django.core.exceptions import ValidationError
+from .models import Attendance, ReportSnapshot
+from .normalization import normalize_text
+from .spreadsheets import ImportReport, read_table
+from .tenancy import current_tenant, tenant_atomic, tenant_connection
+IMPORT_CHUNK_SIZE = 5000
+HEADER_ALIASES = {
+    'student_id': {'student_id', 'id', 'id ученика', 'код ученика'},
+    'student': {'student', 'student_fio', 'фио', 'ученик', 'фио ученика'},
+    'date': {'date', 'attendance_date', 'дата'},
+    'status': {'status', 'статус', 'отметка', 'присутствие'},
+    'reason': {'reason', 'причина', 'причина отсутствия'},
+}
+PRESENT_VALUES = {'1', 'true', 'да', '+', 'п', 'присутствовал', 'присутствовала', 'был', 'была'}
+ABSENT_VALUES = {'0', 'false', 'нет', '-', 'н', 'отсутствовал', 'отсутствовала', 'не был', 'не была'}
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+STAGING_TABLE = 'attendance_import_stage'
+def read_register(file, filename):
+    """Построчно читает журнал посещаемости из CSV или XLSX: итератор (номер строки, {колонка: значение})."""
+    return read_table(file, filename, HEADER_ALIASES, [('student_id', 'student'), 'date', 'status'])
+class AttendanceImporter:
+    """
+    Загружает отметки посещаемости пачками по IMPORT_CHUNK_SIZE строк.
+    Учеников проверяем по словарям, загруженным одним запросом, а запись идет через
+    bulk_create(update_conflicts=True) или COPY на PostgreSQL: существующая отметка за дату перезаписывается.
+    students: queryset учеников, которым пользователь может ставить отметки.
+    """
+    def __init__(self, students, noted_by=None, today=None):
+        self.noted_by = noted_by
+        self.today = today or date.today()
+        self.dates = {}
+        self.reasons = {}
+        for value, label in Attendance._meta.get_field('reason').choices:
+            self.reasons[normalize_text(value)] = value
+            self.reasons[normalize_text(label)] = value
+        self.students = {}
+        self.students_by_fio = defaultdict(list)
+        for pk, fio, date_in, date_out in students.values_list(
+            'pk', 'student_fio', 'student_date_in', 'student_date_out'
+        ).iterator(chunk_size=IMPORT_CHUNK_SIZE):
+            self.students[pk] = (date_in, date_out)
+            self.students_by_fio[normalize_text(fio)].append(pk)
+    def run(self, records, dry_run=False):
+        report = ImportReport(dry_run)
+        seen = {}
+        chunk = []
+        with tenant_atomic():
+            use_copy = tenant_connection().vendor == 'postgresql' and not dry_run
+            if use_copy:
+                self.create_staging_table()
+            for line_number, record in records:
+                report.rows += 1
+                try:
+                    row = self.parse(record)
+                except ValidationError as e:
+                    report.add_error(line_number, e.messages[0])
+                    continue
+                key = row[:2]
+                if key in seen:
+                    report.add_error(line_number, f'Повтор отметки из строки {seen[key]}')
+                    continue
+                seen[key] = line_number
+                chunk.append(row)
+                if len(chunk) >= IMPORT_CHUNK_SIZE:
+                    report.imported += self.save(chunk, dry_run, use_copy)
+                    chunk = []
+            report.imported += self.save(chunk, dry_run, use_copy)
+            if use_copy:
+                self.merge_staging_table()
+            if seen and not dry_run:
+                # bulk_create не вызывает save(): снимки отчетов с исправленными прошлыми днями сбрасываем сами
+                ReportSnapshot.invalidate(min(attendance_date for _, attendance_date in seen))
+        return report
+    def save(self, chunk, dry_run, use_copy):
+        if not chunk or dry_run:
+            return len(chunk)
+        noted_by_id = self.noted_by.pk if self.noted_by else None
+        if use_copy:
+            with tenant_connection().cursor() as cursor:
+                with cursor.cursor.copy(f'COPY {STAGING_TABLE} (student_id, attendance_date, status, reason) FROM STDIN') as copy:
+                    for row in chunk:
+                        copy.write_row(row)
+            return len(chunk)
+        Attendance.objects.bulk_create(
+            [
+                Attendance(student_id=student_id, attendance_date=attendance_date, status=status,
+                           reason=reason, noted_by_id=noted_by_id)
+                for student_id, attendance_date, status, reason in chunk
+            ],
+            update_conflicts=True,
+            unique_fields=['attendance_date', 'student'],
+            update_fields=['status', 'reason', 'noted_by'],
+        )
+        return len(chunk)
+    def create_staging_table(self):
+        # На PostgreSQL строки идут через COPY во временную таблицу и сливаются одним INSERT ... ON CONFLICT
+        with tenant_connection().cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {STAGING_TABLE} '
+                '(student_id integer, attendance_date date, status boolean, reason varchar(100)) ON COMMIT DROP'
+            )
+    def merge_staging_table(self):
+        fields = {name: Attendance._meta.get_field(name).column for name in (
+            'student', 'attendance_date', 'status', 'reason', 'noted_by', 'updated_at', 'tenant'
+        )}
+        updated = ('status', 'reason', 'noted_by', 'updated_at')
+        with tenant_connection().cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {Attendance._meta.db_table} ({", ".join(fields.values())}) '
+                f'SELECT student_id, attendance_date, status, reason, %s, now(), %s FROM {STAGING_TABLE} '
+                f'ON CONFLICT ({fields["attendance_date"]}, {fields["student"]}) DO UPDATE SET '
+                + ', '.join(f'{fields[name]} = EXCLUDED.{fields[name]}' for name in updated),
+                [self.noted_by.pk if self.noted_by else None, current_tenant().pk],
+            )
+    def parse(self, record):
+        """Возвращает кортеж (student_id, attendance_date, status, reason) или бросает ValidationError."""
+        student_id = self.parse_student(record)
+        attendance_date = self.parse_date(record.get('date'))
+        date_in, date_out = self.students[student_id]
+        if attendance_date > self.today:
+            raise ValidationError('Дата в будущем')
+        if date_in and attendance_date < date_in:
+            raise ValidationError(f'Дата раньше зачисления ученика ({date_in:%d.%m.%Y})')
+        if date_out and attendance_date > date_out:
+            raise ValidationError(f'Дата позже выпуска ученика ({date_out:%d.%m.%Y})')
+        status = self.parse_status(record.get('status'))
+        reason = '' if status else self.parse_reason(record.get('reason'))
+        return student_id, attendance_date, status, reason
+    def parse_student(self, record):
+        raw_id = record.get('student_id')
+        if raw_id not in (None, ''):
+            try:
+                student_id = int(raw_id) if isinstance(raw_id, (int, float)) else int(str(raw_id).strip())
+            except ValueError:
+                raise ValidationError(f'Неверный ID ученика "{raw_id}"')
+            if student_id not in self.students:
+                raise ValidationError(f'Ученик с ID {student_id} не найден или недоступен')
+            return student_id
+        fio = record.get('student')
+        if fio in (None, ''):
+            raise ValidationError('Не указан ученик')
+        matches = self.students_by_fio.get(normalize_text(fio), [])
+        if not matches:
+            raise ValidationError(f'Ученик "{fio}" не найден или недоступен')
+        if len(matches) > 1:
+            raise ValidationError(f'Несколько учеников с ФИО "{fio}", укажите ID ученика')
+        return matches[0]
+    def parse_date(self, value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        text = str(value or '').strip()
+        # В журнале одни и те же даты повторяются для каждого ученика
+        if text not in self.dates:
+            for date_format in DATE_FORMATS:
+                try:
+                    self.dates[text] = datetime.strptime(text, date_format).date()
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValidationError(f'Неверная дата "{text}", ожидается ГГГГ-ММ-ДД или ДД.ММ.ГГГГ')
+        return self.dates[text]
+    def parse_status(self, value):
+        if isinstance(value, bool):
+            return value
+        text = normalize_text(value if value is not None else '')
+        if isinstance(value, (int, float)):
+            text = str(int(value))
+        if text in PRESENT_VALUES:
+            return True
+        if text in ABSENT_VALUES:
+            return False
+        raise ValidationError(f'Неверный статус "{value}"')
+    def parse_reason(self, value):
+        text = normalize_text(value or '')
+        if text not in self.reasons:
+            raise ValidationError(f'Недопустимая причина отсутствия "{value}"')
+        return self.reasons[text]
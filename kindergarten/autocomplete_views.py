@@ -0,0 +1,107 @@
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from .models import Student, Teacher, Group, Parent
+from .decorators import get_user_role
+from .security import sanitize_search_query, sanitize_integer, validate_pagination_params
+AUTOCOMPLETE_PAGE_SIZE = 20
+def _prefix_q(field, term):
+    # Поиск по началу строки (LIKE 'term%') в PostgreSQL идет по индексам *_prefix_idx с varchar_pattern_ops:
+    # обычный btree при collation, отличной от C, для LIKE не используется.
+    # ФИО хранятся с заглавной буквы, поэтому дополнительно ищем capitalized-вариант
+    query = Q(**{f'{field}__startswith': term})
+    capitalized = term[:1].upper() + term[1:]
+    if capitalized != term:
+        query |= Q(**{f'{field}__startswith': capitalized})
+    return query
+def _autocomplete_response(request, queryset, search_field, serialize):
+    try:
+        term = sanitize_search_query(request.GET.get('q', ''), max_length=100)
+    except ValidationError:
+        return JsonResponse({'results': [], 'more': False})
+    page, per_page = validate_pagination_params(
+        request.GET.get('page'), request.GET.get('per_page', AUTOCOMPLETE_PAGE_SIZE), max_per_page=50
+    )
+    if term:
+        queryset = queryset.filter(_prefix_q(search_field, term))
+    queryset = queryset.order_by(search_field, 'pk')
+    offset = (page - 1) * per_page
+    # Берем на одну запись больше вместо COUNT(*), чтобы понять, есть ли следующая страница
+    rows = list(queryset[offset:offset + per_page + 1])
+    return JsonResponse({
+        'results': [serialize(obj) for obj in rows[:per_page]],
+        'more': len(rows) > per_page,
+    })
+def _forbidden():
+    return JsonResponse({'error': 'Доступ запрещен'}, status=403)
+def _optional_int(request, name):
+    try:
+        return sanitize_integer(request.GET.get(name), min_value=1)
+    except ValidationError:
+        return None
+@login_required
+def autocomplete_students(request):
+    role = get_user_role(request.user)
+    if role == 'teacher' and hasattr(request.user, 'teacher_profile'):
+        students = Student.objects.filter(group__teacher=request.user.teacher_profile)
+    elif role in ['director', 'superuser']:
+        students = Student.objects.all()
+    else:
+        return _forbidden()
+    group_id = _optional_int(request, 'group')
+    if group_id:
+        students = students.filter(group_id=group_id)
+    if request.GET.get('active') == '1':
+        students = students.filter(student_date_out__isnull=True)
+    students = students.select_related('group').only(
+        'student_id', 'student_fio', 'student_birthday', 'group__group_id', 'group__group_name'
+    )
+    return _autocomplete_response(request, students, 'student_fio', lambda s: {
+        'id': s.pk,
+        'text': s.student_fio,
+        'birthday': s.student_birthday.strftime('%d.%m.%Y'),
+        'age': s.age(),
+        'group_id': s.group.pk if s.group else None,
+        'group': s.group.group_name if s.group else '',
+    })
+@login_required
+def autocomplete_parents(request):
+    role = get_user_role(request.user)
+    if role == 'teacher' and hasattr(request.user, 'teacher_profile'):
+        parent_ids = Student.objects.filter(
+            group__teacher=request.user.teacher_profile
+        ).values('studentparent__parent_id')
+        parents = Parent.objects.filter(pk__in=parent_ids)
+    elif role in ['director', 'superuser']:
+        parents = Parent.objects.all()
+    else:
+        return _forbidden()
+    parents = parents.only('parent_id', 'parent_fio', 'parent_number')
+    return _autocomplete_response(request, parents, 'parent_fio', lambda p: {
+        'id': p.pk,
+        'text': f'{p.parent_fio} ({p.parent_number})',
+    })
+@login_required
+def autocomplete_groups(request):
+    role = get_user_role(request.user)
+    if role == 'teacher' and hasattr(request.user, 'teacher_profile'):
+        groups = Group.objects.filter(teacher=request.user.teacher_profile)
+    elif role in ['director', 'superuser']:
+        groups = Group.objects.all()
+    else:
+        return _forbidden()
+    return _autocomplete_response(request, groups, 'group_name', lambda g: {
+        'id': g.pk,
+        'text': str(g),
+    })
+@login_required
+def autocomplete_teachers(request):
+    role = get_user_role(request.user)
+    if role not in ['teacher', 'director', 'superuser']:
+        return _forbidden()
+    teachers = Teacher.objects.only('teacher_id', 'teacher_fio', 'teacher_position', 'teacher_number')
+    return _autocomplete_response(request, teachers, 'teacher_fio', lambda t: {
+        'id': t.pk,
+        'text': f'{t.teacher_fio} - {t.teacher_position} ({t.teacher_number})',
+    })
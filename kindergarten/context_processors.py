@@ -1,4 +1,5 @@
-from .decorators import get_user_role
+from django.conf import settings
+from .decorators import cached_user_role, get_user_role
 def user_role(request):
     if not request.user.is_authenticated:
         return {
@@ -8,18 +9,27 @@ def user_role(request):
             'is_director': False,
             'is_superuser': False,
         }
-    role = get_user_role(request.user)
+    # user_role - ключ кэша меню, допускает отставание; флаги показывают действия на странице и считаются
+    # по актуальной роли при первом обращении из шаблона
+    user = request.user
     return {
-        'user_role': role,
-        'is_parent': role == 'parent',
-        'is_teacher': role == 'teacher',
-        'is_director': role == 'director',
-        'is_superuser': role == 'superuser',
+        'user_role': cached_user_role(user),
+        'is_parent': lambda: get_user_role(user) == 'parent',
+        'is_teacher': lambda: get_user_role(user) == 'teacher',
+        'is_director': lambda: get_user_role(user) == 'director',
+        'is_superuser': lambda: get_user_role(user) == 'superuser',
     }
 def navigation(request):
+    # Меню в base.html кэшируется фрагментом по роли (user_role), разделы собираются только при промахе
+    return {
+        'nav_sections': lambda: navigation_sections(request)['nav_sections'],
+        'nav_cache_seconds': getattr(settings, 'NAVIGATION_CACHE_SECONDS', 3600),
+    }
+def navigation_sections(request):
     if not request.user.is_authenticated:
         return {'nav_sections': []}
-    role = get_user_role(request.user)
+    # Тот же источник, что у ключа фрагмента, иначе под ключом одной роли закэшируется меню другой
+    role = cached_user_role(request.user)
     if role == 'parent':
         return {
             'nav_sections': [
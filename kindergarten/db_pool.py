@@ -0,0 +1,35 @@
+from django.db import connections
+def pool_stats(alias='default'):
+    """Состояние соединений с БД: настройки постоянных соединений и, если включен, статистика пула psycopg."""
+    connection = connections[alias]
+    settings_dict = connection.settings_dict
+    stats = {
+        'alias': alias,
+        'vendor': connection.vendor,
+        'conn_max_age': settings_dict['CONN_MAX_AGE'],
+        'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+        'server_side_cursors': not settings_dict.get('DISABLE_SERVER_SIDE_CURSORS', False),
+        'pooling': False,
+    }
+    # Атрибут pool есть только у бэкенда PostgreSQL и равен None, если пул не настроен
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        return stats
+    raw = pool.get_stats()
+    requests_num = raw.get('requests_num', 0)
+    stats.update({
+        'pooling': True,
+        'min_size': raw.get('pool_min'),
+        'max_size': raw.get('pool_max'),
+        'size': raw.get('pool_size', 0),
+        'available': raw.get('pool_available', 0),
+        'in_use': raw.get('pool_size', 0) - raw.get('pool_available', 0),
+        'waiting': raw.get('requests_waiting', 0),
+        'requests': requests_num,
+        'queued': raw.get('requests_queued', 0),
+        'avg_acquire_ms': round(raw.get('requests_wait_ms', 0) / requests_num, 2) if requests_num else 0.0,
+        'errors': raw.get('requests_errors', 0),
+        'connections_opened': raw.get('connections_num', 0),
+        'connections_lost': raw.get('connections_lost', 0),
+    })
+    return stats
@@ -0,0 +1,102 @@
+import contextvars
+import functools
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from .tenancy import tenant_database
+logger = logging.getLogger(__name__)
+# Включается декоратором use_report_replica на время обработки отчета
+_report_reads = contextvars.ContextVar('kindergarten_report_reads', default=False)
+PRIMARY_UNTIL_SESSION_KEY = '_primary_until'
+def replica_alias():
+    alias = getattr(settings, 'REPORTS_DATABASE', 'replica')
+    return alias if alias in settings.DATABASES else None
+def replica_lag(alias):
+    """Отставание реплики в секундах; None, если реплика недоступна."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            # Если реплика проиграла все полученные WAL, она не отстает, даже если на основной БД давно не было записей
+            cursor.execute(
+                'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+                'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+            )
+            return float(cursor.fetchone()[0])
+    except DatabaseError as e:
+        logger.warning('Реплика %s недоступна: %s', alias, e)
+        return None
+def replica_is_fresh(alias):
+    # Проверяем отставание не чаще раза в REPLICA_LAG_CHECK_INTERVAL секунд
+    cache_key = f'replica_lag:{alias}'
+    lag = cache.get(cache_key, 'unknown')
+    if lag == 'unknown':
+        lag = replica_lag(alias)
+        cache.set(cache_key, lag, getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5))
+    return lag is not None and lag <= getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 30)
+def pin_session_to_primary(request):
+    # Read-your-writes: после записи посещаемости отчеты пользователя какое-то время читают с основной БД
+    seconds = getattr(settings, 'READ_YOUR_WRITES_SECONDS', 60)
+    request.session[PRIMARY_UNTIL_SESSION_KEY] = int(time.time()) + seconds
+def session_pinned_to_primary(request):
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(PRIMARY_UNTIL_SESSION_KEY, 0) > time.time()
+def should_read_from_replica(request):
+    alias = replica_alias()
+    return alias is not None and not session_pinned_to_primary(request) and replica_is_fresh(alias)
+def report_reads_enabled():
+    return _report_reads.get()
+def set_report_reads(enabled):
+    return _report_reads.set(enabled)
+def reset_report_reads(token):
+    _report_reads.reset(token)
+def bind_context(func):
+    """Переносит текущий контекст (в том числе выбор реплики) в рабочий поток отчета."""
+    return functools.partial(contextvars.copy_context().run, func)
+class ReportReplicaRouter:
+    """
+    Направляет чтение моделей приложения на реплику (settings.REPORTS_DATABASE)
+    только внутри отчетов и выгрузок; запись и все остальные запросы идут в default.
+    """
+    route_app_labels = {'kindergarten'}
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self.route_app_labels and report_reads_enabled():
+            return replica_alias()
+        return None
+    def db_for_write(self, model, **hints):
+        return 'default'
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и основная БД
+        databases = {'default', replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+class TenantRouter:
+    """
+    Данные сада, вынесенного в отдельную БД (Kindergarten.database), читаются и пишутся в нее. Реестр садов,
+    пользователи, сессии и история планировщика остаются в default. Ставится перед ReportReplicaRouter:
+    для садов в default решение принимает он.
+    """
+    shared_app_labels = {'admin', 'auth', 'contenttypes', 'sessions'}
+    shared_models = {'kindergarten', 'schedulerlock', 'jobrun'}
+    def is_shared(self, model):
+        return model._meta.app_label in self.shared_app_labels or (
+            model._meta.app_label == 'kindergarten' and model._meta.model_name in self.shared_models
+        )
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self.shared_app_labels:
+            # Иначе профиль из БД сада искал бы своего пользователя в той же БД
+            return 'default'
+        if model._meta.app_label == 'kindergarten' and not self.is_shared(model):
+            return tenant_database()
+        return None
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+    def allow_relation(self, obj1, obj2, **hints):
+        # Связи с пользователями и садами из default разрешены из любой БД
+        if self.is_shared(obj1._meta.model) or self.is_shared(obj2._meta.model):
+            return True
+        return None
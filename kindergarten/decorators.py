@@ -1,10 +1,26 @@
+import hashlib
+from datetime import date
 from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.http import HttpResponseForbidden
+from django.conf import settings
 from django.contrib import messages
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.shortcuts import redirect
-def get_user_role(user):
-    if not user.is_authenticated:
-        return None
+from .db_router import should_read_from_replica, set_report_reads, reset_report_reads, pin_session_to_primary
+from .tenancy import current_tenant
+# Роль для меню: фрагмент навигации в base.html кэшируется по роли, а вычисляется она тремя запросами к группам.
+# Кэш по умолчанию свой в каждом процессе (LocMem) и сбрасывается сигналом только в одном из них, поэтому
+# проверки прав его не используют: get_user_role считает роль по БД один раз за запрос
+ROLE_CACHE_SECONDS = 300
+def role_cache_key(user_id):
+    return f'user_role:{user_id}'
+def invalidate_user_role(*user_ids):
+    cache.delete_many([role_cache_key(user_id) for user_id in user_ids])
+def _compute_user_role(user):
     if user.is_superuser:
         return 'superuser'
     elif user.groups.filter(name='Заведующие').exists():
@@ -14,6 +30,22 @@ def get_user_role(user):
     elif user.groups.filter(name='Родители').exists():
         return 'parent'
     return None
+def get_user_role(user):
+    """Роль для проверки прав: из БД, в пределах запроса хранится на объекте пользователя."""
+    if not user.is_authenticated:
+        return None
+    if not hasattr(user, '_kindergarten_role'):
+        user._kindergarten_role = _compute_user_role(user)
+        cache.set(role_cache_key(user.pk), user._kindergarten_role, ROLE_CACHE_SECONDS)
+    return user._kindergarten_role
+def cached_user_role(user):
+    """Роль только для отображения меню: может отставать до ROLE_CACHE_SECONDS."""
+    if not user.is_authenticated:
+        return None
+    if hasattr(user, '_kindergarten_role'):
+        return user._kindergarten_role
+    role = cache.get(role_cache_key(user.pk), '')
+    return get_user_role(user) if role == '' else role
 def role_required(*roles):
     def decorator(view_func):
         @wraps(view_func)
@@ -60,4 +92,91 @@ def parent_required(view_func):
             return view_func(request, *args, **kwargs)
         messages.error(request, 'У вас нет прав для выполнения этого действия!')
         return redirect('home')
-    return _wrapped_view
\ No newline at end of file
+    return _wrapped_view
+def use_report_replica(view_func):
+    """Чтение данных отчета с реплики (если она настроена, не отстает и сессия не закреплена за основной БД)."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_view(request, *args, **kwargs):
+            token = set_report_reads(await sync_to_async(should_read_from_replica)(request))
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                reset_report_reads(token)
+        return _async_view
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        token = set_report_reads(should_read_from_replica(request))
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            reset_report_reads(token)
+    return _wrapped_view
+def pin_to_primary_after_write(view_func):
+    """После изменения посещаемости отчеты этой сессии читают с основной БД, пока реплика не догонит."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if request.method == 'POST' and response.status_code < 400:
+            pin_session_to_primary(request)
+        return response
+    return _wrapped_view
+def scope_validators(request, scope):
+    """
+    ETag и Last-Modified для данных страницы: число строк и максимум updated_at по каждой выборке.
+    Число строк нужно, чтобы заметить удаление, которое максимум не меняет. Срез [:1], упорядоченный
+    по -updated_at (см. scopes.table_changes), читается по индексу без подсчета строк.
+    """
+    tenant = current_tenant()
+    parts = [
+        str(tenant.pk if tenant else ''), str(request.user.pk), str(get_user_role(request.user)),
+        date.today().isoformat(), settings.RELEASE_VERSION,
+    ]
+    last_modified = None
+    for queryset in scope:
+        if queryset.query.is_sliced:
+            state = {'rows': '', 'last': next(iter(queryset.values_list('updated_at', flat=True)), None)}
+        else:
+            state = queryset.order_by().aggregate(rows=Count('pk'), last=Max('updated_at'))
+        parts.append(f"{state['rows']}:{state['last'].isoformat() if state['last'] else ''}")
+        if state['last'] is not None and (last_modified is None or state['last'] > last_modified):
+            last_modified = state['last']
+    etag = quote_etag(hashlib.md5('|'.join(parts).encode()).hexdigest())
+    return etag, int(last_modified.timestamp()) if last_modified is not None else None
+def conditional_on_scope(scope_func):
+    """
+    Отвечает 304 Not Modified, не выполняя представление, если его данные не менялись.
+    scope_func(request, *args, **kwargs) возвращает список querysets, из которых строится страница.
+    Ставится под login_required и use_report_replica, чтобы проверка шла по той же БД, что и отчет.
+    """
+    def check(request, args, kwargs):
+        # Страница с непоказанными сообщениями должна отрисоваться, иначе сообщения потеряются
+        if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+            return None, None, None
+        etag, last_modified = scope_validators(request, scope_func(request, *args, **kwargs))
+        return get_conditional_response(request, etag=etag, last_modified=last_modified), etag, last_modified
+    def finish(response, etag, last_modified):
+        if etag is not None and response.status_code == 200:
+            response.headers.setdefault('ETag', etag)
+            if last_modified is not None:
+                response.headers.setdefault('Last-Modified', http_date(last_modified))
+            # Без no-cache браузер эвристически кэширует страницу по Last-Modified и не перепроверяет
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _async_view(request, *args, **kwargs):
+                not_modified, etag, last_modified = await sync_to_async(check)(request, args, kwargs)
+                if not_modified is not None:
+                    return not_modified
+                return finish(await view_func(request, *args, **kwargs), etag, last_modified)
+            return _async_view
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            not_modified, etag, last_modified = check(request, args, kwargs)
+            if not_modified is not None:
+                return not_modified
+            return finish(view_func(request, *args, **kwargs), etag, last_modified)
+        return _wrapped_view
+    return decorator
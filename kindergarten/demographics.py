@@ -0,0 +1,69 @@
+# Демография учеников для всех дашбордов: точный возраст на дату, пол и несоответствие возраста
+# категории группы. Все показатели считаются одним агрегатным запросом (COUNT с условием на каждый
+# признак), границы возраста - это даты рождения, посчитанные заранее, поэтому запрос переносим между СУБД.
+from datetime import date
+from django.db.models import Count, Q
+from .school_year import school_year_of, school_year_start
+# (возраст от, возраст до, подпись): полных лет на дату, верхняя граница не включается
+AGE_BUCKETS = [
+    (0, 2, 'младше 2 лет'),
+    (2, 3, '2-3 года'),
+    (3, 4, '3-4 года'),
+    (4, 5, '4-5 лет'),
+    (5, 6, '5-6 лет'),
+    (6, 7, '6-7 лет'),
+    (7, None, '7 лет и старше'),
+]
+# Крайние группы показываем, только если в них кто-то есть
+OPTIONAL_BUCKETS = {'младше 2 лет', '7 лет и старше'}
+# Возраст детей категории на 1 сентября учебного года (см. Group.CATEGORY_CHOICES)
+CATEGORY_AGES = {
+    'Младшая': (2, 3),
+    'Средняя': (3, 4),
+    'Старшая': (4, 5),
+    'Подготовительная': (5, 7),
+}
+def years_ago(day, years):
+    """Последняя дата рождения, при которой на day исполнилось years полных лет (29 февраля -> 28 февраля)."""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+def age_between(on, min_age, max_age):
+    condition = Q(student_birthday__lte=years_ago(on, min_age))
+    if max_age is not None:
+        condition &= Q(student_birthday__gt=years_ago(on, max_age))
+    return condition
+def category_mismatch(on=None):
+    """Условие на учеников, чей возраст на начало учебного года не подходит категории их группы."""
+    year_start = school_year_start(school_year_of(on or date.today()))
+    condition = Q()
+    for category, (min_age, max_age) in CATEGORY_AGES.items():
+        condition |= Q(group__group_category=category) & ~age_between(year_start, min_age, max_age)
+    return condition
+def demographics(students, on=None):
+    """
+    Распределение активных учеников из students (любой queryset: весь сад, группа, группы воспитателя)
+    по возрасту на дату on, полу и соответствию категории группы - одним запросом.
+    """
+    on = on or date.today()
+    aggregates = {
+        'total': Count('pk'),
+        'male': Count('pk', filter=Q(student_gender='М')),
+        'female': Count('pk', filter=Q(student_gender='Ж')),
+        'category_mismatch': Count('pk', filter=category_mismatch(on)),
+    }
+    for index, (min_age, max_age, _) in enumerate(AGE_BUCKETS):
+        aggregates[f'age_{index}'] = Count('pk', filter=age_between(on, min_age, max_age))
+    row = students.filter(student_date_out__isnull=True).aggregate(**aggregates)
+    age_buckets = []
+    for index, (min_age, max_age, label) in enumerate(AGE_BUCKETS):
+        count = row[f'age_{index}']
+        if count or label not in OPTIONAL_BUCKETS:
+            age_buckets.append({'label': label, 'min_age': min_age, 'max_age': max_age, 'count': count})
+    return {
+        'total': row['total'],
+        'gender': {'male': row['male'], 'female': row['female']},
+        'age_buckets': age_buckets,
+        'category_mismatch': row['category_mismatch'],
+    }
@@ -0,0 +1,161 @@
+# Машинная выгрузка для внешней аналитики: посещаемость, ученики и группы в формате NDJSON (одна JSON-запись
+# на строку). Строки идут в порядке (updated_at, pk) и читаются итератором по серверному курсору пачками
+# по EXPORT_CHUNK_SIZE, поэтому память не зависит от длины периода. После каждой пачки и в конце выгрузки
+# отдается строка {"_cursor": ...}: запрос с этим курсором вернет только строки, добавленные или измененные
+# позже, - так выгрузку можно продолжить после обрыва и забирать изменения инкрементально.
+# Под ASGI синхронный поток Django сначала целиком собирает в список, поэтому там отдается aexport_lines.
+# updated_at ставится во время записи, а не фиксации транзакции: строка долгого импорта становится видна позже
+# строк, записанных после нее, и курсор, ушедший дальше, ее бы пропустил. Поэтому выгрузка отдает только строки
+# старше EXPORT_SETTLE_SECONDS - свежие изменения попадут в следующий запрос.
+# Удаленные строки (и перенесенная в архив посещаемость) в инкрементальную выгрузку не попадают.
+import json
+from asgiref.sync import sync_to_async
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Attendance, Group, Student
+from .security import sanitize_date_string, sanitize_integer
+CURSOR_SALT = 'kindergarten.exports.cursor'
+EXPORT_CHUNK_SIZE = 2000
+class Dataset:
+    """Набор данных выгрузки: поля модели, поля связанных таблиц ({имя: путь}) и фильтры по группе и периоду."""
+    def __init__(self, model, fields, related=None, group_field=None, period=None):
+        self.model = model
+        self.fields = fields
+        self.related = related or {}
+        self.group_field = group_field
+        self.period = period
+def attendance_period(date_from, date_to):
+    query = Q()
+    if date_from:
+        query &= Q(attendance_date__gte=date_from)
+    if date_to:
+        query &= Q(attendance_date__lte=date_to)
+    return query
+def students_period(date_from, date_to):
+    # Ученики, числившиеся в саду хотя бы один день периода
+    query = Q()
+    if date_from:
+        query &= Q(student_date_out__isnull=True) | Q(student_date_out__gte=date_from)
+    if date_to:
+        query &= Q(student_date_in__lte=date_to)
+    return query
+DATASETS = {
+    'attendance': Dataset(
+        Attendance,
+        ('attendance_id', 'attendance_date', 'status', 'reason', 'student_id', 'noted_by_id', 'updated_at'),
+        related={'group_id': 'student__group_id'},
+        group_field='student__group_id',
+        period=attendance_period,
+    ),
+    # Адрес и прочие персональные данные в выгрузку для аналитики не входят
+    'students': Dataset(
+        Student,
+        ('student_id', 'student_fio', 'student_birthday', 'student_gender', 'student_date_in', 'student_date_out',
+         'group_id', 'updated_at'),
+        group_field='group_id',
+        period=students_period,
+    ),
+    'groups': Dataset(
+        Group,
+        ('group_id', 'group_name', 'group_category', 'group_year', 'teacher_id', 'students_count', 'updated_at'),
+        group_field='group_id',
+    ),
+}
+def encode_cursor(dataset, filters, updated_at, pk):
+    return signing.dumps({'d': dataset, 'f': filters, 'k': [updated_at.isoformat(), pk]}, salt=CURSOR_SALT)
+def decode_cursor(dataset, cursor):
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+        updated_at, pk = data['k']
+        if data['d'] != dataset:
+            raise ValueError
+        return data['f'], (datetime.fromisoformat(updated_at), int(pk))
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise ValidationError('Недействительный курсор выгрузки')
+def parse_date(value):
+    value = sanitize_date_string(value)
+    try:
+        return date.fromisoformat(value).isoformat() if value else None
+    except ValueError:
+        raise ValidationError('Неверная дата')
+def export_params(dataset, params):
+    """
+    Фильтры и позиция выгрузки из параметров запроса: group, date_from, date_to (YYYY-MM-DD) или cursor.
+    Курсор хранит фильтры выгрузки, в которой он получен, поэтому остальные параметры вместе с ним не учитываются.
+    """
+    spec = DATASETS[dataset]
+    if params.get('cursor'):
+        return decode_cursor(dataset, params['cursor'])
+    filters = {
+        'group': sanitize_integer(params.get('group'), min_value=1),
+        'date_from': parse_date(params.get('date_from')),
+        'date_to': parse_date(params.get('date_to')),
+    }
+    if (filters['date_from'] or filters['date_to']) and spec.period is None:
+        raise ValidationError('Для этого набора данных фильтр по периоду не поддерживается')
+    return filters, None
+def export_queryset(dataset, filters):
+    spec = DATASETS[dataset]
+    settled = timezone.now() - timedelta(seconds=settings.EXPORT_SETTLE_SECONDS)
+    queryset = spec.model.objects.filter(updated_at__lte=settled)
+    if filters.get('group'):
+        queryset = queryset.filter(**{spec.group_field: filters['group']})
+    if filters.get('date_from') or filters.get('date_to'):
+        queryset = queryset.filter(spec.period(filters.get('date_from'), filters.get('date_to')))
+    return queryset.order_by('updated_at', 'pk').values(
+        *spec.fields, **{name: F(path) for name, path in spec.related.items()}
+    )
+def after_position(queryset, after):
+    if after is None:
+        return queryset
+    updated_at, pk = after
+    return queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk))
+def iterate_rows(queryset, pk_name, after):
+    connection = connections[queryset.db]
+    if connection.features.can_use_chunked_reads and not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from after_position(queryset, after).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return
+    # За pgbouncer серверный курсор не переживет транзакцию: читаем пачками с продолжением по ключу сортировки
+    while True:
+        rows = list(after_position(queryset, after)[:EXPORT_CHUNK_SIZE])
+        yield from rows
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+        after = (rows[-1]['updated_at'], rows[-1][pk_name])
+def export_lines(dataset, queryset, filters, after=None):
+    """Строки NDJSON пачками по EXPORT_CHUNK_SIZE записей, каждая пачка заканчивается строкой с курсором."""
+    pk_name = DATASETS[dataset].model._meta.pk.attname
+    lines = []
+    flushed = None
+    for row in iterate_rows(queryset, pk_name, after):
+        lines.append(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+        after = (row['updated_at'], row[pk_name])
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            lines.append(json.dumps({'_cursor': encode_cursor(dataset, filters, *after)}))
+            yield '\n'.join(lines) + '\n'
+            lines = []
+            flushed = after
+    # Пустая выгрузка возвращает исходный курсор: следующий запрос продолжит с той же позиции
+    if after is not None and after != flushed:
+        lines.append(json.dumps({'_cursor': encode_cursor(dataset, filters, *after)}))
+    if lines:
+        yield '\n'.join(lines) + '\n'
+async def aexport_lines(dataset, queryset, filters, after=None):
+    """export_lines для ASGI: каждая пачка читается в потоке синхронного кода, в памяти одна пачка."""
+    lines = export_lines(dataset, queryset, filters, after)
+    next_chunk = sync_to_async(next)
+    try:
+        while True:
+            chunk = await next_chunk(lines, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # При обрыве соединения закрываем генератор, а с ним и серверный курсор
+        await sync_to_async(lines.close)()
@@ -1,8 +1,22 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from datetime import date
-from .models import Student, Teacher, Group, Parent, Attendance, StudentParent
-class StudentForm(forms.ModelForm):
+from .models import Student, Teacher, Group, Parent, Attendance, StudentParent, CalendarDay, GroupClosure
+from .school_year import current_school_year
+from .tenancy import current_tenant
+from .widgets import AutocompleteSelect
+class TenantFormMixin:
+    """Списки выбора форм создаются при импорте модуля, до выбора сада: ограничиваем их садом запроса."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        tenant = current_tenant()
+        if tenant is None:
+            return
+        for field in self.fields.values():
+            queryset = getattr(field, 'queryset', None)
+            if queryset is not None and getattr(queryset.model, 'tenant_scoped', False):
+                field.queryset = queryset.filter(tenant_id=tenant.pk)
+class StudentForm(TenantFormMixin, forms.ModelForm):
     class Meta:
         model = Student
         fields = '__all__'
@@ -13,7 +27,7 @@ class StudentForm(forms.ModelForm):
             'student_fio': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Иванов Иван Иванович'}),
             'student_gender': forms.Select(attrs={'class': 'form-control'}),
             'student_address': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'г. Москва, ул. Ленина, д. 1'}),
-            'group': forms.Select(attrs={'class': 'form-control'}),
+            'group': AutocompleteSelect('autocomplete_groups', placeholder='Введите название группы...'),
         }
     def clean(self):
         cleaned_data = super().clean()
@@ -26,8 +40,9 @@ class StudentForm(forms.ModelForm):
             )
             if age_at_entry < 2 or age_at_entry > 7:
                 raise ValidationError('Прием детей в детский сад осуществляется только в возрасте от 2 до 7 лет')
-        if group and group.is_full() and not self.instance.pk:
-            raise ValidationError(f'Группа "{group.group_name}" уже заполнена (максимум 30 учеников)')
+        # Предварительная проверка по счетчику; окончательная выполняется в Student.save() под блокировкой
+        if group and group.is_full() and self.instance.occupies_group_id() != group.pk:
+            raise ValidationError(f'Группа "{group.group_name}" уже заполнена (максимум {Group.MAX_STUDENTS} учеников)')
         return cleaned_data
 class TeacherForm(forms.ModelForm):
     class Meta:
@@ -38,7 +53,7 @@ class TeacherForm(forms.ModelForm):
             'teacher_position': forms.Select(attrs={'class': 'form-control'}),
             'teacher_number': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '+7-999-123-45-67'}),
         }
-class GroupForm(forms.ModelForm):
+class GroupForm(TenantFormMixin, forms.ModelForm):
     class Meta:
         model = Group
         fields = ['group_name', 'group_category', 'group_year', 'teacher']
@@ -46,7 +61,7 @@ class GroupForm(forms.ModelForm):
             'group_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Солнышко'}),
             'group_category': forms.Select(attrs={'class': 'form-control'}),
             'group_year': forms.NumberInput(attrs={'class': 'form-control', 'min': '2020', 'max': '2030'}),
-            'teacher': forms.Select(attrs={'class': 'form-control'}),
+            'teacher': AutocompleteSelect('autocomplete_teachers', placeholder='Введите ФИО воспитателя...'),
         }
 class ParentForm(forms.ModelForm):
     class Meta:
@@ -56,17 +71,17 @@ class ParentForm(forms.ModelForm):
             'parent_fio': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Иванова Анна Сергеевна'}),
             'parent_number': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '+7-999-123-45-67'}),
         }
-class StudentParentForm(forms.ModelForm):
+class StudentParentForm(TenantFormMixin, forms.ModelForm):
     class Meta:
         model = StudentParent
         fields = '__all__'
         widgets = {
             'relationship_type': forms.Select(attrs={'class': 'form-control'}),
-            'student': forms.Select(attrs={'class': 'form-control'}),
-            'parent': forms.Select(attrs={'class': 'form-control'}),
+            'student': AutocompleteSelect('autocomplete_students', placeholder='Введите ФИО ученика...'),
+            'parent': AutocompleteSelect('autocomplete_parents', placeholder='Введите ФИО родителя...'),
             'is_primary': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
-class AttendanceForm(forms.ModelForm):
+class AttendanceForm(TenantFormMixin, forms.ModelForm):
     class Meta:
         model = Attendance
         fields = '__all__'
@@ -74,15 +89,15 @@ class AttendanceForm(forms.ModelForm):
             'attendance_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'status': forms.Select(choices=[(True, 'Присутствовал'), (False, 'Отсутствовал')], 
                                   attrs={'class': 'form-control'}),
-            'student': forms.Select(attrs={'class': 'form-control'}),
+            'student': AutocompleteSelect('autocomplete_students', placeholder='Введите ФИО ученика...'),
             'reason': forms.Select(attrs={'class': 'form-control'}),
-            'noted_by': forms.Select(attrs={'class': 'form-control'}),
+            'noted_by': AutocompleteSelect('autocomplete_teachers', placeholder='Введите ФИО воспитателя...'),
         }
-class AddChildToParentForm(forms.Form):
+class AddChildToParentForm(TenantFormMixin, forms.Form):
     student = forms.ModelChoiceField(
         queryset=Student.objects.all(),
         label='Ребенок',
-        widget=forms.Select(attrs={'class': 'form-control'})
+        widget=AutocompleteSelect('autocomplete_students', placeholder='Введите ФИО ребенка...')
     )
     relationship_type = forms.ChoiceField(
         choices=Parent.RELATIONSHIP_CHOICES,
@@ -95,11 +110,11 @@ class AddChildToParentForm(forms.Form):
         initial=True,
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
     )
-class AddParentToChildForm(forms.Form):
+class AddParentToChildForm(TenantFormMixin, forms.Form):
     parent = forms.ModelChoiceField(
         queryset=Parent.objects.all(),
         label='Родитель',
-        widget=forms.Select(attrs={'class': 'form-control'})
+        widget=AutocompleteSelect('autocomplete_parents', placeholder='Введите ФИО родителя...')
     )
     relationship_type = forms.ChoiceField(
         choices=Parent.RELATIONSHIP_CHOICES,
@@ -111,4 +126,106 @@ class AddParentToChildForm(forms.Form):
         required=False,
         initial=True,
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
-    )
\ No newline at end of file
+    )
+class AttendanceImportForm(forms.Form):
+    file = forms.FileField(
+        label='Файл журнала (CSV или XLSX)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    dry_run = forms.BooleanField(
+        label='Только проверить, не сохранять',
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    errors_as_csv = forms.BooleanField(
+        label='Скачать отчет об ошибках файлом CSV',
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise ValidationError('Поддерживаются только файлы CSV и XLSX')
+        return upload
+class StudentImportForm(AttendanceImportForm):
+    file = forms.FileField(
+        label='Список зачисления (CSV или XLSX)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+class AccountImportForm(AttendanceImportForm):
+    file = forms.FileField(
+        label='Список учетных записей (CSV или XLSX)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+class GroupRolloverForm(TenantFormMixin, forms.Form):
+    to_year = forms.IntegerField(
+        label='Новый учебный год (год начала)',
+        initial=current_school_year,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': '2020', 'max': '2100'})
+    )
+    graduation_date = forms.DateField(
+        label='Дата выпуска подготовительных групп',
+        initial=date.today,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+    groups = forms.ModelMultipleChoiceField(
+        label='Группы',
+        queryset=Group.objects.order_by('group_name'),
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
+    )
+    dry_run = forms.BooleanField(
+        label='Только предпросмотр, не сохранять',
+        required=False,
+        initial=True,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+class StudentTransferForm(TenantFormMixin, forms.Form):
+    students = forms.ModelMultipleChoiceField(
+        label='Ученики',
+        queryset=Student.objects.none(),
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
+    )
+    target_group = forms.ModelChoiceField(
+        label='Перевести в группу',
+        queryset=Group.objects.order_by('group_name'),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    dry_run = forms.BooleanField(
+        label='Только предпросмотр, не сохранять',
+        required=False,
+        initial=True,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    def __init__(self, *args, source_group=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Выпущенных учеников не переводим
+        students = Student.objects.filter(student_date_out__isnull=True).order_by('student_fio')
+        if source_group is not None:
+            students = students.filter(group=source_group)
+        self.fields['students'].queryset = students
+class GroupClosureForm(TenantFormMixin, forms.ModelForm):
+    class Meta:
+        model = GroupClosure
+        fields = ['group', 'date_from', 'date_to', 'reason', 'comment']
+        widgets = {
+            'group': forms.Select(attrs={'class': 'form-control'}),
+            'date_from': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'date_to': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'reason': forms.Select(attrs={'class': 'form-control'}),
+            'comment': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Карантин по ветряной оспе'}),
+        }
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'].empty_label = 'Весь детский сад'
+class CalendarDayForm(forms.ModelForm):
+    class Meta:
+        model = CalendarDay
+        fields = ['day', 'is_school_day', 'note']
+        widgets = {
+            'day': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'is_school_day': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+            'note': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'День народного единства'}),
+        }
+    def validate_unique(self):
+        # Дата уже есть в календаре почти всегда: форма меняет существующий день, а не создает новый
+        pass
@@ -0,0 +1,39 @@
+# Периодические задачи планировщика (manage.py run_scheduler). Время запуска - по TIME_ZONE проекта
+from datetime import date, time, timedelta
+from django.utils import timezone
+from .models import JobRun
+from .scheduler import job, run_command
+from .school_calendar import ensure_calendar
+from .snapshots import build_snapshots
+from .tenancy import active_tenants, each_tenant
+JOB_HISTORY_DAYS = 90
+@job('report_snapshots', at=time(1, 0))
+def report_snapshots():
+    output = []
+    for tenant in each_tenant():
+        built = build_snapshots()
+        output.append(f'{tenant.name}: ' + ', '.join(f'{kind} - {count}' for kind, count in built.items()))
+    return '\n'.join(output)
+@job('archive_history', at=time(2, 0), lease=timedelta(hours=6))
+def archive_history():
+    # Пауза между пачками, чтобы ночной перенос не мешал отчетам на реплике
+    return run_command('archive_history', pause=0.05)
+@job('clear_sessions', at=time(3, 0))
+def clear_sessions():
+    return run_command('clearsessions')
+@job('group_occupancy', at=time(3, 30))
+def group_occupancy():
+    return run_command('reconcile_group_occupancy', fix=True)
+@job('school_calendar', every=timedelta(days=7))
+def school_calendar():
+    # Календарь на год вперед, чтобы праздники и переносы можно было отметить заранее
+    today = date.today()
+    # Календарь хранится в каждой БД садов: достаточно одного сада на БД
+    databases = {tenant.database: tenant for tenant in active_tenants()}
+    for _ in each_tenant(list(databases.values())):
+        ensure_calendar(today, today + timedelta(days=365))
+    return f'Календарь заполнен по {today + timedelta(days=365):%d.%m.%Y}'
+@job('scheduler_history', at=time(4, 0))
+def scheduler_history():
+    deleted, _ = JobRun.objects.filter(started_at__lt=timezone.now() - timedelta(days=JOB_HISTORY_DAYS)).delete()
+    return f'Удалено старых запусков: {deleted}'
@@ -0,0 +1,92 @@
+# Pub/sub для живых дашбордов (SSE). По умолчанию события раздаются подписчикам внутри процесса;
+# с LIVE_EVENTS_PG_NOTIFY на PostgreSQL публикация идет через pg_notify, а фоновый поток каждого
+# процесса слушает канал, так что дашборд получает отметки, сделанные в любом воркере.
+import asyncio
+import json
+import logging
+import threading
+from django.conf import settings
+from django.db import connection, transaction
+from .tenancy import tenant_database
+logger = logging.getLogger(__name__)
+PG_CHANNEL = 'kindergarten_live'
+SUBSCRIBER_QUEUE_SIZE = 100
+RESYNC = {'type': 'resync'}
+class Subscriber:
+    def __init__(self, channel):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    def deliver(self, event):
+        # Вызывается в потоке event loop подписчика
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: просим его перечитать дашборд целиком
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._listener = None
+    def subscribe(self, channel):
+        subscriber = Subscriber(channel)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        if use_pg_notify():
+            self._ensure_listener()
+        return subscriber
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    def dispatch(self, channel, event):
+        """Раздает событие подписчикам этого процесса; безопасно вызывать из любого потока."""
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.channel == channel]
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                self.unsubscribe(subscriber)
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name='live-events-listener', daemon=True)
+            self._listener.start()
+    def _listen(self):
+        import psycopg
+        params = connection.settings_dict
+        conninfo = psycopg.conninfo.make_conninfo(
+            dbname=params['NAME'], user=params['USER'], password=params['PASSWORD'],
+            host=params['HOST'], port=params['PORT'],
+        )
+        try:
+            with psycopg.connect(conninfo, autocommit=True) as listen_connection:
+                listen_connection.execute(f'LISTEN {PG_CHANNEL}')
+                for notify in listen_connection.notifies():
+                    message = json.loads(notify.payload)
+                    self.dispatch(message['channel'], message['event'])
+        except Exception:
+            logger.exception('Прослушивание канала %s остановлено', PG_CHANNEL)
+broker = Broker()
+def use_pg_notify():
+    return getattr(settings, 'LIVE_EVENTS_PG_NOTIFY', False) and connection.vendor == 'postgresql'
+def publish(channel, event):
+    """Публикует событие после фиксации текущей транзакции."""
+    using = tenant_database()
+    if use_pg_notify():
+        if using is None:
+            # NOTIFY доставляется слушателям только при COMMIT, отдельный on_commit не нужен
+            notify(channel, event)
+        else:
+            # Отметка сада из отдельной БД фиксируется там, а канал слушается в основной БД
+            transaction.on_commit(lambda: notify(channel, event), using=using)
+    else:
+        transaction.on_commit(lambda: broker.dispatch(channel, event), using=using)
+def notify(channel, event):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [PG_CHANNEL, json.dumps({'channel': channel, 'event': event})])
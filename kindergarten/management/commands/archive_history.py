@@ -0,0 +1,52 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+from kindergarten.archive import (
+    ATTENDANCE_BATCH_SIZE, STUDENTS_BATCH_SIZE, archivable_school_years,
+    archive_attendance_year, archive_cutoff, archive_graduates,
+)
+from kindergarten.school_year import school_year_start
+from kindergarten.models import Attendance, Student
+from kindergarten.tenancy import add_tenant_argument, command_tenants, each_tenant
+class Command(BaseCommand):
+    help = 'Переносит посещаемость закрытых учебных лет и выпускников в архивные таблицы'
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-years', type=int, default=1,
+                            help='Сколько последних закрытых учебных лет оставить в рабочих таблицах (по умолчанию 1)')
+        parser.add_argument('--batch-size', type=int, default=ATTENDANCE_BATCH_SIZE, help='Отметок в одной транзакции')
+        parser.add_argument('--students-batch-size', type=int, default=STUDENTS_BATCH_SIZE, help='Выпускников в одной транзакции')
+        parser.add_argument('--pause', type=float, default=0, help='Пауза между пачками, секунд')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет перенесено')
+        add_tenant_argument(parser)
+    def handle(self, *args, **options):
+        if options['keep_years'] < 0 or options['batch_size'] < 1 or options['students_batch_size'] < 1:
+            raise CommandError('--keep-years не может быть отрицательным, размер пачки должен быть больше нуля')
+        cutoff = archive_cutoff(keep_years=options['keep_years'])
+        self.stdout.write(f'Архивируются данные до {cutoff:%d.%m.%Y}')
+        for tenant in each_tenant(command_tenants(options['tenant'])):
+            self.stdout.write(f'{tenant.name}:')
+            self.archive(cutoff, options)
+    def archive(self, cutoff, options):
+        years = archivable_school_years(cutoff)
+        if options['dry_run']:
+            for year in years:
+                count = Attendance.objects.filter(
+                    attendance_date__gte=school_year_start(year), attendance_date__lt=school_year_start(year + 1)
+                ).count()
+                self.stdout.write(f'{year}/{year + 1}: отметок {count}')
+            # После переноса отметок у выпускников останутся только отметки начиная с cutoff
+            graduates = Student.objects.filter(student_date_out__lt=cutoff).exclude(
+                Exists(Attendance.objects.filter(student=OuterRef('pk'), attendance_date__gte=cutoff))
+            )
+            self.stdout.write(f'Выпускников: {graduates.count()}')
+            return
+        started = time.perf_counter()
+        total = 0
+        for year in years:
+            moved = archive_attendance_year(year, batch_size=options['batch_size'], pause=options['pause'])
+            self.stdout.write(f'{year}/{year + 1}: перенесено отметок {moved}')
+            total += moved
+        graduates = archive_graduates(cutoff, batch_size=options['students_batch_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено отметок: {total}, выпускников: {graduates}. Время: {time.perf_counter() - started:.2f} с'
+        ))
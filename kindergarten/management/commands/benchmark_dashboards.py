@@ -0,0 +1,59 @@
+import asyncio
+import statistics
+import time
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.urls import reverse
+from kindergarten.async_utils import gather_queries, run_queries
+from kindergarten.reports_utils import admin_dashboard_queries, build_admin_dashboard
+from kindergarten.views import api_stats_queries, build_api_stats
+class Command(BaseCommand):
+    help = 'Сравнивает задержку последовательной и параллельной (async) сборки дашбордов'
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Число замеров для каждого варианта')
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        today = date.today()
+        cases = [
+            ('Админ-дашборд', admin_dashboard_queries, build_admin_dashboard),
+            ('api/stats', api_stats_queries, build_api_stats),
+        ]
+        self.stdout.write(f'БД: {connections["default"].vendor}, замеров: {repeat}')
+        self.stdout.write(f'{"Дашборд":<16}{"sync, мс":>12}{"async, мс":>12}{"ускорение":>12}')
+        for title, queries, build in cases:
+            sync_ms = self.measure_sync(lambda: build(today, run_queries(queries(today))), repeat)
+            async_ms = asyncio.run(self.measure_async(queries, build, today, repeat))
+            speedup = sync_ms / async_ms if async_ms else 0
+            self.stdout.write(f'{title:<16}{sync_ms:>12.1f}{async_ms:>12.1f}{speedup:>11.2f}x')
+        asgi_ms = asyncio.run(self.measure_asgi(reverse('api_stats'), repeat))
+        self.stdout.write(f'GET {reverse("api_stats")} через ASGI-обработчик: {asgi_ms:.1f} мс (медиана)')
+    def measure_sync(self, func, repeat):
+        func()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+    async def measure_async(self, queries, build, today, repeat):
+        # Первый прогон открывает соединения в потоках пула, его не учитываем
+        build(today, await gather_queries(queries(today)))
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            build(today, await gather_queries(queries(today)))
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+    async def measure_asgi(self, url, repeat):
+        client = AsyncClient()
+        timings = []
+        with override_settings(ALLOWED_HOSTS=['*']):
+            await client.get(url)
+            for _ in range(repeat):
+                started = time.perf_counter()
+                await client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
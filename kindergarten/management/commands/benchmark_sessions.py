@@ -0,0 +1,60 @@
+import time
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import modify_settings, override_settings
+from django.urls import reverse
+MODES = [
+    ('db, сохранение на каждом запросе', 'django.contrib.sessions.backends.db', False),
+    ('db, продление по порогу', 'django.contrib.sessions.backends.db', True),
+    ('cached_db, продление по порогу', 'django.contrib.sessions.backends.cached_db', True),
+    ('signed_cookies, продление по порогу', 'django.contrib.sessions.backends.signed_cookies', True),
+]
+class SessionQueryCounter:
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+    def __call__(self, execute, sql, params, many, context):
+        if 'django_session' in sql:
+            if sql.lstrip().upper().startswith('SELECT'):
+                self.reads += 1
+            else:
+                self.writes += 1
+        return execute(sql, params, many, context)
+class Command(BaseCommand):
+    help = 'Сравнивает число обращений к django_session при опросе дашборда в разных режимах сессий'
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=960, help='Число запросов опроса (по умолчанию рабочий день)')
+        parser.add_argument('--interval', type=int, default=30, help='Интервал опроса в секундах')
+    def handle(self, *args, **options):
+        url = reverse('api_stats')
+        rows = []
+        with transaction.atomic():
+            user = User.objects.create_superuser('session_benchmark', password=None)
+            for title, engine, throttled in MODES:
+                rows.append((title, *self.run_mode(engine, throttled, user, url, options)))
+            transaction.set_rollback(True)
+        self.stdout.write(f'Запросов: {options["requests"]}, интервал {options["interval"]} с, URL {url}')
+        self.stdout.write(f'{"Режим":<40}{"сохранений":>12}{"SELECT":>10}{"INSERT/UPDATE":>15}')
+        for title, saves, reads, writes in rows:
+            self.stdout.write(f'{title:<40}{saves:>12}{reads:>10}{writes:>15}')
+    def run_mode(self, engine, throttled, user, url, options):
+        middleware = {'remove': [] if throttled else ['kindergarten.middleware.SessionRefreshMiddleware']}
+        with override_settings(SESSION_ENGINE=engine, SESSION_SAVE_EVERY_REQUEST=not throttled, ALLOWED_HOSTS=['*']), \
+                modify_settings(MIDDLEWARE=middleware):
+            client = Client()
+            client.force_login(user)
+            counter = SessionQueryCounter()
+            saves = 0
+            # Время двигаем искусственно, чтобы за один прогон увидеть продление сессии через сутки
+            clock = [int(time.time())]
+            with mock.patch('kindergarten.middleware.time.time', lambda: clock[0]), connection.execute_wrapper(counter):
+                for _ in range(options['requests']):
+                    response = client.get(url)
+                    if settings.SESSION_COOKIE_NAME in response.cookies:
+                        saves += 1
+                    clock[0] += options['interval']
+        return saves, counter.reads, counter.writes
@@ -0,0 +1,66 @@
+import statistics
+import time
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+PAGES = ['home', 'student_list', 'group_list', 'teacher_list', 'admin_group_report']
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# (название, cached loader, кэш навигации и роли)
+MODES = [
+    ('без кэширования', False, False),
+    ('cached loader', True, False),
+    ('cached loader + фрагменты', True, True),
+]
+class Command(BaseCommand):
+    help = 'Замеряет время отрисовки страниц с cached loader и кэшем навигации по роли и без них'
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Число запросов каждой страницы')
+    def handle(self, *args, **options):
+        rows = []
+        with transaction.atomic():
+            # Заведующий, а не суперпользователь: роль суперпользователя определяется без запросов к группам
+            user = User.objects.create_user('template_benchmark', password=None)
+            user.groups.add(Group.objects.get_or_create(name='Заведующие')[0])
+            for title, cached_loader, fragments in MODES:
+                rows.append((title, self.run_mode(user, cached_loader, fragments, options['repeat'])))
+            transaction.set_rollback(True)
+        self.stdout.write(f'Запросов на страницу: {options["repeat"]}, медиана в мс (запросов к БД)')
+        self.stdout.write(f'{"Режим":<28}' + ''.join(f'{page:>20}' for page in PAGES))
+        for title, results in rows:
+            cells = ''.join(f'{f"{ms:.2f} ({queries})":>20}' for ms, queries in results)
+            self.stdout.write(f'{title:<28}{cells}')
+    def run_mode(self, user, cached_loader, fragments, repeat):
+        templates = [{
+            **settings.TEMPLATES[0],
+            'OPTIONS': {
+                **settings.TEMPLATES[0]['OPTIONS'],
+                'loaders': [('django.template.loaders.cached.Loader', LOADERS)] if cached_loader else LOADERS,
+            },
+        }]
+        # Нулевой срок хранения выключает кэш: фрагмент и роль пересчитываются на каждом запросе
+        with override_settings(TEMPLATES=templates, ALLOWED_HOSTS=['*'], NAVIGATION_CACHE_SECONDS=3600 if fragments else 0), \
+                mock.patch('kindergarten.decorators.ROLE_CACHE_SECONDS', 300 if fragments else 0):
+            cache.clear()
+            client = Client()
+            client.force_login(user)
+            results = []
+            for page in PAGES:
+                url = reverse(page)
+                client.get(url)
+                timings = []
+                for _ in range(repeat):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        client.get(url)
+                        timings.append((time.perf_counter() - started) * 1000)
+                results.append((statistics.median(timings), len(queries)))
+        return results
@@ -0,0 +1,28 @@
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from kindergarten.snapshots import SCOPES, build_snapshots
+from kindergarten.tenancy import add_tenant_argument, command_tenants, each_tenant
+class Command(BaseCommand):
+    help = 'Строит ночные снимки отчетов (сад, воспитатели, группы) по вчерашний день включительно'
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Последний день в снимке, ГГГГ-ММ-ДД (по умолчанию вчера)')
+        parser.add_argument('--kind', action='append', choices=list(SCOPES),
+                            help='Строить только снимки этого вида (можно указать несколько раз)')
+        add_tenant_argument(parser)
+    def handle(self, *args, **options):
+        as_of = date.today() - timedelta(days=1)
+        if options['as_of']:
+            try:
+                as_of = date.fromisoformat(options['as_of'])
+            except ValueError:
+                raise CommandError('--as-of должен быть датой в формате ГГГГ-ММ-ДД')
+        if as_of >= date.today():
+            raise CommandError('Снимок строится только по завершенным дням: --as-of должен быть раньше сегодняшнего дня')
+        for tenant in each_tenant(command_tenants(options['tenant'])):
+            started = time.perf_counter()
+            built = build_snapshots(as_of, options['kind'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.name}, снимки по {as_of:%d.%m.%Y}: ' + ', '.join(f'{kind} - {count}' for kind, count in built.items())
+                + f'. Время: {time.perf_counter() - started:.2f} с'
+            ))
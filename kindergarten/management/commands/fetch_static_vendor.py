@@ -0,0 +1,52 @@
+import os
+import re
+import urllib.request
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+# (пакет npm@версия, путь в пакете, путь в kindergarten/static/vendor)
+VENDOR_ASSETS = [
+    ('bootstrap@5.1.3', 'dist/css/bootstrap.min.css', 'bootstrap/bootstrap.min.css'),
+    ('bootstrap@5.1.3', 'dist/js/bootstrap.min.js', 'bootstrap/bootstrap.min.js'),
+    # Popper той же версии, что собрана в bootstrap.bundle 5.1.3
+    ('@popperjs/core@2.10.2', 'dist/umd/popper.min.js', 'popper/popper.min.js'),
+    ('bootstrap-icons@1.13.1', 'font/bootstrap-icons.min.css', 'bootstrap-icons/bootstrap-icons.min.css'),
+    ('bootstrap-icons@1.13.1', 'font/fonts/bootstrap-icons.woff2', 'bootstrap-icons/fonts/bootstrap-icons.woff2'),
+    ('bootstrap-icons@1.13.1', 'font/fonts/bootstrap-icons.woff', 'bootstrap-icons/fonts/bootstrap-icons.woff'),
+    ('@fortawesome/fontawesome-free@6.5.1', 'css/all.min.css', 'fontawesome/css/all.min.css'),
+    *[
+        ('@fortawesome/fontawesome-free@6.5.1', f'webfonts/{font}.{ext}', f'fontawesome/webfonts/{font}.{ext}')
+        for font in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+        for ext in ('woff2', 'ttf')
+    ],
+    ('chart.js@4.4.0', 'dist/chart.umd.js', 'chart.js/chart.umd.js'),
+]
+# Карты исходников не поставляем, а ссылка на отсутствующий файл ломает collectstatic с manifest
+SOURCE_MAP_RE = re.compile(rb'\n?(/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S+)\s*$')
+class Command(BaseCommand):
+    help = 'Скачивает сторонние CSS/JS/шрифты в kindergarten/static/vendor для работы без доступа к CDN'
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Перекачать уже скачанные файлы')
+        parser.add_argument('--registry', default='https://cdn.jsdelivr.net/npm', help='Адрес зеркала npm-пакетов')
+    def handle(self, *args, **options):
+        vendor_dir = os.path.join(settings.BASE_DIR, 'kindergarten', 'static', 'vendor')
+        downloaded = 0
+        for package, source, target in VENDOR_ASSETS:
+            path = os.path.join(vendor_dir, target)
+            if os.path.exists(path) and not options['force']:
+                continue
+            url = f"{options['registry'].rstrip('/')}/{package}/{source}"
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    content = response.read()
+            except OSError as e:
+                raise CommandError(f'Не удалось скачать {url}: {e}')
+            if target.endswith(('.css', '.js')):
+                content = SOURCE_MAP_RE.sub(b'\n', content)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            downloaded += 1
+            self.stdout.write(f'{target}: {len(content) // 1024} КБ')
+        self.stdout.write(self.style.SUCCESS(
+            f'Скачано файлов: {downloaded}, всего в vendor: {len(VENDOR_ASSETS)}. Далее: manage.py collectstatic'
+        ))
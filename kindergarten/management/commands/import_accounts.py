@@ -0,0 +1,49 @@
+import os
+import time
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from kindergarten.account_import import AccountImporter, read_accounts
+from kindergarten.tenancy import add_tenant_argument, command_tenant, use_tenant
+class Command(BaseCommand):
+    help = 'Создает учетные записи родителей и воспитателей по списку в формате CSV или XLSX'
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .csv или .xlsx')
+        parser.add_argument('--credentials', help='Куда сохранить CSV с логинами и паролями (обязательно без --dry-run)')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить файл, ничего не сохранять')
+        parser.add_argument('--errors', help='Сохранить отчет об ошибках в CSV-файл (по умолчанию вывод в консоль)')
+        add_tenant_argument(parser)
+    def handle(self, *args, **options):
+        if not options['dry_run'] and not options['credentials']:
+            raise CommandError('Укажите --credentials: пароли новых учетных записей больше нигде не сохраняются')
+        with use_tenant(command_tenant(options['tenant'])):
+            self.import_accounts(options)
+    def import_accounts(self, options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as accounts:
+                report = AccountImporter().run(
+                    read_accounts(accounts, os.path.basename(options['path'])), dry_run=options['dry_run']
+                )
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть файл: {e}')
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        elapsed = time.perf_counter() - started
+        if report.errors:
+            if options['errors']:
+                with open(options['errors'], 'w', newline='', encoding='utf-8-sig') as errors_file:
+                    report.write_errors(errors_file)
+                self.stdout.write(self.style.WARNING(f'Ошибок: {len(report.errors)}, отчет сохранен в {options["errors"]}'))
+            else:
+                report.write_errors(self.stdout)
+            raise CommandError(f'Строк: {report.rows}, ошибок: {len(report.errors)}. Учетные записи не созданы')
+        if report.credentials:
+            with open(options['credentials'], 'w', newline='', encoding='utf-8-sig') as credentials_file:
+                report.write_credentials(credentials_file)
+        action = 'Будет создано' if report.dry_run else 'Создано'
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {report.rows}. {action} учетных записей: {report.accounts_created}, новых профилей '
+            f'{report.profiles_created}, для существующих профилей {report.profiles_linked}. Время: {elapsed:.2f} с'
+        ))
+        if report.credentials:
+            self.stdout.write(f'Логины и пароли сохранены в {options["credentials"]}')
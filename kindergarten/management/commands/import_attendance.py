@@ -0,0 +1,46 @@
+import os
+import time
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from kindergarten.attendance_import import AttendanceImporter, read_register
+from kindergarten.models import Student, Teacher
+from kindergarten.tenancy import add_tenant_argument, command_tenant, use_tenant
+class Command(BaseCommand):
+    help = 'Загружает отметки посещаемости из журнала в формате CSV или XLSX'
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .csv или .xlsx')
+        parser.add_argument('--teacher', type=int, help='ID воспитателя, который отметил посещаемость')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить файл, ничего не сохранять')
+        parser.add_argument('--errors', help='Сохранить отчет об ошибках в CSV-файл (по умолчанию вывод в консоль)')
+        add_tenant_argument(parser)
+    def handle(self, *args, **options):
+        with use_tenant(command_tenant(options['tenant'])):
+            self.import_register(options)
+    def import_register(self, options):
+        noted_by = None
+        if options['teacher'] is not None:
+            noted_by = Teacher.objects.filter(pk=options['teacher']).first()
+            if noted_by is None:
+                raise CommandError(f'Воспитатель с ID {options["teacher"]} не найден')
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as register:
+                report = AttendanceImporter(Student.objects.all(), noted_by=noted_by).run(
+                    read_register(register, os.path.basename(options['path'])), dry_run=options['dry_run']
+                )
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть файл: {e}')
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        elapsed = time.perf_counter() - started
+        if report.errors:
+            if options['errors']:
+                with open(options['errors'], 'w', newline='', encoding='utf-8-sig') as errors_file:
+                    report.write_errors(errors_file)
+                self.stdout.write(self.style.WARNING(f'Ошибок: {len(report.errors)}, отчет сохранен в {options["errors"]}'))
+            else:
+                report.write_errors(self.stdout)
+        action = 'Проверено без ошибок' if report.dry_run else 'Загружено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {report.rows}. {action}: {report.imported}. Ошибок: {len(report.errors)}. Время: {elapsed:.2f} с'
+        ))
@@ -0,0 +1,41 @@
+import os
+import time
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from kindergarten.student_import import StudentImporter, read_roster
+from kindergarten.tenancy import add_tenant_argument, command_tenant, use_tenant
+class Command(BaseCommand):
+    help = 'Зачисляет учеников и их родителей из списка в формате CSV или XLSX'
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .csv или .xlsx')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить файл, ничего не сохранять')
+        parser.add_argument('--errors', help='Сохранить отчет об ошибках в CSV-файл (по умолчанию вывод в консоль)')
+        add_tenant_argument(parser)
+    def handle(self, *args, **options):
+        with use_tenant(command_tenant(options['tenant'])):
+            self.import_roster(options)
+    def import_roster(self, options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as roster:
+                report = StudentImporter().run(
+                    read_roster(roster, os.path.basename(options['path'])), dry_run=options['dry_run']
+                )
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть файл: {e}')
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        elapsed = time.perf_counter() - started
+        if report.errors:
+            if options['errors']:
+                with open(options['errors'], 'w', newline='', encoding='utf-8-sig') as errors_file:
+                    report.write_errors(errors_file)
+                self.stdout.write(self.style.WARNING(f'Ошибок: {len(report.errors)}, отчет сохранен в {options["errors"]}'))
+            else:
+                report.write_errors(self.stdout)
+        action = 'Будет добавлено' if report.dry_run else 'Добавлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {report.rows}. {action}: учеников {report.students_created}, родителей {report.parents_created}, '
+            f'связей {report.links_created}. Уже в базе: учеников {report.students_existing}, '
+            f'родителей {report.parents_existing}. Ошибок: {len(report.errors)}. Время: {elapsed:.2f} с'
+        ))
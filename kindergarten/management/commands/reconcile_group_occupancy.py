@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from kindergarten.models import Group
+from kindergarten.tenancy import add_tenant_argument, command_tenants, each_tenant, tenant_atomic
+class Command(BaseCommand):
+    help = 'Сверяет счетчик Group.students_count с фактическим числом активных учеников'
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Исправить расхождения')
+        add_tenant_argument(parser)
+    def handle(self, *args, **options):
+        for tenant in each_tenant(command_tenants(options['tenant'])):
+            self.stdout.write(f'{tenant.name}:')
+            self.reconcile(options['fix'])
+    def reconcile(self, fix):
+        groups = Group.objects.annotate(
+            actual_count=Count('student', filter=Q(student__student_date_out__isnull=True))
+        ).order_by('group_name')
+        mismatches = [group for group in groups if group.students_count != group.actual_count]
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS(f'Счетчики всех групп ({len(groups)}) совпадают'))
+            return
+        for group in mismatches:
+            self.stdout.write(
+                f'{group.group_name}: счетчик {group.students_count}, фактически {group.actual_count}'
+            )
+        if not fix:
+            self.stdout.write(self.style.WARNING(
+                f'Найдено расхождений: {len(mismatches)}. Запустите с --fix для исправления'
+            ))
+            return
+        with tenant_atomic():
+            for group in mismatches:
+                # Пересчитываем под блокировкой строки, чтобы не затереть параллельное зачисление
+                locked = Group.objects.select_for_update().get(pk=group.pk)
+                actual = locked.student_set.filter(student_date_out__isnull=True).count()
+                Group.objects.filter(pk=locked.pk).update(students_count=actual)
+        self.stdout.write(self.style.SUCCESS(f'Исправлено групп: {len(mismatches)}'))
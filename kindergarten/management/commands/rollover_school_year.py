@@ -0,0 +1,30 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from kindergarten.models import Group
+from kindergarten.rollover import rollover_groups
+from kindergarten.school_year import current_school_year
+from kindergarten.tenancy import add_tenant_argument, command_tenant, use_tenant
+class Command(BaseCommand):
+    help = 'Переводит группы в новый учебный год: повышает категорию, выпускает подготовительные группы'
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=None, help='Год начала нового учебного года (по умолчанию текущий)')
+        parser.add_argument('--graduation-date', type=date.fromisoformat, default=None,
+                            help='Дата выпуска подготовительных групп, ГГГГ-ММ-ДД (по умолчанию сегодня)')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет изменено')
+        add_tenant_argument(parser)
+    def handle(self, *args, **options):
+        with use_tenant(command_tenant(options['tenant'])):
+            self.rollover(options)
+    def rollover(self, options):
+        to_year = options['year'] or current_school_year()
+        plan = rollover_groups(
+            list(Group.objects.filter(group_year__lt=to_year).values_list('pk', flat=True)), to_year,
+            graduation_date=options['graduation_date'], dry_run=options['dry_run'],
+        )
+        for change in plan.changes:
+            self.stdout.write(
+                f'{change["group"].group_name}: {change["from_category"]} -> {change["to_category"]}, '
+                f'{change["from_year"]} -> {change["to_year"]}, учеников {change["students"]}, выпускников {change["graduates"]}'
+            )
+        action = 'Будет переведено' if plan.dry_run else 'Переведено'
+        self.stdout.write(self.style.SUCCESS(f'{action} групп: {len(plan.changes)} в {to_year}/{to_year + 1} учебный год'))
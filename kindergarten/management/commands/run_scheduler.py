@@ -0,0 +1,66 @@
+import signal
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from kindergarten import jobs  # noqa: F401 - регистрирует задачи
+from kindergarten.models import JobRun
+from kindergarten.scheduler import JOBS, NODE, run_due_jobs, run_job
+class Command(BaseCommand):
+    help = 'Планировщик периодических задач (задачи объявлены в kindergarten/jobs.py)'
+    def add_arguments(self, parser):
+        parser.add_argument('--tick', type=float, default=30, help='Интервал проверки сроков задач, секунд')
+        parser.add_argument('--once', action='store_true', help='Выполнить задачи, у которых подошел срок, и выйти')
+        parser.add_argument('--run', metavar='JOB', help='Выполнить задачу сейчас, не дожидаясь срока, и выйти')
+        parser.add_argument('--list', action='store_true', help='Показать задачи, последний запуск и следующий срок')
+    def handle(self, *args, **options):
+        if options['tick'] <= 0:
+            raise CommandError('--tick должен быть больше нуля')
+        if options['list']:
+            self.list_jobs()
+            return
+        if options['run']:
+            job = JOBS.get(options['run'])
+            if job is None:
+                raise CommandError(f'Нет задачи {options["run"]}. Задачи: {", ".join(JOBS)}')
+            run = run_job(job, force=True)
+            if run is None:
+                raise CommandError(f'Задачу {job.name} сейчас выполняет другой процесс')
+            self.report(run)
+            return
+        stopping = []
+        def stop(signum, frame):
+            # Текущая задача доработает, новые не запускаются
+            stopping.append(signum)
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.stdout.write(f'Планировщик {NODE}: задач {len(JOBS)}, проверка каждые {options["tick"]:g} с')
+        while not stopping:
+            close_old_connections()
+            for run in run_due_jobs():
+                self.report(run)
+            if options['once']:
+                break
+            deadline = time.monotonic() + options['tick']
+            while not stopping and time.monotonic() < deadline:
+                time.sleep(min(1, options['tick']))
+        self.stdout.write('Планировщик остановлен')
+    def report(self, run):
+        line = f'{run.job}: {run.get_status_display()} за {run.duration:.2f} с'
+        if run.status == 'success':
+            self.stdout.write(self.style.SUCCESS(line))
+        else:
+            self.stderr.write(self.style.ERROR(f'{line}\n{run.output}'))
+    def list_jobs(self):
+        now = timezone.now()
+        for job in JOBS.values():
+            last = JobRun.objects.filter(job=job.name).first()
+            if last is None:
+                history = 'не запускалась'
+            else:
+                history = f'последний запуск {timezone.localtime(last.started_at):%d.%m.%Y %H:%M} - {last.get_status_display()}'
+                if last.duration is not None:
+                    history += f' за {last.duration:.2f} с'
+            next_run = job.next_run(now, last.started_at if last else None)
+            when = 'сейчас' if next_run <= now else f'{timezone.localtime(next_run):%d.%m.%Y %H:%M}'
+            self.stdout.write(f'{job.name} ({job.describe()}): {history}; следующий - {when}')
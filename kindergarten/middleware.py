@@ -0,0 +1,152 @@
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import logout
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotFound, HttpResponseNotModified
+from django.http.request import split_domain_port
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from .models import Kindergarten, KindergartenMember
+from .tenancy import abind_tenant, bind_tenant, reset_current_tenant, set_current_tenant
+SESSION_REFRESHED_KEY = '_refreshed_at'
+class SessionRefreshMiddleware:
+    """
+    Продлевает сессию не на каждом запросе, а только когда до истечения осталось
+    меньше SESSION_REFRESH_THRESHOLD секунд. Заменяет SESSION_SAVE_EVERY_REQUEST,
+    который делал UPDATE django_session на каждый просмотр страницы и опрос API.
+    Должен стоять после SessionMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is None or session.is_empty() or session.get_expire_at_browser_close():
+            return response
+        now = int(time.time())
+        refreshed_at = session.get(SESSION_REFRESHED_KEY, 0)
+        remaining = refreshed_at + session.get_expiry_age() - now
+        # Если сессия и так сохраняется (вход, сообщения), просто фиксируем момент продления
+        if session.modified or remaining < settings.SESSION_REFRESH_THRESHOLD:
+            session[SESSION_REFRESHED_KEY] = now
+        return response
+# Файлы с хешем содержимого в имени не меняются никогда
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+STATIC_MAX_AGE = 3600
+PRECOMPRESSED_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+class StaticAssetMiddleware:
+    """
+    Отдает файлы из STATIC_ROOT без обращения к представлениям: выбирает предсжатую
+    копию (.br/.gz, собирается collectstatic) по Accept-Encoding и ставит долгий
+    Cache-Control на файлы с хешем в имени. Должен стоять до SessionMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        self.root = settings.STATIC_ROOT
+        # Манифест читается один раз при старте процесса, после collectstatic нужен перезапуск
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+    def __call__(self, request):
+        path = self.find_file(request)
+        if path is None:
+            return self.get_response(request)
+        return self.serve(request, path)
+    def find_file(self, request):
+        if not self.root or request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        try:
+            path = safe_join(self.root, request.path_info[len(self.prefix):])
+        except SuspiciousFileOperation:
+            return None
+        return path if os.path.isfile(path) else None
+    def serve(self, request, path):
+        name = os.path.relpath(path, self.root).replace(os.sep, '/')
+        mtime = os.stat(path).st_mtime
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime):
+            response = HttpResponseNotModified()
+        else:
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            encoding, served_path = self.choose_encoding(request, path)
+            response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+            # FileResponse подставляет имя .gz/.br файла, браузеру оно ни к чему
+            del response['Content-Disposition']
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(mtime)
+        if name in self.hashed_names:
+            response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+    def choose_encoding(self, request, path):
+        accept_encoding = request.headers.get('Accept-Encoding', '')
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if re.search(rf'\b{encoding}\b', accept_encoding) and os.path.isfile(path + suffix):
+                return encoding, path + suffix
+        return None, path
+TENANT_SESSION_KEY = '_kindergarten_id'
+TENANT_CACHE_SECONDS = 60
+def tenant_cache_key(domain):
+    return f'tenant_domain:{domain}'
+def resolve_tenant(request):
+    """Сад по домену запроса; если домен не привязан - settings.DEFAULT_TENANT или единственный сад установки."""
+    domain = split_domain_port(request.get_host())[0]
+    tenant = cache.get(tenant_cache_key(domain))
+    if tenant is None:
+        tenants = Kindergarten.objects.filter(is_active=True)
+        tenant = tenants.filter(domain=domain).first()
+        if tenant is None and getattr(settings, 'DEFAULT_TENANT', ''):
+            tenant = tenants.filter(slug=settings.DEFAULT_TENANT).first()
+        if tenant is None:
+            single = list(tenants[:2])
+            tenant = single[0] if len(single) == 1 else None
+        # Отсутствие сада тоже кэшируем, чтобы перебор доменов не нагружал БД
+        cache.set(tenant_cache_key(domain), tenant or False, TENANT_CACHE_SECONDS)
+    return tenant or None
+class TenantMiddleware:
+    """
+    Определяет детский сад запроса (request.tenant) и выбирает его на время обработки: менеджеры моделей
+    отбирают только его строки, TenantRouter ведет запросы в его БД. Пользователей других садов разлогинивает.
+    Должен стоять после AuthenticationMiddleware и MessageMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+    def __call__(self, request):
+        tenant = resolve_tenant(request)
+        if tenant is None:
+            return HttpResponseNotFound('Детский сад не найден')
+        request.tenant = tenant
+        token = set_current_tenant(tenant)
+        try:
+            self.check_membership(request, tenant)
+            response = self.get_response(request)
+        finally:
+            reset_current_tenant(token)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = abind_tenant(response.streaming_content, tenant)
+            else:
+                response.streaming_content = bind_tenant(response.streaming_content, tenant)
+        return response
+    def check_membership(self, request, tenant):
+        user = request.user
+        if not user.is_authenticated or user.is_superuser:
+            return
+        # Проверка раз в сессию: id проверенного сада хранится в сессии
+        if request.session.get(TENANT_SESSION_KEY) == tenant.pk:
+            return
+        if KindergartenMember.objects.filter(user_id=user.pk).exists():
+            request.session[TENANT_SESSION_KEY] = tenant.pk
+            return
+        logout(request)
+        messages.error(request, 'Ваша учетная запись не относится к этому детскому саду')
@@ -0,0 +1,137 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0003_remove_event_groups_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Схема БД уже соответствует моделям (таблицы переименованы вручную, см. 0003),
+    # поэтому здесь только приводим состояние миграций к моделям, не трогая базу.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='event',
+                    name='groups',
+                ),
+                migrations.RenameIndex(
+                    model_name='attendance',
+                    new_name='attendance_student_41c3e6_idx',
+                    old_name='kindergarte_student_61438d_idx',
+                ),
+                migrations.RenameIndex(
+                    model_name='attendance',
+                    new_name='attendance_atd_dat_659e30_idx',
+                    old_name='kindergarte_attenda_46f770_idx',
+                ),
+                migrations.RenameIndex(
+                    model_name='attendance',
+                    new_name='attendance_student_e7191e_idx',
+                    old_name='kindergarte_student_7c0fd0_idx',
+                ),
+                migrations.RenameIndex(
+                    model_name='group',
+                    new_name='groups_group_c_962945_idx',
+                    old_name='kindergarte_group_c_e33c42_idx',
+                ),
+                migrations.RenameIndex(
+                    model_name='group',
+                    new_name='groups_teacher_4bd0b3_idx',
+                    old_name='kindergarte_teacher_470207_idx',
+                ),
+                migrations.RenameIndex(
+                    model_name='parent',
+                    new_name='parents_parent__072b7b_idx',
+                    old_name='kindergarte_parent__aa396b_idx',
+                ),
+                migrations.RenameIndex(
+                    model_name='student',
+                    new_name='students_group_i_93cdb1_idx',
+                    old_name='kindergarte_group_i_7a1ee7_idx',
+                ),
+                migrations.RenameIndex(
+                    model_name='student',
+                    new_name='students_student_052756_idx',
+                    old_name='kindergarte_student_18c899_idx',
+                ),
+                migrations.RenameIndex(
+                    model_name='teacher',
+                    new_name='teachers_teacher_35b767_idx',
+                    old_name='kindergarte_teacher_f2c45c_idx',
+                ),
+                migrations.RemoveField(
+                    model_name='group',
+                    name='max_capacity',
+                ),
+                migrations.RemoveField(
+                    model_name='group',
+                    name='room_number',
+                ),
+                migrations.AlterField(
+                    model_name='attendance',
+                    name='attendance_date',
+                    field=models.DateField(db_column='atd_date', db_index=True, verbose_name='Дата посещения'),
+                ),
+                migrations.AlterField(
+                    model_name='attendance',
+                    name='attendance_id',
+                    field=models.AutoField(db_column='atd_id', primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='attendance',
+                    name='status',
+                    field=models.BooleanField(choices=[(True, 'Присутствовал'), (False, 'Отсутствовал')], db_column='atd_status', db_index=True, verbose_name='Статус'),
+                ),
+                migrations.AlterField(
+                    model_name='parent',
+                    name='user',
+                    field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='parent_profile', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+                ),
+                migrations.AlterField(
+                    model_name='teacher',
+                    name='teacher_position',
+                    field=models.CharField(choices=[('Младший воспитатель', 'Младший воспитатель'), ('Воспитатель', 'Воспитатель'), ('Старший воспитатель', 'Старший воспитатель')], db_index=True, default='Воспитатель', max_length=50, verbose_name='Должность'),
+                ),
+                migrations.AlterField(
+                    model_name='teacher',
+                    name='user',
+                    field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='teacher_profile', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+                ),
+                migrations.AlterModelTable(
+                    name='attendance',
+                    table='attendance',
+                ),
+                migrations.AlterModelTable(
+                    name='group',
+                    table='groups',
+                ),
+                migrations.AlterModelTable(
+                    name='parent',
+                    table='parents',
+                ),
+                migrations.AlterModelTable(
+                    name='student',
+                    table='students',
+                ),
+                migrations.AlterModelTable(
+                    name='studentparent',
+                    table='student_parents',
+                ),
+                migrations.AlterModelTable(
+                    name='teacher',
+                    table='teachers',
+                ),
+                migrations.DeleteModel(
+                    name='Event',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:21
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_students_count(apps, schema_editor):
+    Group = apps.get_model('kindergarten', 'Group')
+    groups = Group.objects.annotate(
+        active_count=Count('student', filter=Q(student__student_date_out__isnull=True))
+    )
+    for group in groups:
+        Group.objects.filter(pk=group.pk).update(students_count=group.active_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0004_sync_model_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='students_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Учеников в группе'),
+        ),
+        migrations.RunPython(fill_students_count, migrations.RunPython.noop),
+    ]
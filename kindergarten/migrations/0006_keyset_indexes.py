@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0005_group_students_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parent',
+            index=models.Index(fields=['parent_fio', 'parent_id'], name='parents_fio_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_fio', 'student_id'], name='students_fio_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['teacher_fio', 'teacher_id'], name='teachers_fio_keyset_idx'),
+        ),
+    ]
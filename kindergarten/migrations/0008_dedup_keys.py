@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:51
+
+from django.db import migrations, models
+
+from kindergarten.normalization import normalize_fio, normalize_phone
+
+
+def fill_dedup_keys(apps, schema_editor):
+    Student = apps.get_model('kindergarten', 'Student')
+    Parent = apps.get_model('kindergarten', 'Parent')
+    students = list(Student.objects.only('pk', 'student_fio'))
+    for student in students:
+        student.fio_key = normalize_fio(student.student_fio)
+    Student.objects.bulk_update(students, ['fio_key'], batch_size=1000)
+    parents = list(Parent.objects.only('pk', 'parent_number'))
+    for parent in parents:
+        parent.phone_key = normalize_phone(parent.parent_number)
+    Parent.objects.bulk_update(parents, ['phone_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parent',
+            name='phone_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='fio_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['fio_key', 'student_birthday'], name='students_dedup_idx'),
+        ),
+        migrations.RunPython(fill_dedup_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0008_dedup_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedStudent',
+            fields=[
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')),
+                ('student_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('student_fio', models.CharField(db_index=True, max_length=100, verbose_name='ФИО ученика')),
+                ('student_birthday', models.DateField(verbose_name='Дата рождения')),
+                ('student_gender', models.CharField(choices=[('М', 'Мужской'), ('Ж', 'Женский')], max_length=1, verbose_name='Пол')),
+                ('student_address', models.TextField(blank=True, verbose_name='Адрес проживания')),
+                ('student_date_in', models.DateField(verbose_name='Дата поступления')),
+                ('student_date_out', models.DateField(db_index=True, verbose_name='Дата выпуска')),
+                ('group_id', models.IntegerField(blank=True, null=True, verbose_name='ID группы')),
+                ('group_name', models.CharField(blank=True, max_length=50, verbose_name='Группа')),
+                ('parents', models.JSONField(blank=True, default=list, verbose_name='Родители')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Ученик (архив)',
+                'verbose_name_plural': 'Ученики (архив)',
+                'db_table': 'archived_students',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')),
+                ('attendance_id', models.IntegerField(db_column='atd_id', primary_key=True, serialize=False)),
+                ('attendance_date', models.DateField(db_column='atd_date', verbose_name='Дата посещения')),
+                ('status', models.BooleanField(db_column='atd_status', verbose_name='Статус')),
+                ('student_id', models.IntegerField(verbose_name='ID ученика')),
+                ('reason', models.CharField(blank=True, max_length=100, verbose_name='Причина отсутствия')),
+                ('noted_by_id', models.IntegerField(blank=True, null=True, verbose_name='ID воспитателя')),
+                ('school_year', models.IntegerField(verbose_name='Учебный год')),
+            ],
+            options={
+                'verbose_name': 'Посещаемость (архив)',
+                'verbose_name_plural': 'Посещаемость (архив)',
+                'db_table': 'archived_attendance',
+                'indexes': [models.Index(fields=['student_id', 'school_year'], name='archived_atd_student_year_idx'), models.Index(fields=['school_year'], name='archived_atd_year_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:58
+
+import kindergarten.school_year
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0009_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='group',
+            name='group_year',
+            field=models.IntegerField(db_index=True, default=kindergarten.school_year.current_school_year, verbose_name='Год обучения'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0010_group_year_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarDay',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False, verbose_name='Дата')),
+                ('is_school_day', models.BooleanField(verbose_name='Учебный день')),
+                ('note', models.CharField(blank=True, max_length=100, verbose_name='Примечание')),
+            ],
+            options={
+                'verbose_name': 'День календаря',
+                'verbose_name_plural': 'Календарь учебных дней',
+                'db_table': 'calendar_days',
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['is_school_day', 'day'], name='calendar_school_day_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')),
+                ('date_from', models.DateField(verbose_name='Закрыта с')),
+                ('date_to', models.DateField(verbose_name='Закрыта по')),
+                ('reason', models.CharField(choices=[('Карантин', 'Карантин'), ('Праздники', 'Праздничные дни'), ('Ремонт', 'Ремонт'), ('Другое', 'Другое')], max_length=20, verbose_name='Причина')),
+                ('comment', models.CharField(blank=True, max_length=200, verbose_name='Комментарий')),
+                ('group', models.ForeignKey(blank=True, help_text='Не указана - закрыт весь детский сад', null=True, on_delete=django.db.models.deletion.CASCADE, to='kindergarten.group', verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name': 'Закрытие группы',
+                'verbose_name_plural': 'Закрытия групп',
+                'db_table': 'group_closures',
+                'indexes': [models.Index(fields=['group', 'date_from', 'date_to'], name='closures_group_dates_idx'), models.Index(fields=['date_from', 'date_to'], name='closures_dates_idx')],
+            },
+        ),
+    ]
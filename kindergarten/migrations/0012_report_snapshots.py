@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0011_school_calendar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('admin', 'Детский сад'), ('teacher', 'Воспитатель'), ('group', 'Группа')], max_length=10, verbose_name='Область отчета')),
+                ('object_id', models.IntegerField(default=0, verbose_name='ID воспитателя или группы')),
+                ('as_of', models.DateField(verbose_name='Данные по (включительно)')),
+                ('data', models.JSONField(verbose_name='Данные')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='Дата построения')),
+            ],
+            options={
+                'verbose_name': 'Снимок отчета',
+                'verbose_name_plural': 'Снимки отчетов',
+                'db_table': 'report_snapshots',
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0012_report_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerLock',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Задача')),
+                ('owner', models.CharField(blank=True, max_length=200, verbose_name='Процесс')),
+                ('locked_until', models.DateTimeField(verbose_name='Заблокирована до')),
+            ],
+            options={
+                'verbose_name': 'Блокировка задачи',
+                'verbose_name_plural': 'Блокировки задач',
+                'db_table': 'scheduler_locks',
+            },
+        ),
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=100, verbose_name='Задача')),
+                ('node', models.CharField(max_length=200, verbose_name='Процесс')),
+                ('started_at', models.DateTimeField(verbose_name='Начало')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание')),
+                ('duration', models.FloatField(blank=True, null=True, verbose_name='Длительность, с')),
+                ('status', models.CharField(choices=[('running', 'Выполняется'), ('success', 'Успешно'), ('failed', 'Ошибка')], default='running', max_length=10, verbose_name='Статус')),
+                ('output', models.TextField(blank=True, verbose_name='Вывод')),
+            ],
+            options={
+                'verbose_name': 'Запуск задачи',
+                'verbose_name_plural': 'Запуски задач',
+                'db_table': 'scheduler_runs',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['job', '-started_at'], name='scheduler_runs_job_idx')],
+            },
+        ),
+    ]
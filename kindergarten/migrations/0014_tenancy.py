@@ -0,0 +1,302 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def reset_kindergarten_sequence(apps, schema_editor):
+    # Вставка с явным ключом не сдвигает последовательность PostgreSQL: следующий сад получил бы ключ 1
+    Kindergarten = apps.get_model('kindergarten', 'Kindergarten')
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Kindergarten]):
+            cursor.execute(sql)
+
+
+def create_default_kindergarten(apps, schema_editor):
+    # Существующие данные установки становятся данными первого сада (ключ 1 - default у полей tenant ниже)
+    Kindergarten = apps.get_model('kindergarten', 'Kindergarten')
+    Kindergarten.objects.using(schema_editor.connection.alias).get_or_create(
+        kindergarten_id=1, defaults={'name': 'Детский сад', 'slug': 'default'}
+    )
+    reset_kindergarten_sequence(apps, schema_editor)
+
+
+def add_existing_members(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    KindergartenMember = apps.get_model('kindergarten', 'KindergartenMember')
+    KindergartenMember.objects.using(db_alias).bulk_create([
+        KindergartenMember(user_id=user_id, tenant_id=1)
+        for user_id in User.objects.using(db_alias).filter(is_superuser=False).values_list('pk', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0013_scheduler'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Kindergarten',
+            fields=[
+                ('kindergarten_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('slug', models.SlugField(help_text='Используется в параметре --tenant команд manage.py', unique=True, verbose_name='Код')),
+                ('domain', models.CharField(blank=True, help_text='Адрес сайта, по которому определяется детский сад запроса', max_length=255, null=True, unique=True, verbose_name='Домен')),
+                ('database', models.CharField(default='default', help_text='Псевдоним БД из settings.DATABASES, в которой лежат данные сада', max_length=50, verbose_name='База данных')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Работает')),
+            ],
+            options={
+                'verbose_name': 'Детский сад',
+                'verbose_name_plural': 'Детские сады',
+                'db_table': 'kindergartens',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(create_default_kindergarten, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='KindergartenMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Пользователь детского сада',
+                'verbose_name_plural': 'Пользователи детских садов',
+                'db_table': 'kindergarten_members',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='archivedattendance',
+            name='archived_atd_year_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='attendance',
+            name='attendance_atd_dat_659e30_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='group',
+            name='groups_group_c_962945_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='groupclosure',
+            name='closures_dates_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='parent',
+            name='parents_parent__072b7b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='parent',
+            name='parents_fio_keyset_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='students_student_052756_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='students_fio_keyset_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='students_dedup_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='teacher',
+            name='teachers_teacher_35b767_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='teacher',
+            name='teachers_fio_keyset_idx',
+        ),
+        migrations.AlterField(
+            model_name='group',
+            name='group_name',
+            field=models.CharField(db_index=True, max_length=50, verbose_name='Название группы'),
+        ),
+        migrations.AlterField(
+            model_name='parent',
+            name='user',
+            field=models.OneToOneField(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='parent_profile', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='teacher',
+            name='user',
+            field=models.OneToOneField(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='teacher_profile', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reportsnapshot',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='archivedattendance',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='archivedstudent',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='groupclosure',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='parent',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='reportsnapshot',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='studentparent',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='reportsnapshot',
+            unique_together={('tenant', 'kind', 'object_id')},
+        ),
+        migrations.AddIndex(
+            model_name='archivedattendance',
+            index=models.Index(fields=['tenant', 'school_year'], name='archived_atd_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedstudent',
+            index=models.Index(fields=['tenant', 'student_date_out'], name='archived_students_tenant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['tenant', 'attendance_date', 'status'], name='attendance_tenant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['tenant', 'updated_at'], name='attendance_tenant_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['tenant', 'group_category', 'group_year'], name='groups_tenant_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['tenant', 'updated_at'], name='groups_tenant_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupclosure',
+            index=models.Index(fields=['tenant', 'date_from', 'date_to'], name='closures_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parent',
+            index=models.Index(fields=['tenant', 'parent_fio', 'parent_number'], name='parents_tenant_fio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parent',
+            index=models.Index(fields=['tenant', 'parent_fio', 'parent_id'], name='parents_fio_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parent',
+            index=models.Index(fields=['tenant', 'phone_key'], name='parents_tenant_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parent',
+            index=models.Index(fields=['tenant', 'updated_at'], name='parents_tenant_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['tenant', 'student_date_out'], name='students_tenant_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['tenant', 'student_fio', 'student_birthday'], name='students_tenant_fio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['tenant', 'student_fio', 'student_id'], name='students_fio_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['tenant', 'fio_key', 'student_birthday'], name='students_dedup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['tenant', 'updated_at'], name='students_tenant_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentparent',
+            index=models.Index(fields=['tenant', 'updated_at'], name='student_parents_tenant_upd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['tenant', 'teacher_fio', 'teacher_position'], name='teachers_tenant_fio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['tenant', 'teacher_fio', 'teacher_id'], name='teachers_fio_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['tenant', 'updated_at'], name='teachers_tenant_updated_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='group',
+            constraint=models.UniqueConstraint(fields=('tenant', 'group_name'), name='groups_tenant_name_uniq'),
+        ),
+        migrations.AddField(
+            model_name='kindergartenmember',
+            name='tenant',
+            field=models.ForeignKey(db_constraint=False, db_index=False, default=1, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='kindergartenmember',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='kindergarten_membership', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='kindergartenmember',
+            index=models.Index(fields=['tenant', 'updated_at'], name='members_tenant_updated_idx'),
+        ),
+        migrations.RunPython(add_existing_members, migrations.RunPython.noop),
+    ]
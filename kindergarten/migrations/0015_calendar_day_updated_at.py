@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0014_tenancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarday',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+    ]
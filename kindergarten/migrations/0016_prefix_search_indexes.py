@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0015_calendar_day_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['tenant', 'group_name'], name='groups_name_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='parent',
+            index=models.Index(fields=['tenant', 'parent_fio'], name='parents_fio_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['tenant', 'student_fio'], name='students_fio_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['tenant', 'teacher_fio'], name='teachers_fio_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:05
+
+from django.core.management.color import no_style
+from django.db import migrations
+
+
+def reset_kindergarten_sequence(apps, schema_editor):
+    # 0014 вставлял первый сад с явным ключом 1, не сдвигая последовательность PostgreSQL:
+    # на уже обновленных установках следующий сад получил бы ключ 1 и ошибку уникальности
+    Kindergarten = apps.get_model('kindergarten', 'Kindergarten')
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Kindergarten]):
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0016_prefix_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_kindergarten_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergarten', '0017_reset_kindergarten_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')),
+                ('table', models.CharField(max_length=100, verbose_name='Таблица')),
+                ('tenant', models.ForeignKey(db_constraint=False, db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='kindergarten.kindergarten', verbose_name='Детский сад')),
+            ],
+            options={
+                'verbose_name': 'Отметка удаления',
+                'verbose_name_plural': 'Отметки удалений',
+                'db_table': 'deletion_marks',
+                'unique_together': {('tenant', 'table')},
+            },
+        ),
+    ]
@@ -1,15 +1,129 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from datetime import date
 from django.contrib.auth.models import User
-class Teacher(models.Model):
+from .decorators import invalidate_user_role
+from .normalization import normalize_fio, normalize_phone
+from .school_year import current_school_year
+from .tenancy import current_tenant, tenant_atomic, tenant_channel
+class TimestampedQuerySet(models.QuerySet):
+    """Обновляет updated_at и в массовых операциях, где auto_now не срабатывает."""
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+    def bulk_update(self, objs, fields, batch_size=None):
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        if 'updated_at' not in fields:
+            fields = [*fields, 'updated_at']
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False, update_conflicts=False,
+                    update_fields=None, unique_fields=None):
+        # При вставке auto_now проставляется сам, а при обновлении конфликтующих строк - только если поле указано явно
+        if update_conflicts and update_fields and 'updated_at' not in update_fields:
+            update_fields = [*update_fields, 'updated_at']
+        return super().bulk_create(
+            objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts, update_conflicts=update_conflicts,
+            update_fields=update_fields, unique_fields=unique_fields,
+        )
+class TimestampedModel(models.Model):
+    # Время последнего изменения строки: по максимуму в выборке представления отдают Last-Modified/ETag
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')
+    objects = TimestampedQuerySet.as_manager()
+    class Meta:
+        abstract = True
+# Реестр детских садов (см. tenancy.py). Хранится в основной БД вместе с пользователями и сессиями;
+# данные крупного сада можно вынести в отдельную БД - database указывает псевдоним из settings.DATABASES
+class Kindergarten(models.Model):
+    kindergarten_id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=200, verbose_name='Название')
+    slug = models.SlugField(max_length=50, unique=True, verbose_name='Код',
+                            help_text='Используется в параметре --tenant команд manage.py')
+    domain = models.CharField(max_length=255, unique=True, null=True, blank=True, verbose_name='Домен',
+                              help_text='Адрес сайта, по которому определяется детский сад запроса')
+    database = models.CharField(max_length=50, default='default', verbose_name='База данных',
+                                help_text='Псевдоним БД из settings.DATABASES, в которой лежат данные сада')
+    is_active = models.BooleanField(default=True, verbose_name='Работает')
+    def clean(self):
+        if self.database not in settings.DATABASES:
+            raise ValidationError({'database': f'База данных {self.database} не описана в настройках'})
+    def save(self, *args, **kwargs):
+        # Пустой домен хранится как NULL, иначе второй сад без домена нарушит уникальность
+        self.domain = self.domain.lower() if self.domain else None
+        super().save(*args, **kwargs)
+    def __str__(self):
+        return self.name
+    class Meta:
+        db_table = 'kindergartens'
+        verbose_name = 'Детский сад'
+        verbose_name_plural = 'Детские сады'
+        ordering = ['name']
+class TenantManager(models.Manager):
+    """Выборки по текущему саду; без выбранного сада (миграции, обход всех садов) - по всем строкам."""
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tenant = current_tenant()
+        return queryset if tenant is None else queryset.filter(tenant_id=tenant.pk)
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create не вызывает save(), поэтому ключ сада проставляем сами
+        objs = list(objs)
+        tenant = current_tenant()
+        if tenant is not None:
+            for obj in objs:
+                if obj.tenant_id is None:
+                    obj.tenant_id = tenant.pk
+        return super().bulk_create(objs, *args, **kwargs)
+class TenantModel(models.Model):
+    tenant_scoped = True
+    # Ограничения внешнего ключа в БД нет: данные сада могут лежать в отдельной БД, а реестр садов - в основной.
+    # Отдельный индекс не нужен, ключ сада стоит первым в составных индексах моделей
+    tenant = models.ForeignKey(Kindergarten, on_delete=models.PROTECT, editable=False, db_constraint=False,
+                               db_index=False, related_name='+', verbose_name='Детский сад')
+    objects = TenantManager()
+    # Без ограничения по саду: для переноса данных и проверок целостности
+    all_tenants = models.Manager()
+    def save(self, *args, **kwargs):
+        if self.tenant_id is None:
+            tenant = current_tenant()
+            if tenant is not None:
+                self.tenant_id = tenant.pk
+        super().save(*args, **kwargs)
+    class Meta:
+        abstract = True
+class TimestampedTenantModel(TenantModel, TimestampedModel):
+    objects = TenantManager.from_queryset(TimestampedQuerySet)()
+    all_tenants = TimestampedQuerySet.as_manager()
+    class Meta:
+        abstract = True
+# Пользователи сада: TenantMiddleware пускает в сад только их (и суперпользователей). Пользователь относится к одному саду
+class KindergartenMember(TimestampedTenantModel):
+    # Как и ключ сада: пользователи лежат в основной БД, строка членства - в БД сада
+    user = models.OneToOneField(User, on_delete=models.CASCADE, db_constraint=False,
+                                related_name='kindergarten_membership', verbose_name='Пользователь')
+    def __str__(self):
+        return f"{self.user} - {self.tenant}"
+    class Meta:
+        db_table = 'kindergarten_members'
+        verbose_name = 'Пользователь детского сада'
+        verbose_name_plural = 'Пользователи детских садов'
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at'], name='members_tenant_updated_idx'),
+        ]
+class Teacher(TimestampedTenantModel):
     POSITION_CHOICES = [
         ('Младший воспитатель', 'Младший воспитатель'),
         ('Воспитатель', 'Воспитатель'),
         ('Старший воспитатель', 'Старший воспитатель'),
     ]
     teacher_id = models.AutoField(primary_key=True)
-    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, 
+    # Без ограничения в БД: пользователи в основной БД, а воспитатели и родители могут быть в БД сада
+    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, db_constraint=False,
                                 related_name='teacher_profile', verbose_name='Пользователь')
     teacher_fio = models.CharField(max_length=100, verbose_name='ФИО воспитателя', db_index=True)
     teacher_position = models.CharField(max_length=50, choices=POSITION_CHOICES, 
@@ -22,9 +136,12 @@ class Teacher(models.Model):
         verbose_name = 'Воспитатель'
         verbose_name_plural = 'Воспитатели'
         indexes = [
-            models.Index(fields=['teacher_fio', 'teacher_position']),
+            models.Index(fields=['tenant', 'teacher_fio', 'teacher_position'], name='teachers_tenant_fio_idx'),
+            models.Index(fields=['tenant', 'teacher_fio', 'teacher_id'], name='teachers_fio_keyset_idx'),
+            models.Index(fields=['tenant', 'teacher_fio'], opclasses=['int4_ops', 'varchar_pattern_ops'], name='teachers_fio_prefix_idx'),
+            models.Index(fields=['tenant', 'updated_at'], name='teachers_tenant_updated_idx'),
         ]
-class Group(models.Model):
+class Group(TimestampedTenantModel):
     CATEGORY_CHOICES = [
         ('Младшая', 'Младшая (2-3 года)'),
         ('Средняя', 'Средняя (3-4 года)'),
@@ -33,17 +150,20 @@ class Group(models.Model):
     ]
     MAX_STUDENTS = 30
     group_id = models.AutoField(primary_key=True)
-    group_name = models.CharField(max_length=50, unique=True, verbose_name='Название группы', db_index=True)
+    group_name = models.CharField(max_length=50, verbose_name='Название группы', db_index=True)
     group_category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, 
                                      verbose_name='Возрастная категория', db_index=True)
-    group_year = models.IntegerField(verbose_name='Год обучения', default=2024, db_index=True)
+    group_year = models.IntegerField(verbose_name='Год обучения', default=current_school_year, db_index=True)
     teacher = models.ForeignKey(Teacher, on_delete=models.SET_NULL, null=True, 
                                blank=True, verbose_name='Воспитатель')
+    # Денормализованный счетчик активных учеников, обновляется в Student.save()/удалении
+    # под блокировкой строки группы (см. Group.move_occupancy)
+    students_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Учеников в группе')
     
     def current_students_count(self):
         if not self.pk:
             return 0
-        return self.student_set.count()
+        return self.students_count
     
     def available_places(self):
         return self.MAX_STUDENTS - self.current_students_count()
@@ -54,17 +174,53 @@ class Group(models.Model):
     def clean(self):
         if self.pk and self.current_students_count() > self.MAX_STUDENTS:
             raise ValidationError(f'Группа не может содержать более {self.MAX_STUDENTS} учеников')
+        # Название уникально в пределах сада; формы не видят ключ сада и саму проверку ограничения пропускают
+        if self.group_name and Group.objects.filter(group_name=self.group_name).exclude(pk=self.pk).exists():
+            raise ValidationError({'group_name': 'Группа с таким названием уже существует'})
+    def save(self, *args, **kwargs):
+        # Счетчик меняется только F()-запросами под блокировкой строки (move_occupancy, удаление ученика).
+        # Загруженное в объект значение к моменту сохранения могло устареть, поэтому при обновлении группы
+        # (форма, админка) его не записываем
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'students_count'
+            ]
+        super().save(*args, **kwargs)
+    @classmethod
+    def move_occupancy(cls, from_group_id, to_group_id):
+        """Переносит одно место из группы from в группу to. Должен вызываться внутри tenant_atomic()."""
+        if from_group_id == to_group_id:
+            return
+        group_ids = sorted(pk for pk in (from_group_id, to_group_id) if pk is not None)
+        # Блокируем строки групп в порядке pk, чтобы параллельные переводы не взаимоблокировались
+        locked = {
+            group.pk: group for group in
+            cls.objects.select_for_update().filter(pk__in=group_ids).order_by('pk').only('pk', 'group_name', 'students_count')
+        }
+        if to_group_id is not None:
+            target = locked.get(to_group_id)
+            if target is not None and target.students_count >= cls.MAX_STUDENTS:
+                raise ValidationError(f'Группа "{target.group_name}" уже заполнена (максимум {cls.MAX_STUDENTS} учеников)')
+            cls.objects.filter(pk=to_group_id).update(students_count=F('students_count') + 1)
+        if from_group_id is not None and from_group_id in locked:
+            cls.objects.filter(pk=from_group_id, students_count__gt=0).update(students_count=F('students_count') - 1)
     def __str__(self):
         return f"{self.group_name} ({self.group_category})"
     class Meta:
         db_table = 'groups'
         verbose_name = 'Группа'
         verbose_name_plural = 'Группы'
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'group_name'], name='groups_tenant_name_uniq'),
+        ]
         indexes = [
-            models.Index(fields=['group_category', 'group_year']),
+            models.Index(fields=['tenant', 'group_category', 'group_year'], name='groups_tenant_category_idx'),
             models.Index(fields=['teacher', 'group_year']),
+            models.Index(fields=['tenant', 'group_name'], opclasses=['int4_ops', 'varchar_pattern_ops'], name='groups_name_prefix_idx'),
+            models.Index(fields=['tenant', 'updated_at'], name='groups_tenant_updated_idx'),
         ]
-class Student(models.Model):
+class Student(TimestampedTenantModel):
     student_id = models.AutoField(primary_key=True)
     student_fio = models.CharField(max_length=100, verbose_name='ФИО ученика', db_index=True)
     student_birthday = models.DateField(verbose_name='Дата рождения', db_index=True)
@@ -75,6 +231,8 @@ class Student(models.Model):
     student_date_out = models.DateField(verbose_name='Дата выпуска', null=True, blank=True, db_index=True)
     group = models.ForeignKey(Group, on_delete=models.SET_NULL, null=True, 
                              verbose_name='Группа')
+    # Ключ поиска дубликатов при массовом зачислении: нормализованное ФИО (+ дата рождения в индексе)
+    fio_key = models.CharField(max_length=100, default='', editable=False)
     def age(self):
         today = date.today()
         born = self.student_birthday
@@ -85,8 +243,36 @@ class Student(models.Model):
         age_at_entry = self.age_at_entry()
         if age_at_entry < 2 or age_at_entry > 7:
             raise ValidationError('Прием детей в детский сад осуществляется только в возрасте от 2 до 7 лет')
-        if self.group and self.group.is_full() and not self.pk:
+        if self.group and self.group.is_full() and self.occupies_group_id() != self.group_id:
             raise ValidationError(f'Группа "{self.group.group_name}" уже заполнена (максимум {Group.MAX_STUDENTS} учеников)')
+    def occupies_group_id(self):
+        # Группа, в которой ученик сейчас учитывается в Group.students_count (по данным БД)
+        if not self.pk:
+            return None
+        stored = Student.objects.filter(pk=self.pk).values('group_id', 'student_date_out').first()
+        if stored is None or stored['student_date_out'] is not None:
+            return None
+        return stored['group_id']
+    def save(self, *args, **kwargs):
+        with tenant_atomic():
+            previous_group_id = None
+            if self.pk:
+                stored = Student.objects.select_for_update().filter(pk=self.pk).values(
+                    'group_id', 'student_date_in', 'student_date_out'
+                ).first()
+                if stored is not None and stored['student_date_out'] is None:
+                    previous_group_id = stored['group_id']
+                if stored is not None and (stored['group_id'], stored['student_date_in'], stored['student_date_out']) != (
+                    self.group_id, self.student_date_in, self.student_date_out
+                ):
+                    # Группа и даты ученика входят в историю посещаемости групп и воспитателей
+                    ReportSnapshot.invalidate()
+            elif self.student_date_in and self.student_date_in < date.today():
+                ReportSnapshot.invalidate(self.student_date_in)
+            current_group_id = self.group_id if self.student_date_out is None else None
+            Group.move_occupancy(previous_group_id, current_group_id)
+            self.fio_key = normalize_fio(self.student_fio)
+            super().save(*args, **kwargs)
     def age_at_entry(self):
         if self.student_date_in and self.student_birthday:
             entry_date = self.student_date_in
@@ -102,9 +288,14 @@ class Student(models.Model):
         verbose_name_plural = 'Ученики'
         indexes = [
             models.Index(fields=['group', 'student_date_out']),
-            models.Index(fields=['student_fio', 'student_birthday']),
+            models.Index(fields=['tenant', 'student_date_out'], name='students_tenant_active_idx'),
+            models.Index(fields=['tenant', 'student_fio', 'student_birthday'], name='students_tenant_fio_idx'),
+            models.Index(fields=['tenant', 'student_fio', 'student_id'], name='students_fio_keyset_idx'),
+            models.Index(fields=['tenant', 'student_fio'], opclasses=['int4_ops', 'varchar_pattern_ops'], name='students_fio_prefix_idx'),
+            models.Index(fields=['tenant', 'fio_key', 'student_birthday'], name='students_dedup_idx'),
+            models.Index(fields=['tenant', 'updated_at'], name='students_tenant_updated_idx'),
         ]
-class Parent(models.Model):
+class Parent(TimestampedTenantModel):
     RELATIONSHIP_CHOICES = [
         ('Мать', 'Мать'),
         ('Отец', 'Отец'),
@@ -114,10 +305,16 @@ class Parent(models.Model):
         ('Другое', 'Другое'),
     ]
     parent_id = models.AutoField(primary_key=True)
-    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, 
+    # Без ограничения в БД, как Teacher.user
+    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, db_constraint=False,
                                 related_name='parent_profile', verbose_name='Пользователь')
     parent_fio = models.CharField(max_length=100, verbose_name='ФИО родителя', db_index=True)
     parent_number = models.CharField(max_length=20, verbose_name='Номер телефона', db_index=True)
+    # Ключ поиска дубликатов: только цифры телефона, 8XXXXXXXXXX приведен к 7XXXXXXXXXX
+    phone_key = models.CharField(max_length=20, default='', editable=False, db_index=True)
+    def save(self, *args, **kwargs):
+        self.phone_key = normalize_phone(self.parent_number)
+        super().save(*args, **kwargs)
     def __str__(self):
         return self.parent_fio
     class Meta:
@@ -125,9 +322,13 @@ class Parent(models.Model):
         verbose_name = 'Родитель'
         verbose_name_plural = 'Родители'
         indexes = [
-            models.Index(fields=['parent_fio', 'parent_number']),
+            models.Index(fields=['tenant', 'parent_fio', 'parent_number'], name='parents_tenant_fio_idx'),
+            models.Index(fields=['tenant', 'parent_fio', 'parent_id'], name='parents_fio_keyset_idx'),
+            models.Index(fields=['tenant', 'parent_fio'], opclasses=['int4_ops', 'varchar_pattern_ops'], name='parents_fio_prefix_idx'),
+            models.Index(fields=['tenant', 'phone_key'], name='parents_tenant_phone_idx'),
+            models.Index(fields=['tenant', 'updated_at'], name='parents_tenant_updated_idx'),
         ]
-class StudentParent(models.Model):
+class StudentParent(TimestampedTenantModel):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, verbose_name='Ученик')
     parent = models.ForeignKey(Parent, on_delete=models.CASCADE, verbose_name='Родитель')
     relationship_type = models.CharField(max_length=20, choices=Parent.RELATIONSHIP_CHOICES, 
@@ -140,7 +341,10 @@ class StudentParent(models.Model):
         verbose_name = 'Связь ученик-родитель'
         verbose_name_plural = 'Связи ученик-родитель'
         unique_together = ('student', 'parent')
-class Attendance(models.Model):
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at'], name='student_parents_tenant_upd_idx'),
+        ]
+class Attendance(TimestampedTenantModel):
     attendance_id = models.AutoField(primary_key=True, db_column='atd_id')
     attendance_date = models.DateField(verbose_name='Дата посещения', db_index=True, db_column='atd_date')
     status = models.BooleanField(verbose_name='Статус', choices=[(True, 'Присутствовал'), (False, 'Отсутствовал')], db_index=True, db_column='atd_status')
@@ -158,6 +362,18 @@ class Attendance(models.Model):
     def __str__(self):
         status_text = "Присутствовал" if self.status else "Отсутствовал"
         return f"{self.student.student_fio} - {self.attendance_date} - {status_text}"
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженное состояние, чтобы при сохранении отправить дашбордам только изменение
+        instance._loaded_mark = (instance.__dict__.get('attendance_date'), instance.__dict__.get('status'))
+        return instance
+    def save(self, *args, **kwargs):
+        previous = getattr(self, '_loaded_mark', (None, None))
+        super().save(*args, **kwargs)
+        self._loaded_mark = (self.attendance_date, self.status)
+        publish_attendance_delta(self.student_id, previous, self._loaded_mark)
+        invalidate_past_marks(previous[0], self.attendance_date)
     class Meta:
         db_table = 'attendance'
         verbose_name = 'Посещаемость'
@@ -165,6 +381,278 @@ class Attendance(models.Model):
         unique_together = ('attendance_date', 'student')
         indexes = [
             models.Index(fields=['student', 'attendance_date']),
-            models.Index(fields=['attendance_date', 'status']),
+            models.Index(fields=['tenant', 'attendance_date', 'status'], name='attendance_tenant_date_idx'),
             models.Index(fields=['student', 'status', 'attendance_date']),
+            models.Index(fields=['tenant', 'updated_at'], name='attendance_tenant_updated_idx'),
+        ]
+# Архив: закрытые учебные годы посещаемости и выпускники (см. archive.py). Внешних ключей нет,
+# чтобы архив не зависел от удаления учеников, групп и воспитателей из рабочих таблиц
+class ArchivedStudent(TimestampedTenantModel):
+    student_id = models.IntegerField(primary_key=True)
+    student_fio = models.CharField(max_length=100, verbose_name='ФИО ученика', db_index=True)
+    student_birthday = models.DateField(verbose_name='Дата рождения')
+    student_gender = models.CharField(max_length=1, choices=[('М', 'Мужской'), ('Ж', 'Женский')], verbose_name='Пол')
+    student_address = models.TextField(verbose_name='Адрес проживания', blank=True)
+    student_date_in = models.DateField(verbose_name='Дата поступления')
+    student_date_out = models.DateField(verbose_name='Дата выпуска', db_index=True)
+    group_id = models.IntegerField(null=True, blank=True, verbose_name='ID группы')
+    group_name = models.CharField(max_length=50, blank=True, verbose_name='Группа')
+    # Снимок связей с родителями на момент архивации: [{parent_id, parent_fio, parent_number, relationship_type, is_primary}]
+    parents = models.JSONField(default=list, blank=True, verbose_name='Родители')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')
+    def age(self):
+        today = date.today()
+        born = self.student_birthday
+        return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+    def __str__(self):
+        return f"{self.student_fio} (архив, выпуск {self.student_date_out:%d.%m.%Y})"
+    class Meta:
+        db_table = 'archived_students'
+        verbose_name = 'Ученик (архив)'
+        verbose_name_plural = 'Ученики (архив)'
+        indexes = [
+            models.Index(fields=['tenant', 'student_date_out'], name='archived_students_tenant_idx'),
+        ]
+class ArchivedAttendance(TimestampedTenantModel):
+    attendance_id = models.IntegerField(primary_key=True, db_column='atd_id')
+    attendance_date = models.DateField(verbose_name='Дата посещения', db_column='atd_date')
+    status = models.BooleanField(verbose_name='Статус', db_column='atd_status')
+    student_id = models.IntegerField(verbose_name='ID ученика')
+    reason = models.CharField(max_length=100, verbose_name='Причина отсутствия', blank=True)
+    noted_by_id = models.IntegerField(null=True, blank=True, verbose_name='ID воспитателя')
+    # Год начала учебного года (1 сентября): архив переносится и читается по учебным годам
+    school_year = models.IntegerField(verbose_name='Учебный год')
+    class Meta:
+        db_table = 'archived_attendance'
+        verbose_name = 'Посещаемость (архив)'
+        verbose_name_plural = 'Посещаемость (архив)'
+        indexes = [
+            models.Index(fields=['student_id', 'school_year'], name='archived_atd_student_year_idx'),
+            models.Index(fields=['tenant', 'school_year'], name='archived_atd_year_idx'),
+        ]
+# Календарь учебных дней (см. school_calendar.py): одна строка на дату. Выходные и праздники - is_school_day=False,
+# перенесенные рабочие субботы - True. Отчеты присоединяют календарь в SQL, чтобы считать ожидаемые отметки
+# Календарь общий для всех садов; updated_at нужен для ETag отчетов (см. scopes.calendar_scope)
+class CalendarDay(TimestampedModel):
+    day = models.DateField(primary_key=True, verbose_name='Дата')
+    is_school_day = models.BooleanField(verbose_name='Учебный день')
+    note = models.CharField(max_length=100, blank=True, verbose_name='Примечание')
+    def __str__(self):
+        return f"{self.day:%d.%m.%Y} - {'учебный' if self.is_school_day else 'выходной'}{f' ({self.note})' if self.note else ''}"
+    class Meta:
+        db_table = 'calendar_days'
+        verbose_name = 'День календаря'
+        verbose_name_plural = 'Календарь учебных дней'
+        ordering = ['day']
+        indexes = [
+            models.Index(fields=['is_school_day', 'day'], name='calendar_school_day_idx'),
+        ]
+class GroupClosure(TimestampedTenantModel):
+    REASON_CHOICES = [
+        ('Карантин', 'Карантин'),
+        ('Праздники', 'Праздничные дни'),
+        ('Ремонт', 'Ремонт'),
+        ('Другое', 'Другое'),
+    ]
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, null=True, blank=True, verbose_name='Группа',
+                              help_text='Не указана - закрыт весь детский сад')
+    date_from = models.DateField(verbose_name='Закрыта с')
+    date_to = models.DateField(verbose_name='Закрыта по')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name='Причина')
+    comment = models.CharField(max_length=200, blank=True, verbose_name='Комментарий')
+    def clean(self):
+        if self.date_from and self.date_to and self.date_to < self.date_from:
+            raise ValidationError({'date_to': 'Дата окончания раньше даты начала'})
+    def __str__(self):
+        where = self.group.group_name if self.group else 'Весь детский сад'
+        return f"{where}: {self.reason} {self.date_from:%d.%m.%Y} - {self.date_to:%d.%m.%Y}"
+    class Meta:
+        db_table = 'group_closures'
+        verbose_name = 'Закрытие группы'
+        verbose_name_plural = 'Закрытия групп'
+        indexes = [
+            models.Index(fields=['group', 'date_from', 'date_to'], name='closures_group_dates_idx'),
+            models.Index(fields=['tenant', 'date_from', 'date_to'], name='closures_dates_idx'),
+        ]
+# Ночные снимки отчетов (см. snapshots.py): история посещаемости области отчета по вчерашний день включительно.
+# Одна строка на область; днем к снимку добавляются только сегодняшние отметки
+class ReportSnapshot(TenantModel):
+    KIND_CHOICES = [
+        ('admin', 'Детский сад'),
+        ('teacher', 'Воспитатель'),
+        ('group', 'Группа'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name='Область отчета')
+    object_id = models.IntegerField(default=0, verbose_name='ID воспитателя или группы')
+    as_of = models.DateField(verbose_name='Данные по (включительно)')
+    data = models.JSONField(verbose_name='Данные')
+    built_at = models.DateTimeField(auto_now=True, verbose_name='Дата построения')
+    @classmethod
+    def invalidate(cls, since=None):
+        """Удаляет снимки, в которые попал измененный день since (без даты - все); до ночи отчеты считаются вживую."""
+        snapshots = cls.objects.all() if since is None else cls.objects.filter(as_of__gte=since)
+        snapshots.delete()
+    @classmethod
+    def invalidate_all_tenants(cls, since):
+        """Как invalidate, но у всех садов во всех их БД: для общих таблиц вроде календаря."""
+        for database in Kindergarten.objects.order_by().values_list('database', flat=True).distinct():
+            cls.all_tenants.using(database).filter(as_of__gte=since).delete()
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id or ''} по {self.as_of:%d.%m.%Y}"
+    class Meta:
+        db_table = 'report_snapshots'
+        verbose_name = 'Снимок отчета'
+        verbose_name_plural = 'Снимки отчетов'
+        unique_together = ('tenant', 'kind', 'object_id')
+# Отметки удалений для ETag отчетов по всему саду (см. scopes.table_changes): удаление не меняет максимум
+# updated_at, а считать строки всей таблицы на каждый запрос дорого. Одна строка на таблицу сада
+class DeletionMark(TimestampedTenantModel):
+    table = models.CharField(max_length=100, verbose_name='Таблица')
+    @classmethod
+    def mark(cls, model, tenant_id):
+        """Сдвигает отметку таблицы модели model в саду tenant_id на текущее время."""
+        table = model._meta.db_table
+        if not cls.all_tenants.filter(tenant_id=tenant_id, table=table).update(updated_at=timezone.now()):
+            cls.all_tenants.bulk_create([cls(tenant_id=tenant_id, table=table)], ignore_conflicts=True)
+    def __str__(self):
+        return f"{self.table}: {self.updated_at:%d.%m.%Y %H:%M}"
+    class Meta:
+        db_table = 'deletion_marks'
+        verbose_name = 'Отметка удаления'
+        verbose_name_plural = 'Отметки удалений'
+        unique_together = ('tenant', 'table')
+# Планировщик периодических задач (см. scheduler.py): блокировки задач для СУБД без advisory locks и история запусков
+class SchedulerLock(models.Model):
+    name = models.CharField(max_length=100, primary_key=True, verbose_name='Задача')
+    owner = models.CharField(max_length=200, blank=True, verbose_name='Процесс')
+    locked_until = models.DateTimeField(verbose_name='Заблокирована до')
+    class Meta:
+        db_table = 'scheduler_locks'
+        verbose_name = 'Блокировка задачи'
+        verbose_name_plural = 'Блокировки задач'
+class JobRun(models.Model):
+    STATUS_CHOICES = [
+        ('running', 'Выполняется'),
+        ('success', 'Успешно'),
+        ('failed', 'Ошибка'),
+    ]
+    job = models.CharField(max_length=100, verbose_name='Задача')
+    node = models.CharField(max_length=200, verbose_name='Процесс')
+    started_at = models.DateTimeField(verbose_name='Начало')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Окончание')
+    duration = models.FloatField(null=True, blank=True, verbose_name='Длительность, с')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running', verbose_name='Статус')
+    output = models.TextField(blank=True, verbose_name='Вывод')
+    def __str__(self):
+        return f"{self.job} {self.started_at:%d.%m.%Y %H:%M} - {self.get_status_display()}"
+    class Meta:
+        db_table = 'scheduler_runs'
+        verbose_name = 'Запуск задачи'
+        verbose_name_plural = 'Запуски задач'
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['job', '-started_at'], name='scheduler_runs_job_idx'),
         ]
+@receiver(post_delete, sender=Teacher)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Parent)
+@receiver(post_delete, sender=StudentParent)
+@receiver(post_delete, sender=Attendance)
+def mark_deletion(sender, instance, origin=None, **kwargs):
+    # Одна отметка на таблицу за операцию удаления, а не на каждую строку каскада или выборки
+    marked = getattr(origin, '_deletion_marks', None)
+    if marked is None:
+        marked = set()
+        if origin is not None:
+            origin._deletion_marks = marked
+    if (sender, instance.tenant_id) not in marked:
+        marked.add((sender, instance.tenant_id))
+        DeletionMark.mark(sender, instance.tenant_id)
+@receiver(post_delete, sender=Student)
+def release_group_place(sender, instance, **kwargs):
+    if instance.group_id is not None and instance.student_date_out is None:
+        Group.objects.filter(pk=instance.group_id, students_count__gt=0).update(students_count=F('students_count') - 1)
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, origin=None, **kwargs):
+    # Отметки ребенка удаляются каскадом раньше него самого: снимки сбрасываем один раз за всю операцию
+    earliest = origin.__dict__.pop('_earliest_deleted_mark', None) if origin is not None else None
+    invalidate_past_marks(earliest)
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, origin=None, **kwargs):
+    publish_attendance_delta(instance.student_id, (instance.attendance_date, instance.status), (None, None))
+    if isinstance(origin, Student) or getattr(origin, 'model', None) is Student:
+        # Каскад от удаления детей: запоминаем самую раннюю дату, снимки сбросит student_deleted
+        earliest = origin.__dict__.get('_earliest_deleted_mark')
+        if earliest is None or instance.attendance_date < earliest:
+            origin._earliest_deleted_mark = instance.attendance_date
+        return
+    invalidate_past_marks(instance.attendance_date)
+def invalidate_past_marks(*dates):
+    # Сегодняшние отметки добавляются к снимкам при каждом запросе, снимки устаревают только от исправлений прошлых дней
+    past = [mark_date for mark_date in dates if mark_date is not None and mark_date < date.today()]
+    if past:
+        ReportSnapshot.invalidate(min(past))
+@receiver(post_save, sender=CalendarDay)
+@receiver(post_delete, sender=CalendarDay)
+def calendar_day_changed(sender, instance, **kwargs):
+    # Календарь общий: день меняет отчеты всех садов, а не только того, где его правили
+    ReportSnapshot.invalidate_all_tenants(instance.day)
+@receiver(post_save, sender=GroupClosure)
+@receiver(post_delete, sender=GroupClosure)
+def group_closure_changed(sender, instance, **kwargs):
+    ReportSnapshot.invalidate(instance.date_from)
+def publish_attendance_delta(student_id, previous, current):
+    # Живой дашборд показывает только сегодняшнюю посещаемость по группам
+    today = date.today()
+    present = absent = 0
+    for (mark_date, status), sign in ((previous, -1), (current, 1)):
+        if mark_date == today and status is not None:
+            if status:
+                present += sign
+            else:
+                absent += sign
+    if not present and not absent:
+        return
+    group_id = Student.objects.filter(pk=student_id).values_list('group_id', flat=True).first()
+    if group_id is None:
+        return
+    from .live_events import publish
+    publish(tenant_channel('attendance'), {
+        'type': 'attendance_delta',
+        'group_id': group_id,
+        'date': today.isoformat(),
+        'present': present,
+        'absent': absent,
+    })
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Parent)
+def profile_user_linked(sender, instance, **kwargs):
+    # Пользователь с профилем воспитателя или родителя получает доступ к саду профиля
+    if instance.user_id is not None:
+        KindergartenMember.all_tenants.get_or_create(user_id=instance.user_id, defaults={'tenant_id': instance.tenant_id})
+@receiver(post_save, sender=User)
+def profile_user_changed(sender, instance, update_fields=None, **kwargs):
+    # Карточки воспитателя и родителя показывают логин, email и активность пользователя: сдвигаем updated_at профиля,
+    # иначе ETag карточки (см. scopes.teacher_scope) правку не заметит. Вход в систему карточку не меняет
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    Teacher.all_tenants.filter(user_id=instance.pk).update()
+    Parent.all_tenants.filter(user_id=instance.pk).update()
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_role_changed(sender, instance, **kwargs):
+    # Роль зависит от is_superuser; навигация кэшируется по роли, поэтому сбрасываем кэш роли
+    instance.__dict__.pop('_kindergarten_role', None)
+    invalidate_user_role(instance.pk)
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.__dict__.pop('_kindergarten_role', None)
+            invalidate_user_role(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        invalidate_user_role(*pk_set)
+    elif action == 'pre_clear':
+        # После очистки группы уже не узнать, кто в ней состоял
+        invalidate_user_role(*instance.user_set.values_list('pk', flat=True))
@@ -0,0 +1,14 @@
+# Нормализация для сравнения и ключей поиска дубликатов (Student.fio_key, Parent.phone_key)
+import re
+def normalize_text(value):
+    return ' '.join(str(value).split()).lower().replace('ё', 'е')
+def normalize_fio(value):
+    return normalize_text(value or '')[:100]
+def normalize_phone(value):
+    digits = re.sub(r'\D', '', str(value or ''))
+    # 8XXXXXXXXXX и XXXXXXXXXX приводим к 7XXXXXXXXXX
+    if len(digits) == 11 and digits[0] == '8':
+        digits = '7' + digits[1:]
+    elif len(digits) == 10:
+        digits = '7' + digits
+    return digits[:20]
@@ -0,0 +1,138 @@
+import json
+from django.core import signing
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+CURSOR_SALT = 'kindergarten.pagination.cursor'
+# Ниже этого порога оценке планировщика не доверяем и считаем точно: COUNT(*) по малой выборке дешев
+EXACT_COUNT_THRESHOLD = 1000
+def estimate_count(queryset):
+    """Оценка числа строк по статистике планировщика PostgreSQL. Возвращает None, если оценка недоступна."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    query = queryset.order_by().query
+    try:
+        with connection.cursor() as cursor:
+            if not query.where and not query.distinct and not query.annotations:
+                # Без фильтров достаточно reltuples из pg_class, который обновляет ANALYZE/autovacuum
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [connection.ops.quote_name(queryset.model._meta.db_table)]
+                )
+                row = cursor.fetchone()
+                # reltuples = -1, если таблица еще ни разу не анализировалась
+                return int(row[0]) if row and row[0] >= 0 else None
+            sql, params = query.get_compiler(using=queryset.db).as_sql()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+def wants_exact_count(request):
+    return request.GET.get('exact_count') == '1'
+class KeysetPage:
+    """Страница keyset-пагинации: вместо номера страницы хранит курсоры соседних страниц."""
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+    def __iter__(self):
+        return iter(self.object_list)
+    def __len__(self):
+        return len(self.object_list)
+    def __bool__(self):
+        return bool(self.object_list)
+    def __getitem__(self, index):
+        return self.object_list[index]
+    def has_next(self):
+        return self.next_cursor is not None
+    def has_previous(self):
+        return self.previous_cursor is not None
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+class KeysetPaginator:
+    """
+    Пагинация по ключу сортировки (WHERE (fio, pk) > (...) LIMIT n) вместо OFFSET.
+    Стоимость запроса не зависит от номера страницы, если ordering покрыт индексом.
+    ordering должен однозначно задавать порядок, поэтому последним полем идет pk.
+    """
+    def __init__(self, queryset, ordering, per_page=25, exact_count=False):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.exact_count = exact_count
+    @cached_property
+    def _count_info(self):
+        # Считается только если шаблон действительно выводит количество
+        if not self.exact_count:
+            estimate = estimate_count(self.queryset)
+            if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+                return estimate, True
+        return self.queryset.order_by().count(), False
+    @property
+    def count(self):
+        return self._count_info[0]
+    @property
+    def count_is_estimated(self):
+        return self._count_info[1]
+    def encode_cursor(self, obj, direction):
+        values = [_key_value(obj, field.lstrip('-')) for field in self.ordering]
+        return signing.dumps({'k': values, 'd': direction}, salt=CURSOR_SALT, compress=True)
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, None
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            values, direction = data['k'], data['d']
+        except (signing.BadSignature, KeyError, TypeError):
+            return None, None
+        if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != len(self.ordering):
+            return None, None
+        return values, direction
+    def _after_q(self, values, reverse):
+        # Лексикографическое сравнение кортежей: (a > x) OR (a = x AND b > y) OR ...
+        query = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            query |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return query
+    def _ordered(self, reverse):
+        if not reverse:
+            return self.queryset.order_by(*self.ordering)
+        return self.queryset.order_by(*[
+            field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering
+        ])
+    def get_page(self, cursor=None):
+        values, direction = self.decode_cursor(cursor)
+        backwards = direction == 'p'
+        queryset = self._ordered(reverse=backwards)
+        if values is not None:
+            queryset = queryset.filter(self._after_q(values, reverse=backwards))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        next_cursor = self.encode_cursor(rows[-1], 'n') if rows and has_next else None
+        previous_cursor = self.encode_cursor(rows[0], 'p') if rows and has_previous else None
+        return KeysetPage(rows, self, next_cursor=next_cursor, previous_cursor=previous_cursor)
+def paginate_keyset(request, queryset, ordering, per_page=25):
+    paginator = KeysetPaginator(queryset, ordering, per_page, exact_count=wants_exact_count(request))
+    return paginator.get_page(request.GET.get('cursor'))
+def _key_value(obj, path):
+    value = obj
+    for part in path.split('__'):
+        value = value[part] if isinstance(value, dict) else getattr(value, part)
+    # Даты и прочие значения передаем строкой, ORM приведет их к типу поля при фильтрации
+    return value if value is None or isinstance(value, (int, str)) else str(value)
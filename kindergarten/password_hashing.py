@@ -0,0 +1,19 @@
+# Хеширование паролей в пуле процессов для массового создания учетных записей. PBKDF2 считается сотни
+# миллисекунд на пароль и не отпускает GIL, поэтому потоки не ускоряют работу. Процессы пула запускаются
+# через spawn (fork многопоточного веб-сервера небезопасен) и читают только настройки, поэтому модуль
+# не импортирует модели.
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+# Несколько паролей быстрее захешировать на месте, чем запускать процессы
+POOL_THRESHOLD = 4
+def hash_passwords(passwords):
+    """Хеши паролей в том же порядке; для большого списка - параллельно в PASSWORD_HASH_WORKERS процессах."""
+    passwords = list(passwords)
+    workers = min(settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1, len(passwords))
+    if workers < 2 or len(passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
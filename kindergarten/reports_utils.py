@@ -7,6 +7,13 @@ import base64
 from datetime import date, timedelta
 from django.db.models import Count, Sum, Avg, Q, F
 from django.db import connection
+from .db_router import bind_context
+from .async_utils import gather_queries, run_queries
+from .archive import archived_attendance_by_year
+from .demographics import demographics
+from .school_calendar import attendance_rates, closed_days, ensure_calendar, rate_row
+from .snapshots import report_history
+from .timeseries import time_series
 from collections import defaultdict
 import json
 import calendar
@@ -14,7 +21,7 @@ def get_report_data_threaded(user, report_type, filters=None):
     if filters is None:
         filters = {}
     thread = threading.Thread(
-        target=generate_report_data,
+        target=bind_context(generate_report_data),
         args=(user, report_type, filters)
     )
     thread.daemon = True
@@ -115,26 +122,18 @@ def get_teacher_report_data(teacher, teacher_groups, report_type, filters):
             'data': attendance_data
         }
     elif report_type == 'monthly_stats':
-        monthly_data = []
-        for month in range(1, 13):
-            attendance_stats = Attendance.objects.filter(
-                student__group__in=teacher_groups,
-                attendance_date__year=date.today().year,
-                attendance_date__month=month
-            ).aggregate(
-                present=Count('pk', filter=Q(status=True)),
-                absent=Count('pk', filter=Q(status=False)),
-                total=Count('pk')
+        today = date.today()
+        series = time_series(
+            'attendance', Attendance.objects.filter(student__group__in=teacher_groups), 'month',
+            date(today.year, 1, 1), date(today.year, 12, 31)
+        )
+        monthly_data = [
+            {'month': period.month, 'present': present, 'absent': absent, 'attendance_rate': percentage}
+            for period, present, absent, total, percentage in zip(
+                series['periods'], series['present'], series['absent'], series['total'], series['percentage']
             )
-            if attendance_stats['total'] > 0:
-                monthly_data.append({
-                    'month': month,
-                    'present': attendance_stats['present'] or 0,
-                    'absent': attendance_stats['absent'] or 0,
-                    'attendance_rate': round(
-                        (attendance_stats['present'] or 0) / attendance_stats['total'] * 100, 1
-                    )
-                })
+            if total > 0
+        ]
         return {
             'type': 'chart_data',
             'title': f'Статистика посещаемости по месяцам',
@@ -168,17 +167,7 @@ def get_admin_report_data(user, report_type, filters):
                     ((attendance_today['present'] or 0) + (attendance_today['absent'] or 0)) * 100, 1
                 ) if ((attendance_today['present'] or 0) + (attendance_today['absent'] or 0)) > 0 else 0
             })
-        from django.db.models.functions import ExtractYear
-        current_year = date.today().year
-        age_stats = Student.objects.filter(
-            student_date_out__isnull=True
-        ).annotate(
-            birth_year=ExtractYear('student_birthday')
-        ).annotate(
-            age=current_year - F('birth_year')
-        ).values('age').annotate(
-            count=Count('pk')
-        ).order_by('age')
+        school_demographics = demographics(Student.objects.all(), today)
         teacher_stats = []
         for teacher in Teacher.objects.all():
             groups = Group.objects.filter(teacher=teacher)
@@ -192,9 +181,10 @@ def get_admin_report_data(user, report_type, filters):
         return {
             'type': 'dashboard_data',
             'group_stats': group_stats,
-            'age_stats': list(age_stats),
+            'age_stats': [{'age': bucket['label'], 'count': bucket['count']} for bucket in school_demographics['age_buckets']],
+            'demographics': school_demographics,
             'teacher_stats': teacher_stats,
-            'total_students': Student.objects.filter(student_date_out__isnull=True).count(),
+            'total_students': school_demographics['total'],
             'total_teachers': Teacher.objects.count(),
             'total_groups': Group.objects.count(),
             'total_parents': Parent.objects.count(),
@@ -272,6 +262,23 @@ def create_chart(chart_type, data, title):
     graphic = base64.b64encode(image_png).decode('utf-8')
     plt.close()
     return graphic
+def attendance_month_pdf(stats):
+    """PDF месячного отчета о посещаемости. Figure без pyplot не трогает общее состояние, шрифт DejaVu Sans - с кириллицей."""
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=(8.27, 11.69))  # A4
+    figure.text(0.08, 0.92, 'Отчет по посещаемости', fontsize=20)
+    lines = [
+        f"Период: {stats['month']}",
+        f"Присутствовали: {stats['present_count']}",
+        f"Отсутствовали: {stats['absent_count']}",
+        f"Всего записей: {stats['total']}",
+        f"Процент посещаемости: {stats['attendance_rate']}%",
+    ]
+    for number, line in enumerate(lines):
+        figure.text(0.08, 0.87 - number * 0.03, line, fontsize=12)
+    buffer = BytesIO()
+    figure.savefig(buffer, format='pdf')
+    return buffer.getvalue()
 def generate_parent_child_reports_threaded(child_id):
     result = {'status': 'processing', 'data': None}
     def worker():
@@ -281,7 +288,7 @@ def generate_parent_child_reports_threaded(child_id):
         except Exception as e:
             result['status'] = 'error'
             result['error'] = str(e)
-    thread = threading.Thread(target=worker)
+    thread = threading.Thread(target=bind_context(worker))
     thread.start()
     thread.join()
     return result
@@ -292,8 +299,9 @@ def generate_parent_child_reports(child_id):
         group = child.group
         calendar_data = get_child_attendance_calendar(child)
         if group:
-            group_students_attendance = get_group_students_attendance_percentage(group)
-            group_attendance_chart = get_group_attendance_chart_30days(group)
+            group_history = report_history('group', group.pk)
+            group_students_attendance = get_group_students_attendance_percentage(group, group_history)
+            group_attendance_chart = get_group_attendance_chart_30days(group, group_history)
         else:
             group_students_attendance = []
             group_attendance_chart = {}
@@ -309,12 +317,37 @@ def generate_parent_child_reports(child_id):
             },
             'calendar_data': calendar_data,
             'group_students_attendance': group_students_attendance,
-            'group_attendance_chart': group_attendance_chart
+            'group_attendance_chart': group_attendance_chart,
+            'archive_years': archived_attendance_by_year(child.pk),
         }
     except Student.DoesNotExist:
+        return generate_archived_child_report(child_id)
+def generate_archived_child_report(child_id):
+    # Выпускник, перенесенный в архив: только сведения о ребенке и итоги по учебным годам
+    from .models import ArchivedStudent
+    child = ArchivedStudent.objects.filter(pk=child_id).first()
+    if child is None:
         return None
+    return {
+        'child': {
+            'id': child.pk,
+            'fio': child.student_fio,
+            'birthday': child.student_birthday,
+            'age': child.age(),
+            'group_id': None,
+            'group_name': child.group_name or 'Не назначена',
+            'teacher_name': 'Не назначен',
+            'date_out': child.student_date_out,
+            'parents': child.parents,
+        },
+        'archived': True,
+        'calendar_data': None,
+        'group_students_attendance': [],
+        'group_attendance_chart': {},
+        'archive_years': archived_attendance_by_year(child.pk),
+    }
 def get_child_attendance_calendar(child):
-    from .models import Attendance
+    from .models import Attendance, CalendarDay, Student
     end_date = date.today()
     start_date = end_date - timedelta(days=29)
 
@@ -335,6 +368,9 @@ def get_child_attendance_calendar(child):
         }
         for att in attendances
     }
+    ensure_calendar(start_date, end_date)
+    calendar_days = {day.day: day for day in CalendarDay.objects.filter(day__range=[start_date, end_date])}
+    closed = closed_days(start_date, end_date, child.group_id)
     calendar_data = []
     current_date = padded_start_date
     while current_date <= padded_end_date:
@@ -349,6 +385,7 @@ def get_child_attendance_calendar(child):
             'is_padding': is_padding,
         }
         if not is_padding:
+            calendar_day = calendar_days[current_date]
             if current_date in attendance_dict:
                 att_data = attendance_dict[current_date]
                 if att_data['status']:
@@ -361,108 +398,64 @@ def get_child_attendance_calendar(child):
                     else:
                         day_data['status'] = 'absent'
                     day_data['reason'] = att_data['reason']
+            elif not calendar_day.is_school_day:
+                # Праздники и перенесенные выходные берутся из календаря учебных дней
+                day_data['status'] = 'weekend' if is_weekend and not calendar_day.note else 'holiday'
+                day_data['reason'] = calendar_day.note
+            elif current_date in closed:
+                day_data['status'] = 'closed'
+                day_data['reason'] = closed[current_date]
             else:
-                if is_weekend:
-                    day_data['status'] = 'weekend'
-                    day_data['reason'] = ''
-                else:
-                    day_data['status'] = 'no_data'
-                    day_data['reason'] = ''
+                day_data['status'] = 'no_data'
+                day_data['reason'] = ''
         else:
             # Пустые ячейки для выравнивания недель
             day_data['status'] = 'pad'
             day_data['reason'] = ''
         calendar_data.append(day_data)
         current_date += timedelta(days=1)
-    # В статистике учитываем только рабочие дни в исходном диапазоне (без паддинга)
-    working_days = [d for d in calendar_data if not d['is_weekend'] and not d['is_padding']]
-    total_days = len(working_days)
-    present_days = len([d for d in working_days if d['status'] == 'present'])
-    absent_days = len([d for d in working_days if d['status'] in ['absent', 'sick']])
+    # Статистика по учебным дням: выходные, праздники, закрытия группы и дни до зачисления не учитываются
+    stats = attendance_rates(Student.objects.filter(pk=child.pk), start_date, end_date).get(child.pk) or rate_row()
     return {
         'days': calendar_data,
         'stats': {
-            'total_days': total_days,
-            'present_days': present_days,
-            'absent_days': absent_days,
-            'attendance_percentage': round((present_days / total_days * 100) if total_days > 0 else 0, 1)
+            'total_days': stats['expected'],
+            'present_days': stats['present'],
+            'absent_days': stats['absent'],
+            'unmarked_days': stats['unmarked'],
+            'attendance_percentage': round((stats['present'] / stats['expected'] * 100) if stats['expected'] > 0 else 0, 1)
         }
     }
-def get_group_students_attendance_percentage(group):
-    from .models import Student, Attendance
-    today = date.today()
-    start_of_month = date(today.year, today.month, 1)
+def get_group_students_attendance_percentage(group, history=None):
+    from .models import Student
     students = Student.objects.filter(
         group=group,
         student_date_out__isnull=True
     ).order_by('student_fio')
+    rates = (history or report_history('group', group.pk))['students']
     students_data = []
     for student in students:
-        attendance_stats = Attendance.objects.filter(
-            student=student,
-            attendance_date__range=[start_of_month, today]
-        ).aggregate(
-            present=Count('pk', filter=Q(status=True)),
-            absent=Count('pk', filter=Q(status=False)),
-            total=Count('pk')
-        )
-        present = attendance_stats['present'] or 0
-        absent = attendance_stats['absent'] or 0
-        total = attendance_stats['total'] or 0
-        attendance_percentage = round((present / total * 100) if total > 0 else 0, 1)
+        stats = rates.get(student.pk) or rate_row()
         students_data.append({
             'id': student.pk,
             'fio': student.student_fio,
             'birthday': student.student_birthday,
             'age': student.age(),
-            'present_days': present,
-            'absent_days': absent,
-            'total_days': total,
-            'attendance_percentage': attendance_percentage
+            'present_days': stats['present'],
+            'absent_days': stats['absent'],
+            'total_days': stats['marked'],
+            'expected_days': stats['expected'],
+            'unmarked_days': stats['unmarked'],
+            'attendance_percentage': stats['percentage']
         })
     return students_data
-def get_group_attendance_chart_30days(group):
-    from .models import Attendance
-    end_date = date.today()
-    start_date = end_date - timedelta(days=29)
-    daily_attendance = Attendance.objects.filter(
-        student__group=group,
-        attendance_date__range=[start_date, end_date]
-    ).values('attendance_date').annotate(
-        present=Count('pk', filter=Q(status=True)),
-        absent=Count('pk', filter=Q(status=False)),
-        total=Count('pk')
-    ).order_by('attendance_date')
-    attendance_by_date = {
-        item['attendance_date']: item
-        for item in daily_attendance
-    }
-    labels = []
-    present_data = []
-    absent_data = []
-    percentage_data = []
-    current_date = start_date
-    while current_date <= end_date:
-        labels.append(current_date.strftime('%d.%m'))
-        if current_date in attendance_by_date:
-            data = attendance_by_date[current_date]
-            present = data['present']
-            absent = data['absent']
-            total = data['total']
-            percentage = round((present / total * 100) if total > 0 else 0, 1)
-        else:
-            present = 0
-            absent = 0
-            percentage = 0
-        present_data.append(present)
-        absent_data.append(absent)
-        percentage_data.append(percentage)
-        current_date += timedelta(days=1)
+def get_group_attendance_chart_30days(group, history=None):
+    series = (history or report_history('group', group.pk))['series']
     return {
-        'labels': labels,
-        'present': present_data,
-        'absent': absent_data,
-        'percentage': percentage_data
+        'labels': series['labels'],
+        'present': series['present'],
+        'absent': series['absent'],
+        'percentage': series['percentage']
     }
 def generate_teacher_students_with_parents(teacher_id):
     from .models import Teacher, Student, Parent, StudentParent
@@ -520,79 +513,43 @@ def generate_teacher_dashboard(teacher_id):
         teacher = Teacher.objects.get(pk=teacher_id)
         groups = teacher.group_set.all()
         today = date.today()
-        start_of_month = date(today.year, today.month, 1)
+        # Месяц и 30 дней: ночной снимок плюс сегодняшние отметки (см. snapshots.py)
+        history = report_history('teacher', teacher.pk, today)
+        group_rates = history['groups']
         group_attendance_stats = []
         for group in groups:
-            stats = Attendance.objects.filter(
-                student__group=group,
-                attendance_date__range=[start_of_month, today]
-            ).aggregate(
-                present=Count('pk', filter=Q(status=True)),
-                absent=Count('pk', filter=Q(status=False)),
-                total=Count('pk')
-            )
-            present = stats['present'] or 0
-            total = stats['total'] or 0
-            percentage = round((present / total * 100) if total > 0 else 0, 1)
+            stats = group_rates.get(group.pk) or rate_row()
             group_attendance_stats.append({
                 'group_name': group.group_name,
-                'present': present,
-                'absent': stats['absent'] or 0,
-                'percentage': percentage
+                'present': stats['present'],
+                'absent': stats['absent'],
+                'expected': stats['expected'],
+                'unmarked': stats['unmarked'],
+                'percentage': stats['percentage']
             })
-        end_date = today
-        start_date = end_date - timedelta(days=29)
-        daily_stats = Attendance.objects.filter(
-            student__group__in=groups,
-            attendance_date__range=[start_date, end_date]
-        ).values('attendance_date').annotate(
-            present=Count('pk', filter=Q(status=True)),
-            total=Count('pk')
-        ).order_by('attendance_date')
-        attendance_by_date = {item['attendance_date']: item for item in daily_stats}
-        labels = []
-        attendance_percentages = []
-        current_date = start_date
-        while current_date <= end_date:
-            labels.append(current_date.strftime('%d.%m'))
-            if current_date in attendance_by_date:
-                data = attendance_by_date[current_date]
-                percentage = round((data['present'] / data['total'] * 100) if data['total'] > 0 else 0, 1)
-            else:
-                percentage = 0
-            attendance_percentages.append(percentage)
-            current_date += timedelta(days=1)
+        series = history['series']
+        labels = series['labels']
+        attendance_percentages = series['percentage']
         students_low_attendance = []
         students = Student.objects.filter(
             group__in=groups,
             student_date_out__isnull=True
-        )
+        ).select_related('group')
+        student_rates = history['students']
         for student in students:
-            stats = Attendance.objects.filter(
-                student=student,
-                attendance_date__range=[start_of_month, today]
-            ).aggregate(
-                present=Count('pk', filter=Q(status=True)),
-                total=Count('pk')
-            )
-            present = stats['present'] or 0
-            total = stats['total'] or 0
-            percentage = round((present / total * 100) if total > 0 else 0, 1)
-            if percentage < 70 and total > 0:
+            stats = student_rates.get(student.pk) or rate_row()
+            if stats['percentage'] < 70 and stats['marked'] > 0:
                 students_low_attendance.append({
                     'fio': student.student_fio,
                     'group': student.group.group_name,
-                    'attendance_percentage': percentage,
-                    'present_days': present,
-                    'total_days': total
+                    'attendance_percentage': stats['percentage'],
+                    'present_days': stats['present'],
+                    'total_days': stats['marked']
                 })
         students_low_attendance.sort(key=lambda x: x['attendance_percentage'])
         age_distribution = []
         for group in groups:
-            students_count = Student.objects.filter(
-                group=group,
-                student_date_out__isnull=True
-            ).count()
+            students_count = group.students_count
             age_distribution.append({
                 'group_name': group.group_name,
                 'category': group.get_group_category_display(),
@@ -636,7 +593,8 @@ def generate_teacher_dashboard(teacher_id):
                 'data': attendance_percentages
             },
             'students_low_attendance': students_low_attendance,
-            'age_distribution': age_distribution
+            'age_distribution': age_distribution,
+            'demographics': demographics(Student.objects.filter(group__in=groups), today)
         }
     except Teacher.DoesNotExist:
         return None
@@ -662,7 +620,8 @@ def generate_admin_group_report(group_id):
             student_date_out__isnull=True
         ).prefetch_related('studentparent_set__parent').order_by('student_fio')
         today = date.today()
-        start_of_month = date(today.year, today.month, 1)
+        history = report_history('group', group.pk, today)
+        student_rates = history['students']
         students_data = []
         for student in students:
             parent_relations = StudentParent.objects.filter(
@@ -676,18 +635,7 @@ def generate_admin_group_report(group_id):
                     'relationship': rel.relationship_type,
                     'phone': parent.parent_number
                 })
-            attendance_stats = Attendance.objects.filter(
-                student=student,
-                attendance_date__range=[start_of_month, today]
-            ).aggregate(
-                present=Count('pk', filter=Q(status=True)),
-                absent=Count('pk', filter=Q(status=False)),
-                total=Count('pk')
-            )
-            present = attendance_stats['present'] or 0
-            absent = attendance_stats['absent'] or 0
-            total = attendance_stats['total'] or 0
-            percentage = round((present / total * 100) if total > 0 else 0, 1)
+            stats = student_rates.get(student.pk) or rate_row()
             students_data.append({
                 'id': student.pk,
                 'fio': student.student_fio,
@@ -696,30 +644,18 @@ def generate_admin_group_report(group_id):
                 'date_in': student.student_date_in,
                 'parents': parents_info,
                 'attendance': {
-                    'present': present,
-                    'absent': absent,
-                    'total': total,
-                    'percentage': percentage
+                    'present': stats['present'],
+                    'absent': stats['absent'],
+                    'total': stats['marked'],
+                    'expected': stats['expected'],
+                    'percentage': stats['percentage']
                 }
             })
         total_students = len(students_data)
-        # Распределение по полу
-        male_count = Student.objects.filter(group=group, student_date_out__isnull=True, student_gender='М').count()
-        female_count = Student.objects.filter(group=group, student_date_out__isnull=True, student_gender='Ж').count()
+        group_demographics = demographics(Student.objects.filter(group=group), today)
         fill_percentage = round((total_students / MAX_CAPACITY * 100) if MAX_CAPACITY > 0 else 0, 1)
-        avg_attendance = Attendance.objects.filter(
-            student__group=group,
-            attendance_date__range=[start_of_month, today]
-        ).aggregate(
-            present=Count('pk', filter=Q(status=True)),
-            total=Count('pk')
-        )
-        avg_percentage = round(
-            (avg_attendance['present'] / avg_attendance['total'] * 100) 
-            if avg_attendance['total'] and avg_attendance['total'] > 0 else 0,
-            1
-        )
-        chart_data = get_group_attendance_chart_30days(group)
+        avg_attendance = history['groups'].get(group.pk) or rate_row()
+        chart_data = get_group_attendance_chart_30days(group, history)
         return {
             'group_info': group_info,
             'students': students_data,
@@ -727,14 +663,13 @@ def generate_admin_group_report(group_id):
                 'total_students': total_students,
                 'max_capacity': MAX_CAPACITY,
                 'fill_percentage': fill_percentage,
-                'avg_attendance_percentage': avg_percentage,
-                'avg_attendance_present': avg_attendance['present'] or 0,
-                'avg_attendance_total': avg_attendance['total'] or 0
-            },
-            'gender_distribution': {
-                'male': male_count,
-                'female': female_count
+                'avg_attendance_percentage': avg_attendance['percentage'],
+                'avg_attendance_present': avg_attendance['present'],
+                'avg_attendance_total': avg_attendance['marked'],
+                'avg_attendance_expected': avg_attendance['expected']
             },
+            'gender_distribution': group_demographics['gender'],
+            'demographics': group_demographics,
             'chart_data': chart_data
         }
     except Group.DoesNotExist:
@@ -769,31 +704,18 @@ def generate_teacher_all_groups_report(teacher_id):
             }
         
         today = date.today()
-        start_of_month = date(today.year, today.month, 1)
         
         # Collect data for each group
+        history = report_history('teacher', teacher.pk, today)
+        group_rates = history['groups']
         groups_data = []
         total_students = 0
         total_capacity = 0
         
         for group in groups:
-            students = Student.objects.filter(
-                group=group,
-                student_date_out__isnull=True
-            ).count()
-            
-            attendance_stats = Attendance.objects.filter(
-                student__group=group,
-                attendance_date__range=[start_of_month, today]
-            ).aggregate(
-                present=Count('pk', filter=Q(status=True)),
-                absent=Count('pk', filter=Q(status=False)),
-                total=Count('pk')
-            )
+            students = group.students_count
             
-            present = attendance_stats['present'] or 0
-            total_att = attendance_stats['total'] or 0
-            percentage = round((present / total_att * 100) if total_att > 0 else 0, 1)
+            attendance_stats = group_rates.get(group.pk) or rate_row()
             
             fill_percentage = round((students / MAX_CAPACITY * 100) if MAX_CAPACITY > 0 else 0, 1)
             
@@ -804,10 +726,11 @@ def generate_teacher_all_groups_report(teacher_id):
                 'students_count': students,
                 'max_capacity': MAX_CAPACITY,
                 'fill_percentage': fill_percentage,
-                'attendance_present': present,
-                'attendance_absent': attendance_stats['absent'] or 0,
-                'attendance_total': total_att,
-                'attendance_percentage': percentage
+                'attendance_present': attendance_stats['present'],
+                'attendance_absent': attendance_stats['absent'],
+                'attendance_total': attendance_stats['marked'],
+                'attendance_expected': attendance_stats['expected'],
+                'attendance_percentage': attendance_stats['percentage']
             })
             
             total_students += students
@@ -815,61 +738,15 @@ def generate_teacher_all_groups_report(teacher_id):
         
         # Calculate overall statistics
         avg_fill = round((total_students / total_capacity * 100) if total_capacity > 0 else 0, 1)
-        # Gender distribution across all teacher's groups
-        male_total = Student.objects.filter(group__teacher=teacher, student_date_out__isnull=True, student_gender='М').count()
-        female_total = Student.objects.filter(group__teacher=teacher, student_date_out__isnull=True, student_gender='Ж').count()
+        teacher_demographics = demographics(Student.objects.filter(group__teacher=teacher), today)
         
-        overall_attendance = Attendance.objects.filter(
-            student__group__teacher=teacher,
-            attendance_date__range=[start_of_month, today]
-        ).aggregate(
-            present=Count('pk', filter=Q(status=True)),
-            total=Count('pk')
-        )
-        
-        avg_attendance = round(
-            (overall_attendance['present'] / overall_attendance['total'] * 100)
-            if overall_attendance['total'] and overall_attendance['total'] > 0 else 0,
-            1
-        )
-        
-        # Generate chart data for last 30 days
-        end_date = today
-        start_date = end_date - timedelta(days=29)
-        
-        # Get daily attendance for all teacher's groups
-        daily_stats = Attendance.objects.filter(
-            student__group__teacher=teacher,
-            attendance_date__range=[start_date, end_date]
-        ).values('attendance_date').annotate(
-            present=Count('pk', filter=Q(status=True)),
-            absent=Count('pk', filter=Q(status=False)),
-            total=Count('pk')
-        ).order_by('attendance_date')
+        overall_attendance = rate_row(*(
+            sum(stats[name] for stats in group_rates.values()) for name in ('expected', 'marked', 'present')
+        ))
+        avg_attendance = overall_attendance['percentage']
         
-        attendance_by_date = {item['attendance_date']: item for item in daily_stats}
-        
-        labels = []
-        present_data = []
-        absent_data = []
-        percentage_data = []
-        
-        current_date = start_date
-        while current_date <= end_date:
-            labels.append(current_date.strftime('%d.%m'))
-            
-            if current_date in attendance_by_date:
-                data = attendance_by_date[current_date]
-                present_data.append(data['present'])
-                absent_data.append(data['absent'])
-                percentage = round((data['present'] / data['total'] * 100) if data['total'] > 0 else 0, 1)
-                percentage_data.append(percentage)
-            else:
-                present_data.append(0)
-                absent_data.append(0)
-                percentage_data.append(0)
-            
-            current_date += timedelta(days=1)
+        # Chart data for last 30 days
+        series = history['series']
         
         return {
             'teacher_info': {
@@ -885,82 +762,67 @@ def generate_teacher_all_groups_report(teacher_id):
                 'total_capacity': total_capacity,
                 'avg_fill_percentage': avg_fill,
                 'avg_attendance_percentage': avg_attendance,
-                'month_present': overall_attendance['present'] or 0,
-                'month_total': overall_attendance['total'] or 0
-            },
-            'gender_distribution': {
-                'male': male_total,
-                'female': female_total
+                'month_present': overall_attendance['present'],
+                'month_total': overall_attendance['marked']
             },
+            'gender_distribution': teacher_demographics['gender'],
+            'demographics': teacher_demographics,
             'chart_data': {
-                'labels': labels,
-                'present': present_data,
-                'absent': absent_data,
-                'percentage': percentage_data
+                'labels': series['labels'],
+                'present': series['present'],
+                'absent': series['absent'],
+                'percentage': series['percentage']
             }
         }
     except Teacher.DoesNotExist:
         return None
 
-def generate_admin_dashboard():
+def admin_dashboard_queries(today):
+    """Независимые выборки админ-дашборда; каждую можно выполнить в отдельном потоке (см. async_utils)."""
     from .models import Group, Student, Teacher, Parent, Attendance
+    return {
+        'total_students': lambda: Student.objects.filter(student_date_out__isnull=True).count(),
+        'total_teachers': lambda: Teacher.objects.count(),
+        'total_groups': lambda: Group.objects.count(),
+        'total_parents': lambda: Parent.objects.count(),
+        'today_attendance': lambda: Attendance.objects.filter(attendance_date=today).aggregate(
+            present=Count('pk', filter=Q(status=True)),
+            absent=Count('pk', filter=Q(status=False)),
+            total=Count('pk')
+        ),
+        'daily_stats': lambda: report_history('admin', today=today)['series'],
+        'groups': lambda: list(Group.objects.select_related('teacher')),
+        'groups_today': lambda: {
+            row['student__group']: row for row in Attendance.objects.filter(
+                attendance_date=today
+            ).values('student__group').annotate(
+                present=Count('pk', filter=Q(status=True)),
+                absent=Count('pk', filter=Q(status=False)),
+                total=Count('pk')
+            ).order_by()
+        },
+        'demographics': lambda: demographics(Student.objects.all(), today),
+        'enrollments': lambda: time_series(
+            'enrollments', Student.objects.all(), 'month', date(today.year, 1, 1), date(today.year, 12, 31)
+        ),
+    }
+def build_admin_dashboard(today, results):
+    from .models import Group
     MAX_CAPACITY = Group.MAX_STUDENTS
-    today = date.today()
-    start_of_month = date(today.year, today.month, 1)
-    total_students = Student.objects.filter(student_date_out__isnull=True).count()
-    total_teachers = Teacher.objects.count()
-    total_groups = Group.objects.count()
-    total_parents = Parent.objects.count()
-    today_attendance = Attendance.objects.filter(
-        attendance_date=today
-    ).aggregate(
-        present=Count('pk', filter=Q(status=True)),
-        absent=Count('pk', filter=Q(status=False)),
-        total=Count('pk')
-    )
+    today_attendance = results['today_attendance']
     today_percentage = round(
         (today_attendance['present'] / today_attendance['total'] * 100)
         if today_attendance['total'] and today_attendance['total'] > 0 else 0,
         1
     )
-    end_date = today
-    start_date = end_date - timedelta(days=29)
-    daily_stats = Attendance.objects.filter(
-        attendance_date__range=[start_date, end_date]
-    ).values('attendance_date').annotate(
-        present=Count('pk', filter=Q(status=True)),
-        total=Count('pk')
-    ).order_by('attendance_date')
-    attendance_by_date = {item['attendance_date']: item for item in daily_stats}
-    labels_30days = []
-    attendance_percentages_30days = []
-    current_date = start_date
-    while current_date <= end_date:
-        labels_30days.append(current_date.strftime('%d.%m'))
-        if current_date in attendance_by_date:
-            data = attendance_by_date[current_date]
-            percentage = round((data['present'] / data['total'] * 100) if data['total'] > 0 else 0, 1)
-        else:
-            percentage = 0
-        attendance_percentages_30days.append(percentage)
-        current_date += timedelta(days=1)
-    age_distribution = []
-    for group in Group.objects.all():
-        students_count = Student.objects.filter(
-            group=group,
-            student_date_out__isnull=True
-        ).count()
-        if students_count > 0:
-            age_distribution.append({
-                'category': group.get_group_category_display(),
-                'count': students_count
-            })
+    # Точный возраст на сегодня, а не категория группы (см. demographics.py)
+    age_distribution = [
+        {'category': bucket['label'], 'count': bucket['count']} for bucket in results['demographics']['age_buckets']
+    ]
     groups_fill = []
-    for group in Group.objects.all():
-        students_count = Student.objects.filter(
-            group=group,
-            student_date_out__isnull=True
-        ).count()
+    groups_today_attendance = []
+    for group in results['groups']:
+        students_count = group.students_count
         fill_percentage = round((students_count / MAX_CAPACITY * 100) if MAX_CAPACITY > 0 else 0, 1)
         groups_fill.append({
             'group_name': group.group_name,
@@ -968,54 +830,47 @@ def generate_admin_dashboard():
             'max_capacity': MAX_CAPACITY,
             'fill_percentage': fill_percentage
         })
-    groups_today_attendance = []
-    for group in Group.objects.all():
-        today_stats = Attendance.objects.filter(
-            student__group=group,
-            attendance_date=today
-        ).aggregate(
-            present=Count('pk', filter=Q(status=True)),
-            absent=Count('pk', filter=Q(status=False)),
-            total=Count('pk')
-        )
-        present = today_stats['present'] or 0
-        total = today_stats['total'] or 0
+        today_stats = results['groups_today'].get(group.pk, {})
+        present = today_stats.get('present') or 0
+        total = today_stats.get('total') or 0
         percentage = round((present / total * 100) if total > 0 else 0, 1)
         groups_today_attendance.append({
             'group_id': group.pk,
             'group_name': group.group_name,
             'teacher': group.teacher.teacher_fio if group.teacher else 'Не назначен',
             'present': present,
-            'absent': today_stats['absent'] or 0,
+            'absent': today_stats.get('absent') or 0,
             'total': total,
             'percentage': percentage
         })
-    enrollments_by_month = []
-    for month in range(1, 13):
-        count = Student.objects.filter(
-            student_date_in__year=today.year,
-            student_date_in__month=month
-        ).count()
-        enrollments_by_month.append({
-            'month': calendar.month_name[month][:3],
-            'count': count
-        })
+    enrollments_by_month = [
+        {'month': calendar.month_name[period.month][:3], 'count': count}
+        for period, count in zip(results['enrollments']['periods'], results['enrollments']['count'])
+    ]
     return {
         'key_metrics': {
-            'total_students': total_students,
-            'total_teachers': total_teachers,
-            'total_groups': total_groups,
-            'total_parents': total_parents,
+            'total_students': results['total_students'],
+            'total_teachers': results['total_teachers'],
+            'total_groups': results['total_groups'],
+            'total_parents': results['total_parents'],
             'today_present': today_attendance['present'] or 0,
             'today_absent': today_attendance['absent'] or 0,
             'today_percentage': today_percentage
         },
         'attendance_trend_30days': {
-            'labels': labels_30days,
-            'data': attendance_percentages_30days
+            'labels': results['daily_stats']['labels'],
+            'data': results['daily_stats']['percentage']
         },
         'age_distribution': age_distribution,
+        'gender_distribution': results['demographics']['gender'],
+        'category_mismatch': results['demographics']['category_mismatch'],
         'groups_fill': groups_fill,
         'groups_today_attendance': groups_today_attendance,
         'enrollments_by_month': enrollments_by_month
-    }
\ No newline at end of file
+    }
+def generate_admin_dashboard():
+    today = date.today()
+    return build_admin_dashboard(today, run_queries(admin_dashboard_queries(today)))
+async def agenerate_admin_dashboard():
+    today = date.today()
+    return build_admin_dashboard(today, await gather_queries(admin_dashboard_queries(today)))
@@ -1,16 +1,27 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.urls import reverse
-from django.http import JsonResponse, HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from datetime import date, timedelta, datetime
 from django.db.models import Count, Q, Sum, Avg, F, When, Case, Value, IntegerField
+import asyncio
 import json
 import csv
 import threading
 from io import StringIO
 from .models import Student, Teacher, Group, Parent, Attendance, StudentParent
 from .reports_utils import get_report_data_threaded, generate_report_data, create_chart
+from .demographics import demographics
+from .timeseries import time_series
+from .decorators import use_report_replica, conditional_on_scope
+from .scopes import (
+    group_report_scope, parent_report_scope, report_scope, school_scope, student_scope, teacher_report_scope,
+)
+from .db_router import bind_context
+from .tenancy import tenant_channel
 def is_director_or_superuser(user):
     return user.groups.filter(name='Заведующие').exists() or user.is_superuser
 def is_teacher_director_or_superuser(user):
@@ -20,6 +31,7 @@ def is_teacher_director_or_superuser(user):
         user.is_superuser
     )
 @login_required
+@use_report_replica
 def reports_dashboard(request):
     if request.user.groups.filter(name='Родители').exists():
         if hasattr(request.user, 'parent_profile'):
@@ -54,6 +66,8 @@ def reports_dashboard(request):
         return redirect('reports_selector')
     return redirect('home')
 @login_required
+@use_report_replica
+@conditional_on_scope(report_scope)
 def generate_report_view(request, report_type):
     filters = request.GET.dict()
     thread = get_report_data_threaded(request.user, report_type, filters)
@@ -83,6 +97,8 @@ def generate_report_view(request, report_type):
     return render(request, 'kindergarten/report_result.html', context)
 
 @login_required
+@use_report_replica
+@conditional_on_scope(school_scope)
 def api_dashboard_data(request):
     if request.user.groups.filter(name='Заведующие').exists() or request.user.is_superuser:
         today = date.today()
@@ -107,7 +123,7 @@ def api_dashboard_data(request):
                 'datasets': [{
                     'label': 'Количество детей',
                     'data': [],
-                    'backgroundColor': ['#007bff', '#6610f2', '#6f42c1', '#e83e8c', '#fd7e14']
+                    'backgroundColor': ['#007bff', '#6610f2', '#6f42c1', '#e83e8c', '#fd7e14', '#20c997', '#6c757d']
                 }]
             },
             'capacity_chart': {
@@ -120,22 +136,13 @@ def api_dashboard_data(request):
             },
             'group_stats': []
         }
-        for i in range(7):
-            day = today - timedelta(days=i)
-            present = Attendance.objects.filter(attendance_date=day, status=True).count()
-            absent = Attendance.objects.filter(attendance_date=day, status=False).count()
-            data['attendance_chart']['labels'].insert(0, day.strftime('%d.%m'))
-            data['attendance_chart']['datasets'][0]['data'].insert(0, present)
-            data['attendance_chart']['datasets'][1]['data'].insert(0, absent)
-        age_groups = ['2-3 года', '3-4 года', '4-5 лет', '5-6 лет', '6-7 лет']
-        for age_group in age_groups:
-            count = Student.objects.filter(
-                student_date_out__isnull=True,
-                student_birthday__lte=date.today() - timedelta(days=int(age_group.split('-')[0])*365),
-                student_birthday__gt=date.today() - timedelta(days=int(age_group.split('-')[1].split()[0])*365)
-            ).count()
-            data['age_chart']['labels'].append(age_group)
-            data['age_chart']['datasets'][0]['data'].append(count)
+        week = time_series('attendance', Attendance.objects.all(), 'day', today - timedelta(days=6), today)
+        data['attendance_chart']['labels'] = week['labels']
+        data['attendance_chart']['datasets'][0]['data'] = week['present']
+        data['attendance_chart']['datasets'][1]['data'] = week['absent']
+        for bucket in demographics(Student.objects.all(), today)['age_buckets']:
+            data['age_chart']['labels'].append(bucket['label'])
+            data['age_chart']['datasets'][0]['data'].append(bucket['count'])
         for group in Group.objects.all():
             current = group.current_students_count()
             capacity = Group.MAX_STUDENTS
@@ -159,6 +166,8 @@ def api_dashboard_data(request):
         return JsonResponse(data)
     return JsonResponse({'error': 'Доступ запрещен'}, status=403)
 @login_required
+@use_report_replica
+@conditional_on_scope(parent_report_scope)
 def parent_reports(request):
     if not request.user.groups.filter(name='Родители').exists():
         messages.error(request, 'Доступ запрещен')
@@ -208,6 +217,8 @@ def parent_reports(request):
     }
     return render(request, 'kindergarten/parent_reports.html', context)
 @login_required
+@use_report_replica
+@conditional_on_scope(teacher_report_scope)
 def teacher_students_report(request):
     if not request.user.groups.filter(name='Воспитатели').exists():
         messages.error(request, 'Доступ запрещен')
@@ -219,7 +230,7 @@ def teacher_students_report(request):
     from .reports_utils import generate_teacher_students_with_parents
     def worker():
         return generate_teacher_students_with_parents(teacher.pk)
-    thread = threading.Thread(target=worker)
+    thread = threading.Thread(target=bind_context(worker))
     thread.start()
     thread.join()
     report_data = generate_teacher_students_with_parents(teacher.pk)
@@ -253,27 +264,44 @@ def teacher_students_report(request):
     return render(request, 'kindergarten/teacher_students_report.html', context)
 @login_required
 @user_passes_test(is_director_or_superuser)
-def reports_dashboard_admin(request):
-    from .reports_utils import generate_admin_dashboard
-    
-    def worker():
-        return generate_admin_dashboard()
-    
-    thread = threading.Thread(target=worker)
-    thread.start()
-    thread.join()
-    
-    dashboard_data = generate_admin_dashboard()
-    
-    if dashboard_data is None:
-        messages.error(request, 'Ошибка при генерации дашборда')
-        return redirect('home')
-    
+@use_report_replica
+@conditional_on_scope(school_scope)
+async def reports_dashboard_admin(request):
+    from .reports_utils import agenerate_admin_dashboard
+    # Независимые агрегаты дашборда выполняются одновременно, каждый в своем соединении
+    dashboard_data = await agenerate_admin_dashboard()
     context = {
         'dashboard_data': dashboard_data
     }
-    
-    return render(request, 'kindergarten/reports_dashboard_admin.html', context)
+    # Шаблон и context processors обращаются к БД синхронно
+    return await sync_to_async(render)(request, 'kindergarten/admin_dashboard_new.html', context)
+LIVE_KEEPALIVE_SECONDS = 15
+async def _live_event_stream(channel):
+    from .live_events import broker
+    subscriber = broker.subscribe(channel)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=LIVE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Комментарий SSE не дает прокси закрыть простаивающее соединение
+                yield ': keepalive\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        broker.unsubscribe(subscriber)
+@login_required
+@user_passes_test(is_director_or_superuser)
+async def attendance_live_events(request):
+    # Под WSGI бесконечный поток занял бы рабочий процесс целиком
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Поток событий доступен только при запуске под ASGI'}, status=503)
+    return StreamingHttpResponse(
+        _live_event_stream(tenant_channel('attendance')),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 @login_required
 @user_passes_test(is_teacher_director_or_superuser)
@@ -284,20 +312,17 @@ def reports_selector(request):
     is_director = request.user.groups.filter(name='Заведующие').exists()
     is_admin = request.user.is_superuser
     
-    # Get available groups and students based on role
+    # Get available groups based on role; students are loaded on demand via autocomplete_students
     if is_teacher and hasattr(request.user, 'teacher_profile'):
         teacher = request.user.teacher_profile
         groups = Group.objects.filter(teacher=teacher).order_by('group_name')
-        students = Student.objects.filter(group__teacher=teacher).order_by('student_fio')
         teachers = Teacher.objects.filter(pk=teacher.pk).annotate(groups_count=Count('group'))  # Only self
     else:  # Director or Admin
         groups = Group.objects.all().order_by('group_name')
-        students = Student.objects.all().order_by('student_fio')
         teachers = Teacher.objects.all().annotate(groups_count=Count('group')).order_by('teacher_fio')
     
     context = {
         'groups': groups,
-        'students': students,
         'teachers': teachers,
         'is_teacher': is_teacher,
         'is_director': is_director,
@@ -308,6 +333,8 @@ def reports_selector(request):
 
 @login_required
 @user_passes_test(is_teacher_director_or_superuser)
+@use_report_replica
+@conditional_on_scope(group_report_scope)
 def admin_group_report(request):
     if request.user.groups.filter(name='Воспитатели').exists():
         if hasattr(request.user, 'teacher_profile'):
@@ -330,7 +357,7 @@ def admin_group_report(request):
             from .reports_utils import generate_admin_group_report
             def worker():
                 return generate_admin_group_report(group_id)
-            thread = threading.Thread(target=worker)
+            thread = threading.Thread(target=bind_context(worker))
             thread.start()
             thread.join()
             report_data = generate_admin_group_report(group_id)
@@ -400,6 +427,8 @@ def admin_group_report(request):
     return render(request, 'kindergarten/admin_group_report.html', context)
 @login_required
 @user_passes_test(is_teacher_director_or_superuser)
+@use_report_replica
+@conditional_on_scope(teacher_report_scope)
 def teacher_all_groups_report(request):
     """Report for all groups of a teacher (or selected teacher for director/admin)"""
     # Determine user role
@@ -433,7 +462,7 @@ def teacher_all_groups_report(request):
     def worker():
         return generate_teacher_all_groups_report(teacher_id)
     
-    thread = threading.Thread(target=worker)
+    thread = threading.Thread(target=bind_context(worker))
     thread.start()
     thread.join()
     
@@ -492,14 +521,24 @@ def teacher_all_groups_report(request):
 
 @login_required
 @user_passes_test(is_teacher_director_or_superuser)
+@use_report_replica
+@conditional_on_scope(student_scope)
 def student_individual_report(request, student_id):
-    from .models import Student
+    from .models import ArchivedStudent, Student
     try:
-        student = Student.objects.select_related('group', 'group__teacher').get(pk=student_id)
+        student = Student.objects.select_related('group', 'group__teacher').filter(pk=student_id).first()
+        if student is not None:
+            group = student.group
+        else:
+            # Выпускник из архива: доступ проверяем по группе, в которой он учился
+            archived = ArchivedStudent.objects.filter(pk=student_id).only('group_id').first()
+            if archived is None:
+                raise Student.DoesNotExist
+            group = Group.objects.select_related('teacher').filter(pk=archived.group_id).first()
         if request.user.groups.filter(name='Воспитатели').exists():
             if hasattr(request.user, 'teacher_profile'):
                 teacher = request.user.teacher_profile
-                if student.group and student.group.teacher != teacher:
+                if group and group.teacher != teacher:
                     messages.error(request, 'Доступ к данным этого ученика запрещен')
                     return redirect('admin_group_report')
         from .reports_utils import generate_parent_child_reports_threaded
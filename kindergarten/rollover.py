@@ -0,0 +1,123 @@
+# Переход на новый учебный год и массовые переводы учеников между группами.
+# Вся операция проверяется целиком под блокировкой строк групп и выполняется несколькими UPDATE в одной транзакции,
+# без Student.save()/clean() и подсчета мест для каждого ученика.
+from collections import Counter
+from datetime import date
+from django.db.models import Case, F, Value, When
+from .models import Group, ReportSnapshot, Student
+from .tenancy import tenant_atomic
+CATEGORY_ORDER = [value for value, _ in Group.CATEGORY_CHOICES]
+# Подготовительной группы здесь нет: ее ученики выпускаются, а группа набирается заново как младшая
+NEXT_CATEGORY = dict(zip(CATEGORY_ORDER, CATEGORY_ORDER[1:]))
+class BulkPlan:
+    """Предпросмотр и результат массовой операции: при ошибках или dry_run ничего не сохраняется."""
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.changes = []
+        self.skipped = []
+        self.errors = []
+    @property
+    def applied(self):
+        return not self.dry_run and not self.errors and bool(self.changes)
+def rollover_groups(group_ids, to_year, graduation_date=None, dry_run=False):
+    """
+    Переводит группы в учебный год to_year: категория повышается на ступень, group_year = to_year.
+    Ученики подготовительных групп выпускаются (student_date_out = graduation_date), группа становится младшей.
+    Группы, уже переведенные в to_year, пропускаются, поэтому повторный запуск безопасен.
+    """
+    graduation_date = graduation_date or date.today()
+    plan = BulkPlan(dry_run)
+    with tenant_atomic():
+        groups = Group.objects.select_for_update().filter(pk__in=group_ids).order_by('pk').only(
+            'pk', 'group_name', 'group_category', 'group_year', 'students_count'
+        )
+        for group in groups:
+            if group.group_year >= to_year:
+                plan.skipped.append((group.group_name, f'уже в {group.group_year}/{group.group_year + 1} учебном году'))
+                continue
+            next_category = NEXT_CATEGORY.get(group.group_category)
+            plan.changes.append({
+                'group': group,
+                'from_category': group.group_category,
+                'to_category': next_category or CATEGORY_ORDER[0],
+                'from_year': group.group_year,
+                'to_year': to_year,
+                'students': group.students_count,
+                'graduates': group.students_count if next_category is None else 0,
+            })
+        if plan.dry_run or not plan.changes:
+            return plan
+        promoted = [change['group'].pk for change in plan.changes]
+        graduating = [change['group'].pk for change in plan.changes if change['from_category'] == CATEGORY_ORDER[-1]]
+        if graduating:
+            Student.objects.filter(group_id__in=graduating, student_date_out__isnull=True).update(
+                student_date_out=graduation_date
+            )
+            ReportSnapshot.invalidate(graduation_date)
+        # В правой части UPDATE group_category еще старая, поэтому счетчик обнуляется только у выпускных групп
+        Group.objects.filter(pk__in=promoted).update(
+            group_category=Case(
+                *[When(group_category=category, then=Value(NEXT_CATEGORY.get(category, CATEGORY_ORDER[0])))
+                  for category in CATEGORY_ORDER],
+                default=F('group_category'),
+            ),
+            group_year=Value(to_year),
+            students_count=Case(
+                When(group_category=CATEGORY_ORDER[-1], then=Value(0)),
+                default=F('students_count'),
+                output_field=Group._meta.get_field('students_count'),
+            ),
+        )
+    return plan
+def transfer_students(student_ids, target_group_id, dry_run=False):
+    """
+    Переводит учеников в группу target_group_id. Места проверяются для всей пачки сразу:
+    если в группе не хватает мест, не переводится никто.
+    """
+    plan = BulkPlan(dry_run)
+    with tenant_atomic():
+        # Блокируем учеников, чтобы параллельное редактирование не сбило счетчики групп
+        students = list(Student.objects.select_for_update().filter(pk__in=student_ids).order_by('pk').values(
+            'pk', 'student_fio', 'group_id', 'student_date_out'
+        ))
+        missing = set(student_ids) - {student['pk'] for student in students}
+        if missing:
+            plan.errors.append(f'Ученики не найдены: {", ".join(str(pk) for pk in sorted(missing))}')
+        delta = Counter()
+        for student in students:
+            if student['student_date_out'] is not None:
+                plan.errors.append(f'{student["student_fio"]}: ученик уже выпущен')
+            elif student['group_id'] == target_group_id:
+                plan.skipped.append((student['student_fio'], 'уже в этой группе'))
+            else:
+                plan.changes.append(student)
+                delta[target_group_id] += 1
+                if student['group_id'] is not None:
+                    delta[student['group_id']] -= 1
+        groups = {
+            group.pk: group for group in Group.objects.select_for_update().filter(pk__in=set(delta) | {target_group_id})
+            .order_by('pk').only('pk', 'group_name', 'students_count')
+        }
+        target = groups.get(target_group_id)
+        if target is None:
+            plan.errors.append('Группа не найдена')
+        elif target.students_count + delta[target_group_id] > Group.MAX_STUDENTS:
+            plan.errors.append(
+                f'В группе "{target.group_name}" свободно мест: {max(Group.MAX_STUDENTS - target.students_count, 0)}, '
+                f'а переводится учеников: {delta[target_group_id]}'
+            )
+        for change in plan.changes:
+            source = groups.get(change['group_id'])
+            change['from_group'] = source.group_name if source else 'Не назначена'
+            change['to_group'] = target.group_name if target else ''
+        if plan.dry_run or plan.errors or not plan.changes:
+            return plan
+        Student.objects.filter(pk__in=[student['pk'] for student in plan.changes]).update(group_id=target_group_id)
+        # История групп в снимках отчетов считается по текущей группе ученика
+        ReportSnapshot.invalidate()
+        # Счетчики всех затронутых групп одним UPDATE
+        Group.objects.filter(pk__in=[pk for pk, change in delta.items() if change]).update(students_count=Case(
+            *[When(pk=pk, then=F('students_count') + change) for pk, change in delta.items() if change],
+            default=F('students_count'), output_field=Group._meta.get_field('students_count'),
+        ))
+    return plan
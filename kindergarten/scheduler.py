@@ -0,0 +1,142 @@
+# Планировщик периодических задач без внешнего брокера. Процесс manage.py run_scheduler раз в несколько секунд
+# запускает задачи, у которых подошел срок; сами задачи объявляются в коде декоратором job (см. jobs.py).
+# Срок считается по истории запусков в scheduler_runs, общей для всех узлов, а выполнение берет блокировку
+# задачи: advisory lock в PostgreSQL или аренду строки в scheduler_locks (за pgbouncer и на остальных СУБД).
+# Поэтому при нескольких процессах планировщика каждую задачу выполняет только один из них.
+import hashlib
+import io
+import logging
+import os
+import socket
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Max
+from django.utils import timezone
+from .models import JobRun, SchedulerLock
+logger = logging.getLogger(__name__)
+DEFAULT_LEASE = timedelta(hours=2)
+OUTPUT_LIMIT = 10000
+NODE = f'{socket.gethostname()}:{os.getpid()}'
+JOBS = {}
+class Job:
+    """Задача планировщика: запускается каждые every (timedelta) или ежедневно в at (datetime.time, по TIME_ZONE)."""
+    def __init__(self, name, func, every=None, at=None, lease=DEFAULT_LEASE):
+        if (every is None) == (at is None):
+            raise ValueError(f'Задача {name}: укажите либо every, либо at')
+        self.name = name
+        self.func = func
+        self.every = every
+        self.at = at
+        # Аренда блокировки в таблице: если процесс упал, через lease задачу сможет взять другой узел
+        self.lease = lease
+    def last_scheduled(self, now):
+        local = timezone.localtime(now)
+        moment = local.replace(hour=self.at.hour, minute=self.at.minute, second=0, microsecond=0)
+        return moment if moment <= local else moment - timedelta(days=1)
+    def is_due(self, now, last_started):
+        if last_started is None:
+            return True
+        if self.every is not None:
+            return now >= last_started + self.every
+        return last_started < self.last_scheduled(now)
+    def next_run(self, now, last_started):
+        if last_started is None:
+            return now
+        if self.every is not None:
+            return last_started + self.every
+        moment = self.last_scheduled(now)
+        return moment if last_started < moment else moment + timedelta(days=1)
+    def describe(self):
+        if self.at is not None:
+            return f'ежедневно в {self.at:%H:%M}'
+        seconds = int(self.every.total_seconds())
+        for unit, label in ((86400, 'дн.'), (3600, 'ч'), (60, 'мин')):
+            if seconds % unit == 0:
+                return f'каждые {seconds // unit} {label}'
+        return f'каждые {seconds} с'
+def job(name, every=None, at=None, lease=DEFAULT_LEASE):
+    def register(func):
+        JOBS[name] = Job(name, func, every=every, at=at, lease=lease)
+        return func
+    return register
+def run_command(name, *args, **options):
+    """Запускает management-команду как задачу; ее вывод попадает в историю запуска."""
+    output = io.StringIO()
+    call_command(name, *args, stdout=output, stderr=output, **options)
+    return output.getvalue()
+def last_runs():
+    return dict(JobRun.objects.filter(job__in=list(JOBS)).values('job').annotate(
+        last=Max('started_at')
+    ).order_by().values_list('job', 'last'))
+def lock_key(name):
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), 'big', signed=True)
+@contextmanager
+def job_lock(job):
+    """Блокировка задачи на время выполнения; отдает False, если задачу уже выполняет другой процесс."""
+    # Advisory lock держится сессией, а pgbouncer в режиме transaction отдает каждой транзакции любое
+    # серверное соединение: снятие ушло бы не в ту сессию. За pgbouncer используем аренду строки
+    if connection.vendor == 'postgresql' and not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        key = lock_key(job.name)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [key])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+        return
+    now = timezone.now()
+    try:
+        SchedulerLock.objects.get_or_create(name=job.name, defaults={'locked_until': now})
+    except IntegrityError:
+        # При первом запуске строку одновременно вставил другой узел: она уже есть, аренду решит UPDATE ниже
+        pass
+    # Условный UPDATE атомарен: аренду получит только один процесс, а истекшая освобождается сама
+    acquired = bool(SchedulerLock.objects.filter(name=job.name, locked_until__lte=now).update(
+        owner=NODE, locked_until=now + job.lease
+    ))
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            SchedulerLock.objects.filter(name=job.name, owner=NODE).update(locked_until=timezone.now())
+def run_job(job, force=False):
+    """Выполняет задачу под блокировкой и записывает запуск; None - задачу выполняет другой процесс или срок не подошел."""
+    with job_lock(job) as acquired:
+        if not acquired:
+            return None
+        started_at = timezone.now()
+        # Срок проверяем еще раз под блокировкой: другой узел мог только что выполнить задачу
+        if not force and not job.is_due(started_at, last_runs().get(job.name)):
+            return None
+        run = JobRun.objects.create(job=job.name, node=NODE, started_at=started_at)
+        started = time.perf_counter()
+        try:
+            run.output = str(job.func() or '')
+            run.status = 'success'
+        except Exception:
+            logger.exception('Задача %s завершилась с ошибкой', job.name)
+            run.output = traceback.format_exc()
+            run.status = 'failed'
+        run.duration = round(time.perf_counter() - started, 3)
+        run.finished_at = timezone.now()
+        run.output = run.output[-OUTPUT_LIMIT:]
+        run.save(update_fields=['output', 'status', 'duration', 'finished_at'])
+        return run
+def run_due_jobs():
+    """Выполняет все задачи, у которых подошел срок; возвращает список выполненных запусков."""
+    now = timezone.now()
+    last = last_runs()
+    runs = []
+    for job in JOBS.values():
+        if job.is_due(now, last.get(job.name)):
+            run = run_job(job)
+            if run is not None:
+                runs.append(run)
+    return runs
@@ -0,0 +1,88 @@
+# Календарь учебных дней: выходные, праздники и закрытия групп (карантин, ремонт) учитываются в SQL.
+# Ожидаемые отметки - это учебные дни, в которые группа ученика работала и ученик уже был зачислен;
+# отчеты сравнивают их с поставленными отметками одним запросом, без перебора дат в Python.
+from datetime import timedelta
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
+from .models import Attendance, CalendarDay, GroupClosure, Student
+def default_school_day(day):
+    return day.weekday() < 5
+def ensure_calendar(start, end):
+    """Дописывает в календарь недостающие даты периода: по умолчанию учебные дни - будни."""
+    days = (end - start).days + 1
+    if days <= 0 or CalendarDay.objects.filter(day__range=(start, end)).count() == days:
+        return
+    CalendarDay.objects.bulk_create([
+        CalendarDay(day=start + timedelta(days=offset), is_school_day=default_school_day(start + timedelta(days=offset)))
+        for offset in range(days)
+    ], ignore_conflicts=True)
+def closures_for(group_id):
+    # Закрытия самой группы и всего сада
+    condition = Q(group__isnull=True)
+    if group_id is not None:
+        condition |= Q(group_id=group_id)
+    return GroupClosure.objects.filter(condition)
+def school_days(start, end, group_id=None):
+    """Учебные дни периода, в которые группа group_id (или весь сад) работала."""
+    ensure_calendar(start, end)
+    return CalendarDay.objects.filter(day__range=(start, end), is_school_day=True).exclude(
+        Exists(closures_for(group_id).filter(date_from__lte=OuterRef('day'), date_to__gte=OuterRef('day')))
+    )
+def closed_days(start, end, group_id=None):
+    """{дата: причина} для дней периода, когда группа не работала, хотя по календарю день учебный."""
+    days = {}
+    for closure in closures_for(group_id).filter(date_from__lte=end, date_to__gte=start).order_by('date_from'):
+        day = max(closure.date_from, start)
+        while day <= min(closure.date_to, end):
+            days.setdefault(day, closure.reason)
+            day += timedelta(days=1)
+    return days
+def attendance_rates(students, start, end, by='student'):
+    """
+    Ожидаемые и поставленные отметки учеников из students за период, сгруппированные по ученику (by='student')
+    или по группе (by='group'). Возвращает {pk: {expected, marked, present, absent, unmarked, percentage,
+    completeness}}; percentage - доля присутствий среди отметок учебных дней, completeness - доля учебных дней
+    с отметкой. Отметки в выходные и дни закрытия не учитываются.
+    """
+    ensure_calendar(start, end)
+    students = students.order_by().values('pk')
+    connection = connections[students.db]
+    quote = connection.ops.quote_name
+    def column(model, field):
+        return quote(model._meta.get_field(field).column)
+    key = column(Student, 'group' if by == 'group' else 'student_id')
+    scope_query, scope_params = students.query.get_compiler(using=students.db).as_sql()
+    sql = f'''
+        SELECT s.{key}, COUNT(*), COUNT(a.{column(Attendance, 'attendance_id')}),
+               COALESCE(SUM(CASE WHEN a.{column(Attendance, 'status')} THEN 1 ELSE 0 END), 0)
+        FROM {quote(Student._meta.db_table)} s
+        JOIN {quote(CalendarDay._meta.db_table)} c
+            ON c.{column(CalendarDay, 'is_school_day')} AND c.{column(CalendarDay, 'day')} BETWEEN %s AND %s
+            AND c.{column(CalendarDay, 'day')} >= s.{column(Student, 'student_date_in')}
+            AND (s.{column(Student, 'student_date_out')} IS NULL OR c.{column(CalendarDay, 'day')} <= s.{column(Student, 'student_date_out')})
+        LEFT JOIN {quote(Attendance._meta.db_table)} a
+            ON a.{column(Attendance, 'student')} = s.{column(Student, 'student_id')}
+            AND a.{column(Attendance, 'attendance_date')} = c.{column(CalendarDay, 'day')}
+        WHERE s.{column(Student, 'student_id')} IN ({scope_query})
+            AND NOT EXISTS (
+                SELECT 1 FROM {quote(GroupClosure._meta.db_table)} g
+                WHERE g.{column(GroupClosure, 'tenant')} = s.{column(Student, 'tenant')}
+                AND (g.{column(GroupClosure, 'group')} IS NULL OR g.{column(GroupClosure, 'group')} = s.{column(Student, 'group')})
+                AND c.{column(CalendarDay, 'day')} BETWEEN g.{column(GroupClosure, 'date_from')} AND g.{column(GroupClosure, 'date_to')}
+            )
+        GROUP BY s.{key}
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [start, end, *scope_params])
+        rows = cursor.fetchall()
+    return {pk: rate_row(expected, marked, present) for pk, expected, marked, present in rows}
+def rate_row(expected=0, marked=0, present=0):
+    return {
+        'expected': expected,
+        'marked': marked,
+        'present': present,
+        'absent': marked - present,
+        'unmarked': expected - marked,
+        'percentage': round(present / marked * 100, 1) if marked else 0,
+        'completeness': round(marked / expected * 100, 1) if expected else 0,
+    }
@@ -0,0 +1,10 @@
+# Учебный год начинается 1 сентября и обозначается годом начала: 2025 - это 2025/2026
+from datetime import date
+SCHOOL_YEAR_START_MONTH = 9
+def school_year_of(day):
+    """Год начала учебного года, в который попадает дата."""
+    return day.year if day.month >= SCHOOL_YEAR_START_MONTH else day.year - 1
+def school_year_start(year):
+    return date(year, SCHOOL_YEAR_START_MONTH, 1)
+def current_school_year():
+    return school_year_of(date.today())
@@ -0,0 +1,140 @@
+# Выборки, из которых строятся страницы: по ним conditional_on_scope считает ETag/Last-Modified
+from datetime import date, timedelta
+from django.core.exceptions import ValidationError
+from .models import (
+    ArchivedAttendance, ArchivedStudent, Attendance, CalendarDay, DeletionMark, Group, GroupClosure, Parent, Student,
+    StudentParent, Teacher,
+)
+from .security import sanitize_integer
+def calendar_scope():
+    # Ожидаемые отметки в отчетах зависят от учебных дней и закрытий групп
+    return [CalendarDay.objects.all(), GroupClosure.objects.all()]
+def table_changes(*models):
+    """
+    Таблицы сада целиком: последняя правка по индексу (tenant, updated_at) и последнее удаление по DeletionMark.
+    COUNT по всей таблице посещаемости на каждый запрос слишком дорог.
+    """
+    tables = [model._meta.db_table for model in models]
+    return [
+        *(model.objects.order_by('-updated_at')[:1] for model in models),
+        DeletionMark.objects.filter(table__in=tables).order_by('-updated_at')[:1],
+    ]
+def school_scope(request, *args, **kwargs):
+    # Отчеты по всему саду: любая правка любой таблицы меняет отчет.
+    # Календарь и закрытия - сотни строк, их проще считать как обычно
+    return [
+        *table_changes(Teacher, Group, Student, Parent, StudentParent, Attendance),
+        *calendar_scope(),
+    ]
+def student_scope(request, pk=None, student_id=None):
+    student_id = pk if pk is not None else student_id
+    return [
+        Student.objects.filter(pk=student_id),
+        Group.objects.filter(student__pk=student_id),
+        Teacher.objects.filter(group__student__pk=student_id),
+        StudentParent.objects.filter(student_id=student_id),
+        Parent.objects.filter(studentparent__student_id=student_id),
+        Attendance.objects.filter(student_id=student_id),
+        ArchivedStudent.objects.filter(pk=student_id),
+        ArchivedAttendance.objects.filter(student_id=student_id),
+        *calendar_scope(),
+    ]
+def student_attendance_scope(request, pk):
+    return [Student.objects.filter(pk=pk), Attendance.objects.filter(student_id=pk)]
+def teacher_scope(request, pk):
+    # Правки пользователя воспитателя (логин, email, активность) сдвигают updated_at воспитателя, см. profile_user_changed
+    return [
+        Teacher.objects.filter(pk=pk),
+        Group.objects.filter(teacher_id=pk),
+        Student.objects.filter(group__teacher_id=pk),
+    ]
+def group_scope(request, pk):
+    return [
+        Group.objects.filter(pk=pk),
+        Teacher.objects.filter(group__pk=pk),
+        Student.objects.filter(group_id=pk),
+        Attendance.objects.filter(student__group_id=pk, attendance_date=date.today()),
+    ]
+def parent_scope(request, pk):
+    return [
+        Parent.objects.filter(pk=pk),
+        StudentParent.objects.filter(parent_id=pk),
+        Student.objects.filter(studentparent__parent_id=pk),
+    ]
+def stats_scope(request, *args, **kwargs):
+    # Сводка api_stats: численность по саду и посещаемость за последнюю неделю
+    return [
+        Teacher.objects.all(),
+        Group.objects.all(),
+        Student.objects.all(),
+        Parent.objects.all(),
+        Attendance.objects.filter(attendance_date__gte=date.today() - timedelta(days=6)),
+    ]
+def parent_report_scope(request, *args, **kwargs):
+    # Отчет родителя: его дети, их группы целиком (посещаемость одногруппников) и архив выпущенных детей
+    if not hasattr(request.user, 'parent_profile'):
+        return []
+    pk = request.user.parent_profile.pk
+    children = StudentParent.objects.filter(parent_id=pk).values('student_id')
+    groups = Student.objects.filter(pk__in=children).values('group_id')
+    return [
+        *parent_scope(request, pk),
+        Group.objects.filter(pk__in=groups),
+        Teacher.objects.filter(group__pk__in=groups),
+        Student.objects.filter(group_id__in=groups),
+        Attendance.objects.filter(student__group_id__in=groups),
+        Attendance.objects.filter(student_id__in=children),
+        ArchivedStudent.objects.filter(pk__in=children),
+        ArchivedAttendance.objects.filter(student_id__in=children),
+        *calendar_scope(),
+    ]
+def report_teacher_id(request):
+    # Как в teacher_all_groups_report: воспитатель видит свои группы, заведующий - выбранного воспитателя
+    if request.user.groups.filter(name='Воспитатели').exists() and hasattr(request.user, 'teacher_profile'):
+        return request.user.teacher_profile.pk
+    try:
+        return sanitize_integer(request.GET.get('teacher_id'), min_value=1)
+    except ValidationError:
+        return None
+def teacher_report_scope(request, *args, **kwargs):
+    pk = report_teacher_id(request)
+    if pk is None:
+        return []
+    return [
+        *teacher_scope(request, pk),
+        StudentParent.objects.filter(student__group__teacher_id=pk),
+        Parent.objects.filter(studentparent__student__group__teacher_id=pk),
+        Attendance.objects.filter(student__group__teacher_id=pk),
+        *calendar_scope(),
+    ]
+def group_report_scope(request, *args, **kwargs):
+    # Список групп для выбора и, если группа выбрана, ее отчет с посещаемостью за весь период
+    if request.user.groups.filter(name='Воспитатели').exists():
+        teacher = getattr(request.user, 'teacher_profile', None)
+        scope = [Group.objects.filter(teacher_id=teacher.pk) if teacher else Group.objects.none()]
+    else:
+        scope = [Group.objects.all()]
+    try:
+        pk = sanitize_integer(request.GET.get('group_id'), min_value=1)
+    except ValidationError:
+        pk = None
+    if pk is None:
+        return scope
+    return [
+        *scope,
+        Group.objects.filter(pk=pk),
+        Teacher.objects.filter(group__pk=pk),
+        Student.objects.filter(group_id=pk),
+        StudentParent.objects.filter(student__group_id=pk),
+        Parent.objects.filter(studentparent__student__group_id=pk),
+        Attendance.objects.filter(student__group_id=pk),
+        *calendar_scope(),
+    ]
+def report_scope(request, *args, **kwargs):
+    # generate_report_view строит отчет по роли так же, как generate_report_data
+    roles = set(request.user.groups.values_list('name', flat=True))
+    if 'Родители' in roles:
+        return parent_report_scope(request)
+    if 'Воспитатели' in roles:
+        return teacher_report_scope(request)
+    return school_scope(request)
@@ -0,0 +1,81 @@
+# Ночные снимки отчетов. История посещаемости (месяц по вчерашний день, дневной ряд за 30 дней) после окончания дня
+# не меняется, поэтому команда build_report_snapshots ночью сохраняет ее для сада, каждого воспитателя и каждой
+# группы в компактном JSON. При запросе к снимку добавляются только сегодняшние отметки, и время отчета
+# не зависит от длины периода. Если снимка за вчера нет (не построен или сброшен исправлением прошлых отметок),
+# история считается вживую тем же кодом.
+from datetime import date, timedelta
+from .models import Attendance, Group, ReportSnapshot, Student, Teacher
+from .school_calendar import attendance_rates, rate_row
+from .timeseries import series_result, time_series
+SERIES_DAYS = 30
+# Область отчета: фильтр учеников по id воспитателя или группы
+SCOPES = {
+    'admin': None,
+    'teacher': 'group__teacher_id',
+    'group': 'group_id',
+}
+def scope_querysets(kind, object_id=0):
+    field = SCOPES[kind]
+    if field is None:
+        return Student.objects.all(), Attendance.objects.all()
+    return Student.objects.filter(**{field: object_id}), Attendance.objects.filter(**{f'student__{field}': object_id})
+def pack_rates(rates):
+    return {str(pk): [row['expected'], row['marked'], row['present']] for pk, row in rates.items()}
+def snapshot_data(kind, object_id, as_of):
+    """История области отчета по день as_of включительно - то, что ночью сохраняется в ReportSnapshot.data."""
+    students, attendance = scope_querysets(kind, object_id)
+    # Месяц берется тот, для которого снимок будет служить (as_of - вчера); первого числа история месяца пуста
+    month_start = (as_of + timedelta(days=1)).replace(day=1)
+    series = time_series('attendance', attendance, 'day', as_of - timedelta(days=SERIES_DAYS - 2), as_of)
+    return {
+        'as_of': as_of.isoformat(),
+        'students': pack_rates(attendance_rates(students, month_start, as_of)),
+        'groups': pack_rates(attendance_rates(students, month_start, as_of, by='group')),
+        'series': {name: series[name] for name in ('present', 'absent', 'total')},
+    }
+def build_snapshots(as_of=None, kinds=None):
+    """Строит снимки всех областей по день as_of (по умолчанию вчера); возвращает {вид: число снимков}."""
+    as_of = as_of or date.today() - timedelta(days=1)
+    object_ids = {
+        'admin': [0],
+        'teacher': list(Teacher.objects.filter(group__isnull=False).distinct().order_by('pk').values_list('pk', flat=True)),
+        'group': list(Group.objects.order_by('pk').values_list('pk', flat=True)),
+    }
+    built = {}
+    for kind in kinds or SCOPES:
+        for object_id in object_ids[kind]:
+            ReportSnapshot.objects.update_or_create(kind=kind, object_id=object_id, defaults={
+                'as_of': as_of,
+                'data': snapshot_data(kind, object_id, as_of),
+            })
+        # Снимки удаленных воспитателей и групп больше не нужны
+        ReportSnapshot.objects.filter(kind=kind).exclude(object_id__in=object_ids[kind]).delete()
+        built[kind] = len(object_ids[kind])
+    return built
+def merge_rates(history, today):
+    rates = {int(pk): rate_row(*values) for pk, values in history.items()}
+    for pk, row in today.items():
+        before = rates.get(pk) or rate_row()
+        rates[pk] = rate_row(*(before[name] + row[name] for name in ('expected', 'marked', 'present')))
+    return rates
+def report_history(kind, object_id=0, today=None):
+    """
+    История посещаемости области отчета по сегодняшний день включительно: снимок за вчера плюс сегодняшние отметки.
+    Возвращает {'students': {pk: rate_row}, 'groups': {pk: rate_row}} за месяц и 'series' (ответ time_series)
+    за SERIES_DAYS дней.
+    """
+    today = today or date.today()
+    yesterday = today - timedelta(days=1)
+    history = ReportSnapshot.objects.filter(
+        kind=kind, object_id=object_id, as_of=yesterday
+    ).values_list('data', flat=True).first() or snapshot_data(kind, object_id, yesterday)
+    students, attendance = scope_querysets(kind, object_id)
+    today_series = time_series('attendance', attendance, 'day', today, today)
+    periods = [today - timedelta(days=offset) for offset in range(SERIES_DAYS - 1, -1, -1)]
+    return {
+        'students': merge_rates(history['students'], attendance_rates(students, today, today)),
+        'groups': merge_rates(history['groups'], attendance_rates(students, today, today, by='group')),
+        'series': series_result('attendance', 'day', periods, {
+            name: history['series'][name] + today_series[name] for name in ('present', 'absent', 'total')
+        }),
+    }
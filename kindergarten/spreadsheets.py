@@ -0,0 +1,98 @@
+import codecs
+import csv
+import io
+import itertools
+import os
+import zipfile
+from xml.etree.ElementTree import ParseError
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from .normalization import normalize_text
+# По этому началу файла определяется кодировка CSV
+ENCODING_SAMPLE_SIZE = 64 * 1024
+# Поврежденный или переименованный файл: ошибки декодирования, архива XLSX, XML внутри него и разбора CSV
+READ_ERRORS = (ValueError, KeyError, zipfile.BadZipFile, ParseError, csv.Error)
+def _csv_encoding(file):
+    # Excel в русской локали сохраняет "CSV" в cp1251, современные программы - в UTF-8 (часто с BOM)
+    sample = file.read(ENCODING_SAMPLE_SIZE)
+    file.seek(0)
+    try:
+        # Без final: образец мог оборваться посреди многобайтного символа
+        codecs.getincrementaldecoder('utf-8')().decode(sample)
+    except UnicodeDecodeError:
+        return 'cp1251'
+    return 'utf-8-sig'
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding=_csv_encoding(file), newline='')
+    first_line = text.readline()
+    # Excel в русской локали сохраняет CSV через точку с запятой
+    delimiter = max(';,\t', key=first_line.count)
+    return csv.reader(itertools.chain([first_line], text), delimiter=delimiter)
+def _xlsx_rows(file):
+    from openpyxl import load_workbook
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    return workbook.active.iter_rows(values_only=True)
+def _checked_rows(rows):
+    # Файл читается по мере импорта, поэтому испорченная середина обнаруживается уже при переборе строк
+    try:
+        yield from rows
+    except READ_ERRORS:
+        raise ValidationError('Не удалось прочитать файл')
+def read_table(file, filename, header_aliases, required):
+    """
+    Построчно читает таблицу из CSV или XLSX, не загружая файл целиком.
+    header_aliases: {колонка: множество допустимых заголовков в нижнем регистре};
+    required: список колонок или кортежей взаимозаменяемых колонок.
+    Возвращает итератор пар (номер строки, {колонка: значение}).
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in ('.csv', '.xlsx'):
+        raise ValidationError('Поддерживаются только файлы CSV и XLSX')
+    try:
+        rows = _checked_rows(_csv_rows(file) if extension == '.csv' else _xlsx_rows(file))
+    except READ_ERRORS:
+        raise ValidationError('Не удалось прочитать файл')
+    header = next(rows, None)
+    if header is None:
+        raise ValidationError('Файл пуст')
+    columns = {}
+    for index, title in enumerate(header):
+        title = normalize_text(title or '')
+        for column, aliases in header_aliases.items():
+            if title in aliases:
+                columns.setdefault(column, index)
+    missing = []
+    for names in required:
+        names = names if isinstance(names, tuple) else (names,)
+        if not any(name in columns for name in names):
+            missing.append(' или '.join(names))
+    if missing:
+        raise ValidationError(f'В файле нет колонок: {", ".join(missing)}')
+    def records():
+        for line_number, values in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in values):
+                continue
+            yield line_number, {
+                column: values[index] if index < len(values) else None
+                for column, index in columns.items()
+            }
+    return records()
+class ImportReport:
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.imported = 0
+        self.errors = []
+    def add_error(self, line_number, message):
+        self.errors.append((line_number, message))
+    def errors_csv_response(self, filename='import_errors.csv'):
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # BOM пишем один раз: с charset=utf-8-sig он добавлялся бы к каждой строке
+        response.write('\ufeff')
+        self.write_errors(response)
+        return response
+    def write_errors(self, stream):
+        writer = csv.writer(stream, delimiter=';')
+        writer.writerow(['Строка', 'Ошибка'])
+        writer.writerows(self.errors)
@@ -0,0 +1,202 @@
+/**
+ * Автодополнение для выпадающих списков с большим количеством записей.
+ * Select с атрибутом data-autocomplete-url содержит только выбранное значение,
+ * остальные варианты подгружаются постранично с сервера по мере ввода.
+ */
+
+(function() {
+    'use strict';
+
+    const DEBOUNCE_MS = 250;
+
+    /**
+     * Запрашивает страницу результатов автодополнения
+     * @param {string} url - Адрес эндпоинта
+     * @param {Object} params - Параметры запроса (q, page, фильтры)
+     * @returns {Promise<{results: Array, more: boolean}>}
+     */
+    function fetchResults(url, params) {
+        const query = new URLSearchParams();
+        Object.keys(params).forEach(key => {
+            if (params[key] !== undefined && params[key] !== null && params[key] !== '') {
+                query.append(key, params[key]);
+            }
+        });
+        return fetch(url + '?' + query.toString(), {
+            credentials: 'same-origin',
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        }).then(response => {
+            if (!response.ok) {
+                return { results: [], more: false };
+            }
+            return response.json();
+        });
+    }
+
+    /**
+     * Собирает значения связанных полей формы (data-forward="group,active")
+     * @param {HTMLSelectElement} select - Исходный select
+     * @returns {Object}
+     */
+    function collectForwarded(select) {
+        const params = {};
+        const forward = select.dataset.forward;
+        if (!forward || !select.form) {
+            return params;
+        }
+        forward.split(',').forEach(name => {
+            const field = select.form.elements[name];
+            if (field && field.value) {
+                params[name] = field.value;
+            }
+        });
+        return params;
+    }
+
+    /**
+     * Заменяет select на поле ввода с подгружаемым списком вариантов
+     * @param {HTMLSelectElement} select - Select с атрибутом data-autocomplete-url
+     */
+    function initAutocomplete(select) {
+        if (select.dataset.autocompleteReady) {
+            return;
+        }
+        select.dataset.autocompleteReady = '1';
+
+        const url = select.dataset.autocompleteUrl;
+        const minChars = parseInt(select.dataset.minChars || '1', 10);
+
+        const wrapper = document.createElement('div');
+        wrapper.className = 'autocomplete-wrapper';
+
+        const input = document.createElement('input');
+        input.type = 'text';
+        input.className = 'form-control';
+        input.autocomplete = 'off';
+        input.placeholder = select.dataset.placeholder || '';
+        const selectedOption = select.options[select.selectedIndex];
+        if (selectedOption && selectedOption.value) {
+            input.value = selectedOption.textContent.trim();
+        }
+
+        const menu = document.createElement('div');
+        menu.className = 'list-group autocomplete-menu';
+        menu.style.display = 'none';
+
+        select.style.display = 'none';
+        select.parentNode.insertBefore(wrapper, select);
+        wrapper.appendChild(input);
+        wrapper.appendChild(menu);
+        wrapper.appendChild(select);
+
+        let timer = null;
+        let page = 1;
+        let term = '';
+
+        function hideMenu() {
+            menu.style.display = 'none';
+        }
+
+        function choose(item) {
+            let option = Array.from(select.options).find(opt => opt.value === String(item.id));
+            if (!option) {
+                option = new Option(item.text, item.id);
+                select.appendChild(option);
+            }
+            select.value = String(item.id);
+            input.value = item.text;
+            select.dispatchEvent(new Event('change', { bubbles: true }));
+            hideMenu();
+        }
+
+        function render(data, append) {
+            if (!append) {
+                menu.innerHTML = '';
+            }
+            const moreButton = menu.querySelector('.autocomplete-more');
+            if (moreButton) {
+                moreButton.remove();
+            }
+            data.results.forEach(item => {
+                const entry = document.createElement('button');
+                entry.type = 'button';
+                entry.className = 'list-group-item list-group-item-action';
+                entry.textContent = item.text;
+                if (item.group) {
+                    const hint = document.createElement('small');
+                    hint.className = 'text-muted ms-2';
+                    hint.textContent = item.group;
+                    entry.appendChild(hint);
+                }
+                entry.addEventListener('mousedown', event => {
+                    event.preventDefault();
+                    choose(item);
+                });
+                menu.appendChild(entry);
+            });
+            if (!menu.children.length) {
+                const empty = document.createElement('div');
+                empty.className = 'list-group-item text-muted';
+                empty.textContent = 'Ничего не найдено';
+                menu.appendChild(empty);
+            }
+            if (data.more) {
+                const more = document.createElement('button');
+                more.type = 'button';
+                more.className = 'list-group-item list-group-item-action text-center autocomplete-more';
+                more.textContent = 'Показать ещё';
+                more.addEventListener('mousedown', event => {
+                    event.preventDefault();
+                    load(true);
+                });
+                menu.appendChild(more);
+            }
+            menu.style.display = 'block';
+        }
+
+        function load(append) {
+            page = append ? page + 1 : 1;
+            const params = Object.assign({ q: term, page: page }, collectForwarded(select));
+            fetchResults(url, params).then(data => render(data, append));
+        }
+
+        input.addEventListener('input', () => {
+            term = input.value.trim();
+            if (!term && !select.required) {
+                select.value = '';
+                select.dispatchEvent(new Event('change', { bubbles: true }));
+            }
+            clearTimeout(timer);
+            if (term.length < minChars) {
+                hideMenu();
+                return;
+            }
+            timer = setTimeout(() => load(false), DEBOUNCE_MS);
+        });
+
+        input.addEventListener('focus', () => {
+            if (minChars === 0 && !menu.children.length) {
+                load(false);
+            }
+        });
+
+        input.addEventListener('blur', () => {
+            setTimeout(hideMenu, 150);
+        });
+    }
+
+    function initAll(root) {
+        (root || document).querySelectorAll('select[data-autocomplete-url]').forEach(initAutocomplete);
+    }
+
+    window.kgAutocomplete = {
+        init: initAll,
+        fetchResults: fetchResults
+    };
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', () => initAll());
+    } else {
+        initAll();
+    }
+})();
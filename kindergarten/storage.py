@@ -0,0 +1,43 @@
+import gzip
+import os
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+try:
+    import brotli
+except ImportError:
+    brotli = None
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ttf', '.eot', '.ico'}
+# Маленькие файлы сжимать бессмысленно: заголовки ответа весят больше выигрыша
+MIN_COMPRESS_SIZE = 512
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище collectstatic: имена файлов с хешем содержимого (manifest) и рядом
+    с каждым текстовым файлом готовые .gz и .br копии, которые отдает StaticAssetMiddleware.
+    """
+    def post_process(self, paths, dry_run=False, **options):
+        compressed = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and not isinstance(processed, Exception):
+                for path in (name, hashed_name):
+                    if path and path not in compressed:
+                        compressed.add(path)
+                        self.compress(path)
+            yield name, hashed_name, processed
+    def compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content, quality=11)))
+        for suffix, data in variants:
+            path = self.path(name + suffix)
+            # Копия, не давшая выигрыша, только замедлит отдачу; старую удаляем, чтобы не отдать устаревшую
+            if len(data) >= len(content):
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            with open(path, 'wb') as target:
+                target.write(data)
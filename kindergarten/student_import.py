@@ -0,0 +1,285 @@
+from collections import Counter
+from datetime import date, datetime
+from django.core.exceptions import ValidationError
+from django.db.models import Case, F, When
+from .models import Group, Parent, ReportSnapshot, Student, StudentParent
+from .normalization import normalize_fio, normalize_phone, normalize_text
+from .spreadsheets import ImportReport, read_table
+from .tenancy import tenant_atomic
+IMPORT_BATCH_SIZE = 1000
+HEADER_ALIASES = {
+    'student': {'student', 'student_fio', 'ученик', 'фио ученика', 'ребенок', 'фио ребенка'},
+    'birthday': {'birthday', 'student_birthday', 'дата рождения'},
+    'gender': {'gender', 'student_gender', 'пол'},
+    'address': {'address', 'student_address', 'адрес', 'адрес проживания'},
+    'date_in': {'date_in', 'student_date_in', 'дата поступления', 'дата зачисления'},
+    'group': {'group', 'group_name', 'группа'},
+    'parent': {'parent', 'parent_fio', 'родитель', 'фио родителя'},
+    'phone': {'phone', 'parent_number', 'телефон', 'телефон родителя'},
+    'relationship': {'relationship', 'relationship_type', 'степень родства', 'родство'},
+    'is_primary': {'is_primary', 'основной контакт'},
+}
+GENDER_VALUES = {'м': 'М', 'муж': 'М', 'мужской': 'М', 'm': 'М', 'ж': 'Ж', 'жен': 'Ж', 'женский': 'Ж', 'f': 'Ж'}
+YES_VALUES = {'1', 'true', 'да', '+', 'yes'}
+NO_VALUES = {'0', 'false', 'нет', '-', 'no', ''}
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+def read_roster(file, filename):
+    """Построчно читает список зачисления (ученики и их родители) из CSV или XLSX."""
+    return read_table(file, filename, HEADER_ALIASES, ['student', 'birthday', 'gender'])
+class EnrollmentReport(ImportReport):
+    def __init__(self, dry_run=False):
+        super().__init__(dry_run)
+        self.students_created = 0
+        self.students_existing = 0
+        self.parents_created = 0
+        self.parents_existing = 0
+        self.links_created = 0
+class StudentImporter:
+    """
+    Массовое зачисление учеников и родителей из таблицы. Одна строка - ребенок и (необязательно) один
+    его родитель; у ребенка с несколькими родителями строки повторяются.
+    Дубликаты ищутся по индексированным ключам: Student.fio_key + дата рождения и Parent.phone_key.
+    Места в группах проверяются для всего файла сразу, запись - несколькими bulk-запросами в одной транзакции.
+    """
+    def __init__(self, today=None):
+        self.today = today or date.today()
+        self.relationships = {}
+        for value, label in Parent.RELATIONSHIP_CHOICES:
+            self.relationships[normalize_text(value)] = value
+            self.relationships[normalize_text(label)] = value
+    def run(self, records, dry_run=False):
+        report = EnrollmentReport(dry_run)
+        students, parents, links = self.collect(records, report)
+        with tenant_atomic():
+            self.match_existing(students, parents, report)
+            new_students, taken = self.place_in_groups(students, report)
+            links = [
+                link for link in links
+                if not students[link['student']]['failed'] and not parents[link['parent']]['failed']
+            ]
+            # Новых родителей создаем, только если у них остался хотя бы один ребенок из файла
+            linked = {link['parent'] for link in links}
+            new_parents = [parents[key] for key in sorted(linked) if parents[key]['pk'] is None]
+            links = self.drop_existing_links(links, students, parents)
+            report.students_created = len(new_students)
+            report.parents_created = len(new_parents)
+            report.links_created = len(links)
+            report.imported = report.students_created
+            if not dry_run:
+                self.save(new_students, new_parents, links, students, parents, taken)
+        report.errors.sort()
+        return report
+    def collect(self, records, report):
+        """Разбирает строки файла; одинаковые ученики и родители в разных строках сливаются по ключам."""
+        students = {}
+        parents = {}
+        links = {}
+        for line_number, record in records:
+            report.rows += 1
+            try:
+                student = self.parse_student(record)
+            except ValidationError as e:
+                report.add_error(line_number, e.messages[0])
+                continue
+            key = (student['fio_key'], student['birthday'])
+            if key not in students:
+                students[key] = dict(student, line=line_number, pk=None, failed=False)
+            elif normalize_text(students[key]['group']) != normalize_text(student['group']):
+                report.add_error(line_number, f'Ученик уже указан в строке {students[key]["line"]} с другой группой')
+                continue
+            try:
+                parent = self.parse_parent(record)
+            except ValidationError as e:
+                report.add_error(line_number, e.messages[0])
+                continue
+            if parent is None:
+                continue
+            known = parents.setdefault(parent['phone_key'], dict(parent, line=line_number, pk=None, failed=False))
+            if normalize_fio(known['fio']) != normalize_fio(parent['fio']):
+                report.add_error(line_number, f'Телефон {parent["number"]} уже указан в строке {known["line"]} для родителя "{known["fio"]}"')
+                continue
+            link_key = (key, parent['phone_key'])
+            if link_key in links:
+                report.add_error(line_number, f'Повтор связи ученик-родитель из строки {links[link_key]["line"]}')
+                continue
+            links[link_key] = {
+                'student': key, 'parent': parent['phone_key'], 'line': line_number,
+                'relationship': parent['relationship'], 'is_primary': parent['is_primary'],
+            }
+        return students, parents, list(links.values())
+    def match_existing(self, students, parents, report):
+        # Один запрос на каждый вид ключа: по индексам students_dedup_idx и parents.phone_key
+        fio_keys = {fio_key for fio_key, _ in students}
+        for batch in batched(sorted(fio_keys)):
+            for pk, fio_key, birthday in Student.objects.filter(fio_key__in=batch).values_list(
+                'pk', 'fio_key', 'student_birthday'
+            ):
+                student = students.get((fio_key, birthday))
+                if student is not None and student['pk'] is None:
+                    student['pk'] = pk
+                    report.students_existing += 1
+        for batch in batched(sorted(parents)):
+            for pk, phone_key, fio in Parent.objects.filter(phone_key__in=batch).values_list(
+                'pk', 'phone_key', 'parent_fio'
+            ):
+                parent = parents[phone_key]
+                if parent['pk'] is not None or parent['failed']:
+                    continue
+                if normalize_fio(fio) != normalize_fio(parent['fio']):
+                    parent['failed'] = True
+                    report.add_error(parent['line'], f'Телефон {parent["number"]} уже записан за родителем "{fio}"')
+                    continue
+                parent['pk'] = pk
+                report.parents_existing += 1
+    def place_in_groups(self, students, report):
+        """Проверяет группы и места сразу для всех новых учеников; возвращает тех, кого можно зачислить."""
+        new_students = [student for student in students.values() if student['pk'] is None]
+        names = {normalize_text(student['group']) for student in new_students if student['group']}
+        groups = {}
+        if names:
+            group_ids = [
+                pk for pk, name in Group.objects.values_list('pk', 'group_name')
+                if normalize_text(name) in names
+            ]
+            # Блокируем строки нужных групп в порядке pk, как Group.move_occupancy
+            for group in Group.objects.select_for_update().filter(pk__in=group_ids).order_by('pk').only(
+                'pk', 'group_name', 'students_count'
+            ):
+                groups[normalize_text(group.group_name)] = group
+        taken = Counter()
+        placed = []
+        for student in sorted(new_students, key=lambda s: s['line']):
+            if student['group']:
+                group = groups.get(normalize_text(student['group']))
+                if group is None:
+                    student['failed'] = True
+                    report.add_error(student['line'], f'Группа "{student["group"]}" не найдена')
+                    continue
+                if group.students_count + taken[group.pk] >= Group.MAX_STUDENTS:
+                    student['failed'] = True
+                    report.add_error(student['line'], f'Группа "{group.group_name}" уже заполнена (максимум {Group.MAX_STUDENTS} учеников)')
+                    continue
+                taken[group.pk] += 1
+                student['group_id'] = group.pk
+            else:
+                student['group_id'] = None
+            placed.append(student)
+        return placed, taken
+    def drop_existing_links(self, links, students, parents):
+        # Связи между уже существующими учениками и родителями могут быть в базе
+        pairs = {
+            (students[link['student']]['pk'], parents[link['parent']]['pk']) for link in links
+            if students[link['student']]['pk'] is not None and parents[link['parent']]['pk'] is not None
+        }
+        parent_ids = {parent_id for _, parent_id in pairs}
+        existing = set()
+        for batch in batched(sorted({student_id for student_id, _ in pairs})):
+            existing.update(StudentParent.objects.filter(
+                student_id__in=batch, parent_id__in=parent_ids
+            ).values_list('student_id', 'parent_id'))
+        return [
+            link for link in links
+            if (students[link['student']]['pk'], parents[link['parent']]['pk']) not in existing
+        ]
+    def save(self, new_students, new_parents, links, students, parents, taken):
+        # bulk_create не вызывает save(), поэтому ключи дубликатов заполняем сами
+        created = Parent.objects.bulk_create([
+            Parent(parent_fio=parent['fio'], parent_number=parent['number'], phone_key=parent['phone_key'])
+            for parent in new_parents
+        ], batch_size=IMPORT_BATCH_SIZE)
+        for parent, obj in zip(new_parents, created):
+            parent['pk'] = obj.pk
+        created = Student.objects.bulk_create([
+            Student(
+                student_fio=student['fio'], student_birthday=student['birthday'], student_gender=student['gender'],
+                student_address=student['address'], student_date_in=student['date_in'],
+                group_id=student['group_id'], fio_key=student['fio_key'],
+            )
+            for student in new_students
+        ], batch_size=IMPORT_BATCH_SIZE)
+        for student, obj in zip(new_students, created):
+            student['pk'] = obj.pk
+        if new_students:
+            # Зачисление задним числом меняет ожидаемые дни в снимках отчетов
+            ReportSnapshot.invalidate(min(student['date_in'] for student in new_students))
+        if taken:
+            # Счетчики всех групп одним UPDATE
+            Group.objects.filter(pk__in=taken).update(students_count=Case(
+                *[When(pk=pk, then=F('students_count') + count) for pk, count in taken.items()],
+                default=F('students_count'), output_field=Group._meta.get_field('students_count'),
+            ))
+        StudentParent.objects.bulk_create([
+            StudentParent(
+                student_id=students[link['student']]['pk'], parent_id=parents[link['parent']]['pk'],
+                relationship_type=link['relationship'], is_primary=link['is_primary'],
+            )
+            for link in links
+        ], batch_size=IMPORT_BATCH_SIZE, ignore_conflicts=True)
+    def parse_student(self, record):
+        fio = ' '.join(str(record.get('student') or '').split())
+        if not fio:
+            raise ValidationError('Не указано ФИО ученика')
+        birthday = self.parse_date(record.get('birthday'), 'дата рождения')
+        if birthday is None:
+            raise ValidationError('Не указана дата рождения')
+        date_in = self.parse_date(record.get('date_in'), 'дата поступления') or self.today
+        gender = GENDER_VALUES.get(normalize_text(record.get('gender') or ''))
+        if gender is None:
+            raise ValidationError(f'Неверный пол "{record.get("gender")}", ожидается М или Ж')
+        student = Student(student_birthday=birthday, student_date_in=date_in)
+        age_at_entry = student.age_at_entry()
+        if age_at_entry < 2 or age_at_entry > 7:
+            raise ValidationError('Прием детей в детский сад осуществляется только в возрасте от 2 до 7 лет')
+        return {
+            'fio': fio[:100], 'fio_key': normalize_fio(fio), 'birthday': birthday, 'gender': gender,
+            'address': str(record.get('address') or '').strip(), 'date_in': date_in,
+            'group': ' '.join(str(record.get('group') or '').split()),
+        }
+    def parse_parent(self, record):
+        fio = ' '.join(str(record.get('parent') or '').split())
+        number = str(record.get('phone') or '').strip()
+        if not fio and not number:
+            return None
+        if not fio:
+            raise ValidationError('Не указано ФИО родителя')
+        phone_key = normalize_phone(number)
+        if len(phone_key) < 10:
+            raise ValidationError(f'Неверный телефон родителя "{number}"')
+        relationship = normalize_text(record.get('relationship') or '')
+        if relationship not in self.relationships:
+            raise ValidationError(f'Недопустимая степень родства "{record.get("relationship") or ""}"')
+        return {
+            'fio': fio[:100], 'number': number[:20], 'phone_key': phone_key,
+            'relationship': self.relationships[relationship],
+            'is_primary': self.parse_flag(record.get('is_primary')),
+        }
+    def parse_date(self, value, title):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        text = str(value or '').strip()
+        if not text:
+            return None
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(text, date_format).date()
+            except ValueError:
+                continue
+        raise ValidationError(f'Неверная {title} "{text}", ожидается ГГГГ-ММ-ДД или ДД.ММ.ГГГГ')
+    def parse_flag(self, value):
+        # Пустое значение - основной контакт, как и по умолчанию в StudentParent
+        if value is None or value == '':
+            return True
+        if isinstance(value, (bool, int, float)):
+            return bool(value)
+        text = normalize_text(value)
+        if text in YES_VALUES:
+            return True
+        if text in NO_VALUES:
+            return False
+        raise ValidationError(f'Неверное значение "основной контакт": "{value}"')
+def batched(values):
+    values = list(values)
+    for start in range(0, len(values), IMPORT_BATCH_SIZE):
+        yield values[start:start + IMPORT_BATCH_SIZE]
@@ -0,0 +1,82 @@
+# Несколько детских садов в одной установке. Текущий сад хранится в contextvar: в запросе его ставит
+# TenantMiddleware (по домену), в командах и задачах планировщика - use_tenant/each_tenant. Менеджеры моделей
+# с ключом сада (TenantModel) отбирают только строки текущего сада, новые строки получают его ключ,
+# а TenantRouter направляет запросы в БД сада (Kindergarten.database). Вне сада выборки не ограничены.
+import contextvars
+from contextlib import contextmanager
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+_current_tenant = contextvars.ContextVar('kindergarten_tenant', default=None)
+def current_tenant():
+    return _current_tenant.get()
+def set_current_tenant(tenant):
+    return _current_tenant.set(tenant)
+def reset_current_tenant(token):
+    _current_tenant.reset(token)
+@contextmanager
+def use_tenant(tenant):
+    token = set_current_tenant(tenant)
+    try:
+        yield tenant
+    finally:
+        reset_current_tenant(token)
+def tenant_database():
+    """Псевдоним БД текущего сада; None - сад не выбран или его данные лежат в default."""
+    tenant = current_tenant()
+    if tenant is None or tenant.database == 'default':
+        return None
+    return tenant.database
+def tenant_connection():
+    # Для сырого SQL: соединение с БД, в которой лежат данные текущего сада
+    return connections[tenant_database() or DEFAULT_DB_ALIAS]
+def tenant_atomic():
+    """transaction.atomic() в БД текущего сада: блокировки строк и пачки записи должны идти в ту же БД."""
+    return transaction.atomic(using=tenant_database() or DEFAULT_DB_ALIAS)
+def tenant_channel(name):
+    # Каналы живых событий разделены по садам: id групп разных БД могут совпадать
+    tenant = current_tenant()
+    return f'{name}:{tenant.pk}' if tenant is not None else name
+def active_tenants(slug=None):
+    from .models import Kindergarten
+    tenants = Kindergarten.objects.filter(is_active=True).order_by('pk')
+    if slug:
+        tenants = tenants.filter(slug=slug)
+    return list(tenants)
+def each_tenant(tenants=None):
+    """Перебирает сады (по умолчанию все активные); тело цикла выполняется с выбранным садом."""
+    for tenant in active_tenants() if tenants is None else tenants:
+        with use_tenant(tenant):
+            yield tenant
+def add_tenant_argument(parser):
+    parser.add_argument('--tenant', help='Код детского сада (Kindergarten.slug)')
+def command_tenants(slug=None):
+    """Сады для служебной команды: указанный в --tenant или все активные."""
+    tenants = active_tenants(slug)
+    if slug and not tenants:
+        raise CommandError(f'Детский сад с кодом {slug} не найден')
+    return tenants
+def command_tenant(slug=None):
+    """Сад для команды, меняющей данные: указанный в --tenant или единственный в установке."""
+    tenants = command_tenants(slug)
+    if len(tenants) != 1:
+        raise CommandError('Укажите детский сад: --tenant <код>')
+    return tenants[0]
+def bind_tenant(content, tenant):
+    """Ответ-поток читается после выхода из middleware: каждая порция формируется с садом запроса."""
+    iterator = iter(content)
+    while True:
+        with use_tenant(tenant):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+async def abind_tenant(content, tenant):
+    iterator = aiter(content)
+    while True:
+        with use_tenant(tenant):
+            try:
+                chunk = await anext(iterator)
+            except StopAsyncIteration:
+                return
+        yield chunk
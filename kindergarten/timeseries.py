@@ -0,0 +1,125 @@
+# Плотные временные ряды для графиков: показатель по дням/неделям/месяцам/годам за период, без пропусков.
+# Календарь периодов строит сама СУБД (generate_series в PostgreSQL, рекурсивный CTE в SQLite), к нему
+# присоединяется агрегат по области отчета - весь ряд считается одним запросом, без цикла по датам в Python.
+from datetime import date, timedelta
+from django.db import connections
+from django.db.models import Count, DateField, Q
+from django.db.models.functions import Trunc
+from .models import Attendance, Student
+GRANULARITIES = ('day', 'week', 'month', 'year')
+# Шаг календаря: интервал PostgreSQL и модификатор date() SQLite
+STEPS = {
+    'day': ('1 day', '+1 day'),
+    'week': ('1 week', '+7 days'),
+    'month': ('1 month', '+1 month'),
+    'year': ('1 year', '+1 year'),
+}
+LABEL_FORMATS = {
+    'day': '%d.%m',
+    'week': '%d.%m',
+    'month': '%m.%Y',
+    'year': '%Y',
+}
+# Показатель: модель области отчета, поле даты и агрегаты по периоду
+METRICS = {
+    'attendance': (Attendance, 'attendance_date', {
+        'present': Count('pk', filter=Q(status=True)),
+        'absent': Count('pk', filter=Q(status=False)),
+        'total': Count('pk'),
+    }),
+    'enrollments': (Student, 'student_date_in', {
+        'count': Count('pk'),
+    }),
+}
+def period_start(day, granularity):
+    """Начало периода, в который попадает day (неделя начинается с понедельника, как в Trunc)."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+def next_period(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if granularity == 'year':
+        return day.replace(year=day.year + 1)
+    return day + timedelta(days=1)
+def calendar_sql(vendor, granularity, start, end):
+    interval, modifier = STEPS[granularity]
+    if vendor == 'postgresql':
+        return (
+            'SELECT d::date AS period FROM generate_series(%s::date, %s::date, %s::interval) AS d',
+            [start, end, interval],
+        )
+    if vendor == 'sqlite':
+        return (
+            'WITH RECURSIVE calendar(period) AS ('
+            'SELECT date(%s) UNION ALL SELECT date(period, %s) FROM calendar WHERE date(period, %s) <= %s'
+            ') SELECT period FROM calendar',
+            [start.isoformat(), modifier, modifier, end.isoformat()],
+        )
+    return None
+def time_series(metric, scope, granularity='day', start=None, end=None, label_format=None):
+    """
+    Показатель metric ('attendance' или 'enrollments') по периодам granularity с start по end включительно.
+    scope - queryset модели показателя, задающий область отчета (группа, группы воспитателя, весь сад).
+    Возвращает {'periods': [даты начала периодов], 'labels': [...], <агрегат>: [...]}; для посещаемости
+    добавляется 'percentage'. Периоды без данных заполняются нулями.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Неизвестная детализация: {granularity}')
+    model, date_field, aggregates = METRICS[metric]
+    if scope.model is not model:
+        raise ValueError(f'Показатель {metric} считается по {model.__name__}, а не по {scope.model.__name__}')
+    end = end or date.today()
+    start = period_start(start or end, granularity)
+    rows = scope.filter(**{f'{date_field}__range': (start, end)}).annotate(
+        period=Trunc(date_field, granularity, output_field=DateField())
+    ).values('period').annotate(**aggregates).order_by()
+    connection = connections[rows.db]
+    calendar = calendar_sql(connection.vendor, granularity, start, end)
+    if calendar is None:
+        # Другие СУБД: агрегат одним запросом, пропуски заполняются здесь
+        values = {row['period']: row for row in rows}
+        periods = []
+        current = start
+        while current <= end:
+            periods.append(current)
+            current = next_period(current, granularity)
+        series = [(period, *(values.get(period, {}).get(name, 0) for name in aggregates)) for period in periods]
+    else:
+        quote = connection.ops.quote_name
+        calendar_query, calendar_params = calendar
+        rows_query, rows_params = rows.query.get_compiler(using=rows.db).as_sql()
+        columns = ', '.join(f'COALESCE(metric.{quote(name)}, 0)' for name in aggregates)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT calendar.period, {columns} FROM ({calendar_query}) calendar '
+                f'LEFT JOIN ({rows_query}) metric ON metric.{quote("period")} = calendar.period '
+                f'ORDER BY calendar.period',
+                [*calendar_params, *rows_params],
+            )
+            series = [
+                (date.fromisoformat(row[0]) if isinstance(row[0], str) else row[0], *row[1:])
+                for row in cursor.fetchall()
+            ]
+    columns = {name: [row[index] for row in series] for index, name in enumerate(aggregates, start=1)}
+    return series_result(metric, granularity, [row[0] for row in series], columns, label_format)
+def series_result(metric, granularity, periods, columns, label_format=None):
+    """Собирает ответ time_series из периодов и столбцов агрегатов (например, склеенных из снимка и сегодняшнего дня)."""
+    label_format = label_format or LABEL_FORMATS[granularity]
+    result = {
+        'periods': periods,
+        'labels': [period.strftime(label_format) for period in periods],
+        **columns,
+    }
+    if metric == 'attendance':
+        result['percentage'] = [
+            round(present / total * 100, 1) if total else 0
+            for present, total in zip(result['present'], result['total'])
+        ]
+    return result
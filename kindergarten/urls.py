@@ -1,5 +1,5 @@
 from django.urls import path
-from . import reports_views, views, views_auth, users_views
+from . import reports_views, views, views_auth, users_views, autocomplete_views
 urlpatterns = [
     path('accounts/login/', views_auth.login_view, name='login'),
     path('accounts/logout/', views_auth.logout_view, name='logout'),
@@ -9,7 +9,9 @@ urlpatterns = [
     path('search/', views.search, name='search'),
     path('students/', views.student_list, name='student_list'),
     path('students/<int:pk>/', views.student_detail, name='student_detail'),
+    path('students/<int:pk>/attendance-history/', views.student_attendance_history, name='student_attendance_history'),
     path('students/new/', views.student_create, name='student_create'),
+    path('students/import/', views.student_import, name='student_import'),
     path('students/<int:pk>/edit/', views.student_edit, name='student_edit'),
     path('students/<int:pk>/delete/', views.student_delete, name='student_delete'),
     path('teachers/', views.teacher_list, name='teacher_list'),
@@ -20,6 +22,9 @@ urlpatterns = [
     path('groups/', views.group_list, name='group_list'),
     path('groups/<int:pk>/', views.group_detail, name='group_detail'),
     path('groups/new/', views.group_create, name='group_create'),
+    path('groups/rollover/', views.group_rollover, name='group_rollover'),
+    path('groups/calendar/', views.school_calendar, name='school_calendar'),
+    path('groups/closures/<int:pk>/delete/', views.closure_delete, name='closure_delete'),
     path('groups/<int:pk>/edit/', views.group_edit, name='group_edit'),
     path('groups/<int:pk>/delete/', views.group_delete, name='group_delete'),
     path('parents/', views.parent_list, name='parent_list'),
@@ -32,6 +37,7 @@ urlpatterns = [
     path('relations/<int:relation_id>/remove/', views.remove_parent_child_relation, name='remove_parent_child_relation'),
     path('attendance/', views.attendance_list, name='attendance_list'),
     path('attendance/mark-bulk/', views.attendance_mark_bulk, name='attendance_mark_bulk'),
+    path('attendance/import/', views.attendance_import, name='attendance_import'),
     path('attendance/update/<int:pk>/', views.attendance_update, name='attendance_update'),
     path('attendance/new/', views.attendance_create, name='attendance_create'),
     path('attendance/<int:pk>/edit/', views.attendance_edit, name='attendance_edit'),
@@ -42,13 +48,21 @@ urlpatterns = [
     path('reports/teacher/students/', reports_views.teacher_students_report, name='teacher_students_report'),
     path('reports/admin/group/', reports_views.admin_group_report, name='admin_group_report'),
     path('reports/student/<int:student_id>/', reports_views.student_individual_report, name='student_individual_report'),
+    path('reports/live/attendance/', reports_views.attendance_live_events, name='attendance_live_events'),
     path('reports/selector/', reports_views.reports_selector, name='reports_selector'),
     path('reports/group/', reports_views.admin_group_report, name='report_group'),
     path('reports/student/<int:student_id>/', reports_views.student_individual_report, name='report_student'),
     path('reports/teacher/groups/', reports_views.teacher_all_groups_report, name='report_teacher_groups'),
     path('api/stats/', views.api_stats, name='api_stats'),
+    path('api/db-pool/', views.api_db_pool_stats, name='api_db_pool_stats'),
+    path('api/export/<slug:dataset>.ndjson', views.api_export, name='api_export'),
+    path('autocomplete/students/', autocomplete_views.autocomplete_students, name='autocomplete_students'),
+    path('autocomplete/parents/', autocomplete_views.autocomplete_parents, name='autocomplete_parents'),
+    path('autocomplete/groups/', autocomplete_views.autocomplete_groups, name='autocomplete_groups'),
+    path('autocomplete/teachers/', autocomplete_views.autocomplete_teachers, name='autocomplete_teachers'),
     path('users/', users_views.user_management, name='user_management'),
     path('users/create/', users_views.create_user, name='create_user'),
+    path('users/import/', users_views.account_import, name='account_import'),
     path('users/<int:user_id>/edit/', users_views.edit_user, name='edit_user'),
     path('users/<int:user_id>/change-password/', users_views.change_user_password, name='change_user_password'),
     path('users/<int:user_id>/activate/', users_views.activate_user, name='activate_user'),
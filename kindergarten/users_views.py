@@ -3,10 +3,14 @@ from django.contrib.auth.models import User, Group
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.core.exceptions import ValidationError
 from django.db.models import Q
-from .models import Parent, Teacher, Group as KindergartenGroup
+from .forms import AccountImportForm
+from .models import KindergartenMember, Parent, Teacher, Group as KindergartenGroup
+from .pagination import paginate_keyset
 from django.http import HttpResponseForbidden, JsonResponse
+# Сколько ошибок списка учетных записей показывать на странице, полный список - в CSV
+ACCOUNT_ERRORS_SHOWN = 200
 def is_superuser(user):
     return user.is_superuser
 @login_required
@@ -17,7 +21,11 @@ def user_management(request):
     search_query = request.GET.get('search', '')
     role_filter = request.GET.get('role', '')
     status_filter = request.GET.get('status', '')
-    users = User.objects.all().order_by('-date_joined')
+    # Пользователи текущего детского сада и суперпользователи, которые управляют всеми садами
+    tenant_users = User.objects.filter(
+        Q(pk__in=list(KindergartenMember.objects.values_list('user_id', flat=True))) | Q(is_superuser=True)
+    )
+    users = tenant_users.select_related('parent_profile', 'teacher_profile').prefetch_related('groups')
     if search_query:
         users = users.filter(
             Q(username__icontains=search_query) |
@@ -29,21 +37,16 @@ def user_management(request):
         users = users.filter(is_active=True)
     elif status_filter == 'inactive':
         users = users.filter(is_active=False)
-    director_count = User.objects.filter(groups__name='Заведующие').count()
-    teacher_count = User.objects.filter(groups__name='Воспитатели').count()
-    parent_count = User.objects.filter(groups__name='Родители').count()
-    superuser_count = User.objects.filter(is_superuser=True).count()
-    paginator = Paginator(users, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    director_count = tenant_users.filter(groups__name='Заведующие').count()
+    teacher_count = tenant_users.filter(groups__name='Воспитатели').count()
+    parent_count = tenant_users.filter(groups__name='Родители').count()
+    superuser_count = tenant_users.filter(is_superuser=True).count()
+    # Порядок по убыванию id совпадает с порядком регистрации и идет по первичному ключу
+    page_obj = paginate_keyset(request, users, ('-id',), 20)
     all_groups = Group.objects.filter(name__in=['Родители', 'Воспитатели', 'Заведующие']).order_by('name')
-    all_parents = Parent.objects.all().order_by('parent_fio')
-    all_teachers = Teacher.objects.all().order_by('teacher_fio')
     context = {
         'users': page_obj,
         'all_groups': all_groups,
-        'all_parents': all_parents,
-        'all_teachers': all_teachers,
         'director_count': director_count,
         'teacher_count': teacher_count,
         'parent_count': parent_count,
@@ -85,12 +88,47 @@ def create_user(request):
                 user.is_staff = False
                 messages.success(request, f'Родитель {full_name} успешно создан!')
             user.save()
+            if not user.is_superuser:
+                KindergartenMember.objects.create(user=user)
             return redirect('user_management')
     else:
         form = UserCreationForm()
     return render(request, 'registration/register_admin.html', {'form': form})
 @login_required
 @user_passes_test(is_superuser, login_url='home')
+def account_import(request):
+    from .account_import import AccountImporter, read_accounts
+    report = None
+    if request.method == 'POST':
+        form = AccountImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = AccountImporter().run(read_accounts(upload, upload.name), dry_run=form.cleaned_data['dry_run'])
+            except ValidationError as e:
+                form.add_error('file', e)
+            else:
+                if report.errors and form.cleaned_data['errors_as_csv']:
+                    return report.errors_csv_response('account_import_errors.csv')
+                summary = (f'учетных записей: {report.accounts_created}, из них для существующих профилей: '
+                           f'{report.profiles_linked}')
+                if report.errors:
+                    messages.error(request, f'Найдено ошибок: {len(report.errors)}. Учетные записи не созданы')
+                elif report.dry_run:
+                    messages.info(request, f'Проверено строк: {report.rows}. Будет создано {summary}. Данные не сохранены')
+                else:
+                    # Пароли больше нигде не хранятся: лист учетных данных отдаем сразу
+                    messages.success(request, f'Создано {summary}')
+                    return report.credentials_csv_response()
+    else:
+        form = AccountImportForm()
+    return render(request, 'kindergarten/account_import.html', {
+        'form': form,
+        'report': report,
+        'errors': report.errors[:ACCOUNT_ERRORS_SHOWN] if report else [],
+    })
+@login_required
+@user_passes_test(is_superuser, login_url='home')
 def edit_user(request, user_id):
     if not request.user.is_superuser:
         return HttpResponseForbidden("Доступ запрещен")
@@ -2,16 +2,23 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.core.exceptions import ValidationError
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.paginator import Paginator
 from django.db.models import Count, Q
 from datetime import date, timedelta
 import csv
-from django.http import HttpResponse, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
-from .models import Student, Teacher, Group, Parent, Attendance, StudentParent
+from .models import Student, Teacher, Group, Parent, Attendance, StudentParent, CalendarDay, GroupClosure
 from .forms import StudentForm, TeacherForm, GroupForm, ParentForm, AttendanceForm, StudentParentForm
-from .forms import AddChildToParentForm, AddParentToChildForm
-from .decorators import get_user_role, role_required
+from .forms import AddChildToParentForm, AddParentToChildForm, AttendanceImportForm, StudentImportForm
+from .forms import GroupRolloverForm, StudentTransferForm, GroupClosureForm, CalendarDayForm
+from .decorators import get_user_role, role_required, use_report_replica, pin_to_primary_after_write, conditional_on_scope
+from .pagination import KeysetPaginator, paginate_keyset
+from .exports import DATASETS, aexport_lines, export_lines, export_params, export_queryset
+from .async_utils import gather_queries
+from .timeseries import time_series
+from .scopes import school_scope, stats_scope, student_scope, student_attendance_scope, teacher_scope, group_scope, parent_scope
 def is_director_or_superuser(user):
     return user.groups.filter(name='Заведующие').exists() or user.is_superuser
 def is_teacher_director_or_superuser(user):
@@ -86,48 +93,84 @@ def student_list(request):
         students = students.filter(student_date_out__isnull=True)
     elif status_filter == 'graduated':
         students = students.filter(student_date_out__isnull=False)
-    students = students.order_by('student_fio')
-    paginator = Paginator(students, 25)
-    page_number = request.GET.get('page')
-    try:
-        page_obj = paginator.get_page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.get_page(1)
-    except EmptyPage:
-        page_obj = paginator.get_page(paginator.num_pages)
+    page_obj = paginate_keyset(request, students, ('student_fio', 'pk'), 25)
     return render(request, 'kindergarten/student_list.html', {
         'students': page_obj,
         'groups': groups,
         'selected_group': selected_group,
     })
-@login_required
-def student_detail(request, pk):
-    student = get_object_or_404(Student, pk=pk)
-    user_role = get_user_role(request.user)
-    
-    # Check access permissions
+def can_view_student(user, student):
+    user_role = get_user_role(user)
     if user_role == 'parent':
         # Parents can only view their own children
-        parent_children = get_parent_children(request.user)
-        if student not in parent_children:
-            messages.error(request, 'У вас нет доступа к информации об этом ребенке!')
-            return redirect('home')
-    elif user_role == 'teacher':
+        return get_parent_children(user).filter(pk=student.pk).exists()
+    if user_role == 'teacher':
         # Teachers can only view students from their groups
-        teacher_groups = get_teacher_groups(request.user)
-        if student.group not in teacher_groups:
-            messages.error(request, 'У вас нет доступа к информации об этом ребенке!')
-            return redirect('home')
-    
+        return get_teacher_groups(user).filter(pk=student.group_id).exists()
+    return True
+ATTENDANCE_HISTORY_PAGE_SIZE = 10
+def attendance_history_page(student, cursor=None, status='', reason=None, date_from=None, date_to=None):
+    # Ключ (student, attendance_date) уникален, поэтому для курсора достаточно даты
+    history = Attendance.objects.filter(student=student).values('attendance_date', 'status', 'reason')
+    if status == 'present':
+        history = history.filter(status=True)
+    elif status == 'absent':
+        history = history.filter(status=False)
+    if reason is not None:
+        history = history.filter(reason=reason)
+    if date_from:
+        history = history.filter(attendance_date__gte=date_from)
+    if date_to:
+        history = history.filter(attendance_date__lte=date_to)
+    return KeysetPaginator(history, ('-attendance_date',), ATTENDANCE_HISTORY_PAGE_SIZE).get_page(cursor)
+@login_required
+@conditional_on_scope(student_scope)
+def student_detail(request, pk):
+    student = get_object_or_404(Student, pk=pk)
+    if not can_view_student(request.user, student):
+        messages.error(request, 'У вас нет доступа к информации об этом ребенке!')
+        return redirect('home')
     parents = StudentParent.objects.filter(student=student).select_related('parent')
-    attendance = Attendance.objects.filter(student=student).order_by('-attendance_date')[:10]
+    attendance = attendance_history_page(student)
     return render(request, 'kindergarten/student_detail.html', {
         'student': student,
         'parents': parents,
         'attendance': attendance,
+        'reason_choices': Attendance._meta.get_field('reason').choices,
         'age': student.age(),
     })
 @login_required
+@conditional_on_scope(student_attendance_scope)
+def student_attendance_history(request, pk):
+    student = get_object_or_404(Student, pk=pk)
+    if not can_view_student(request.user, student):
+        return JsonResponse({'error': 'Доступ запрещен'}, status=403)
+    from .security import sanitize_date_string, sanitize_choice_field
+    status = request.GET.get('status', '')
+    reason = request.GET.get('reason')
+    try:
+        date_from = sanitize_date_string(request.GET.get('date_from'))
+        date_to = sanitize_date_string(request.GET.get('date_to'))
+        if reason is not None:
+            reason = sanitize_choice_field(reason, Attendance._meta.get_field('reason').choices)
+    except ValidationError as e:
+        return JsonResponse({'error': e.messages[0]}, status=400)
+    page = attendance_history_page(
+        student, request.GET.get('cursor'), status=status, reason=reason, date_from=date_from, date_to=date_to
+    )
+    return JsonResponse({
+        'results': [{
+            'date': row['attendance_date'].isoformat(),
+            'date_display': row['attendance_date'].strftime('%d.%m.%Y'),
+            'status': row['status'],
+            'reason': row['reason'],
+        } for row in page],
+        'next_cursor': page.next_cursor,
+        'more': page.has_next(),
+    })
+# Сколько ошибок импорта показывать на странице, полный список - в CSV
+IMPORT_ERRORS_SHOWN = 200
+@login_required
 @user_passes_test(is_director_or_superuser, login_url='home')
 def student_create(request):
     if request.method == 'POST':
@@ -148,6 +191,36 @@ def student_create(request):
     return render(request, 'kindergarten/student_form.html', {'form': form, 'title': 'Добавление ученика'})
 @login_required
 @user_passes_test(is_director_or_superuser, login_url='home')
+@pin_to_primary_after_write
+def student_import(request):
+    from .student_import import StudentImporter, read_roster
+    report = None
+    if request.method == 'POST':
+        form = StudentImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = StudentImporter().run(read_roster(upload, upload.name), dry_run=form.cleaned_data['dry_run'])
+            except ValidationError as e:
+                form.add_error('file', e)
+            else:
+                if report.errors and form.cleaned_data['errors_as_csv']:
+                    return report.errors_csv_response('student_import_errors.csv')
+                summary = (f'учеников: {report.students_created}, родителей: {report.parents_created}, '
+                           f'связей: {report.links_created}')
+                if report.dry_run:
+                    messages.info(request, f'Проверено строк: {report.rows}. Будет добавлено {summary}. Данные не сохранены')
+                else:
+                    messages.success(request, f'Добавлено {summary}')
+    else:
+        form = StudentImportForm()
+    return render(request, 'kindergarten/student_import.html', {
+        'form': form,
+        'report': report,
+        'errors': report.errors[:IMPORT_ERRORS_SHOWN] if report else [],
+    })
+@login_required
+@user_passes_test(is_director_or_superuser, login_url='home')
 def student_edit(request, pk):
     student = get_object_or_404(Student, pk=pk)
     if request.method == 'POST':
@@ -188,17 +261,14 @@ def teacher_list(request):
     
     # Annotate with groups count
     teachers = teachers.annotate(groups_count=Count('group'))
-    teachers = teachers.order_by('teacher_fio')
-    
-    paginator = Paginator(teachers, 25)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate_keyset(request, teachers, ('teacher_fio', 'pk'), 25)
     groups = Group.objects.all()
     return render(request, 'kindergarten/teacher_list.html', {
         'teachers': page_obj,
         'groups': groups,
     })
 @login_required
+@conditional_on_scope(teacher_scope)
 def teacher_detail(request, pk):
     teacher = get_object_or_404(Teacher, pk=pk)
     user_role = get_user_role(request.user)
@@ -271,7 +341,7 @@ def group_list(request):
     if teacher_filter:
         groups = groups.filter(teacher_id=teacher_filter)
     groups = groups.order_by('group_name')
-    paginator = Paginator(list(groups), 9)
+    paginator = Paginator(groups, 9)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     for group in page_obj:
@@ -285,6 +355,7 @@ def group_list(request):
         'teachers': teachers,
     })
 @login_required
+@conditional_on_scope(group_scope)
 def group_detail(request, pk):
     group = get_object_or_404(Group, pk=pk)
     user_role = get_user_role(request.user)
@@ -316,6 +387,102 @@ def group_detail(request, pk):
     })
 @login_required
 @user_passes_test(is_director_or_superuser, login_url='home')
+@pin_to_primary_after_write
+def group_rollover(request):
+    from .rollover import rollover_groups, transfer_students
+    from .school_year import current_school_year
+    from .security import sanitize_integer
+    try:
+        source_group_id = sanitize_integer(request.GET.get('source_group'), min_value=1)
+    except ValidationError:
+        source_group_id = None
+    source_group = Group.objects.filter(pk=source_group_id).first()
+    rollover_plan = transfer_plan = None
+    rollover_form = GroupRolloverForm(prefix='rollover', initial={
+        # По умолчанию отмечены группы, еще не переведенные в текущий учебный год
+        'groups': Group.objects.filter(group_year__lt=current_school_year()),
+    })
+    transfer_form = StudentTransferForm(prefix='transfer', source_group=source_group)
+    if request.method == 'POST' and request.POST.get('action') == 'rollover':
+        rollover_form = GroupRolloverForm(request.POST, prefix='rollover')
+        if rollover_form.is_valid():
+            data = rollover_form.cleaned_data
+            rollover_plan = rollover_groups(
+                [group.pk for group in data['groups']], data['to_year'],
+                graduation_date=data['graduation_date'], dry_run=data['dry_run'],
+            )
+            if rollover_plan.applied:
+                messages.success(request, f'Переведено групп: {len(rollover_plan.changes)}')
+                return redirect('group_list')
+    elif request.method == 'POST' and request.POST.get('action') == 'transfer':
+        transfer_form = StudentTransferForm(request.POST, prefix='transfer', source_group=source_group)
+        if transfer_form.is_valid():
+            data = transfer_form.cleaned_data
+            transfer_plan = transfer_students(
+                [student.pk for student in data['students']], data['target_group'].pk, dry_run=data['dry_run']
+            )
+            if transfer_plan.applied:
+                messages.success(request, f'Переведено учеников: {len(transfer_plan.changes)} в группу "{data["target_group"].group_name}"')
+                return redirect('group_detail', pk=data['target_group'].pk)
+    return render(request, 'kindergarten/group_rollover.html', {
+        'rollover_form': rollover_form,
+        'transfer_form': transfer_form,
+        'rollover_plan': rollover_plan,
+        'transfer_plan': transfer_plan,
+        'source_group': source_group,
+        'groups': Group.objects.order_by('group_name'),
+        'max_capacity': Group.MAX_STUDENTS,
+    })
+@login_required
+@user_passes_test(is_director_or_superuser, login_url='home')
+@pin_to_primary_after_write
+def school_calendar(request):
+    from .school_calendar import ensure_calendar
+    from .school_year import current_school_year, school_year_start
+    school_year = current_school_year()
+    start, end = school_year_start(school_year), school_year_start(school_year + 1) - timedelta(days=1)
+    closure_form = GroupClosureForm(prefix='closure')
+    day_form = CalendarDayForm(prefix='day')
+    if request.method == 'POST' and request.POST.get('action') == 'closure':
+        closure_form = GroupClosureForm(request.POST, prefix='closure')
+        if closure_form.is_valid():
+            closure = closure_form.save()
+            messages.success(request, f'Закрытие добавлено: {closure}')
+            return redirect('school_calendar')
+    elif request.method == 'POST' and request.POST.get('action') == 'day':
+        day_form = CalendarDayForm(request.POST, prefix='day')
+        if day_form.is_valid():
+            data = day_form.cleaned_data
+            CalendarDay.objects.update_or_create(day=data['day'], defaults={
+                'is_school_day': data['is_school_day'],
+                'note': data['note'],
+            })
+            messages.success(request, f'День {data["day"]:%d.%m.%Y} сохранен в календаре')
+            return redirect('school_calendar')
+    ensure_calendar(start, end)
+    # Отличия от обычной недели: нерабочие будни, рабочие выходные и дни с примечанием
+    special_days = CalendarDay.objects.filter(day__range=(start, end)).filter(
+        Q(is_school_day=False, day__week_day__in=[2, 3, 4, 5, 6]) | Q(is_school_day=True, day__week_day__in=[1, 7]) | ~Q(note='')
+    )
+    return render(request, 'kindergarten/school_calendar.html', {
+        'closure_form': closure_form,
+        'day_form': day_form,
+        'closures': GroupClosure.objects.filter(date_to__gte=start).select_related('group').order_by('date_from'),
+        'special_days': special_days,
+        'school_year': f'{school_year}/{school_year + 1}',
+        'school_days_count': CalendarDay.objects.filter(day__range=(start, end), is_school_day=True).count(),
+    })
+@login_required
+@user_passes_test(is_director_or_superuser, login_url='home')
+@pin_to_primary_after_write
+def closure_delete(request, pk):
+    closure = get_object_or_404(GroupClosure, pk=pk)
+    if request.method == 'POST':
+        closure.delete()
+        messages.success(request, f'Закрытие удалено: {closure}')
+    return redirect('school_calendar')
+@login_required
+@user_passes_test(is_director_or_superuser, login_url='home')
 def group_create(request):
     if request.method == 'POST':
         form = GroupForm(request.POST)
@@ -348,7 +515,8 @@ def group_edit(request, pk):
 def group_delete(request, pk):
     group = get_object_or_404(Group, pk=pk)
     if request.method == 'POST':
-        if group.current_students_count() > 0:
+        # Выпускников тоже учитываем: при удалении группы их история осталась бы без группы
+        if group.student_set.exists():
             messages.error(request, f'Нельзя удалить группу с учениками! Сначала переведите учеников в другие группы.')
             return redirect('group_detail', pk=group.pk)
         group_name = group.group_name
@@ -373,10 +541,8 @@ def parent_list(request):
     if group_filter:
         students_in_group = Student.objects.filter(group_id=group_filter)
         parents = parents.filter(studentparent__student__in=students_in_group).distinct()
-    parents = parents.order_by('parent_fio').prefetch_related('studentparent_set__student')
-    paginator = Paginator(parents, 25)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    parents = parents.prefetch_related('studentparent_set__student')
+    page_obj = paginate_keyset(request, parents, ('parent_fio', 'pk'), 25)
     groups = get_teacher_groups(request.user) if user_role == 'teacher' else Group.objects.all()
     return render(request, 'kindergarten/parent_list.html', {
         'parents': page_obj,
@@ -384,6 +550,7 @@ def parent_list(request):
         'search_query': search_query,
     })
 @login_required
+@conditional_on_scope(parent_scope)
 def parent_detail(request, pk):
     parent = get_object_or_404(Parent, pk=pk)
     user_role = get_user_role(request.user)
@@ -597,6 +764,7 @@ def attendance_list(request):
     })
 @login_required
 @role_required('teacher', 'director')
+@pin_to_primary_after_write
 def attendance_mark_bulk(request):
     if request.method == 'POST':
         date_str = request.POST.get('date')
@@ -632,6 +800,43 @@ def attendance_mark_bulk(request):
 
 @login_required
 @role_required('teacher', 'director')
+@pin_to_primary_after_write
+def attendance_import(request):
+    from .attendance_import import AttendanceImporter, read_register
+    report = None
+    if request.method == 'POST':
+        form = AttendanceImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            # Воспитатель загружает отметки только своих групп
+            if get_user_role(request.user) == 'teacher':
+                students = Student.objects.filter(group__in=get_teacher_groups(request.user))
+            else:
+                students = Student.objects.all()
+            noted_by = Teacher.objects.filter(user=request.user).first()
+            try:
+                report = AttendanceImporter(students, noted_by=noted_by).run(
+                    read_register(upload, upload.name), dry_run=form.cleaned_data['dry_run']
+                )
+            except ValidationError as e:
+                form.add_error('file', e)
+            else:
+                if report.errors and form.cleaned_data['errors_as_csv']:
+                    return report.errors_csv_response('attendance_import_errors.csv')
+                if report.dry_run:
+                    messages.info(request, f'Проверено строк: {report.rows}, без ошибок: {report.imported}. Данные не сохранены')
+                else:
+                    messages.success(request, f'Загружено отметок: {report.imported} из {report.rows}')
+    else:
+        form = AttendanceImportForm()
+    return render(request, 'kindergarten/attendance_import.html', {
+        'form': form,
+        'report': report,
+        'errors': report.errors[:IMPORT_ERRORS_SHOWN] if report else [],
+    })
+@login_required
+@role_required('teacher', 'director')
+@pin_to_primary_after_write
 def attendance_update(request, pk):
     if request.method == 'POST':
         attendance = get_object_or_404(Attendance, pk=pk)
@@ -645,6 +850,7 @@ def attendance_update(request, pk):
 
 @login_required
 @role_required('teacher', 'director')
+@pin_to_primary_after_write
 def attendance_create(request):
     if request.method == 'POST':
         form = AttendanceForm(request.POST)
@@ -658,6 +864,7 @@ def attendance_create(request):
 
 @login_required
 @role_required('teacher', 'director')
+@pin_to_primary_after_write
 def attendance_edit(request, pk):
     attendance = get_object_or_404(Attendance, pk=pk)
     if request.method == 'POST':
@@ -672,6 +879,7 @@ def attendance_edit(request, pk):
 
 @login_required
 @role_required('teacher', 'director')
+@pin_to_primary_after_write
 def attendance_delete(request, pk):
     attendance = get_object_or_404(Attendance, pk=pk)
     if request.method == 'POST':
@@ -685,6 +893,8 @@ def reports(request):
     return render(request, 'kindergarten/reports.html')
 
 @login_required
+@use_report_replica
+@conditional_on_scope(school_scope)
 def generate_report(request, report_type):
     from datetime import datetime
     if report_type == 'students_csv':
@@ -706,7 +916,7 @@ def generate_report(request, report_type):
                 'Активен' if student.is_active() else 'Выпущен',
             ])
         return response
-    elif report_type == 'attendance_month':
+    elif report_type in ('attendance_month', 'attendance_month_pdf'):
         today = date.today()
         month = int(request.GET.get('month', today.month))
         year = int(request.GET.get('year', today.year))
@@ -733,6 +943,11 @@ def generate_report(request, report_type):
             'month_number': month,
             'year': year,
         }
+        if report_type == 'attendance_month_pdf':
+            from .reports_utils import attendance_month_pdf
+            response = HttpResponse(attendance_month_pdf(context), content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="attendance_report_{month}_{year}.pdf"'
+            return response
         return render(request, 'kindergarten/report_attendance.html', context)
     return redirect('reports')
 
@@ -754,18 +969,31 @@ def search(request):
         'parents': parents,
     })
 
-def api_stats(request):
-    today = date.today()
+def api_stats_queries(today):
+    week_start = today - timedelta(days=6)
+    return {
+        'total_students': lambda: Student.objects.filter(student_date_out__isnull=True).count(),
+        'total_teachers': lambda: Teacher.objects.count(),
+        'total_groups': lambda: Group.objects.count(),
+        'total_parents': lambda: Parent.objects.count(),
+        'today': lambda: Attendance.objects.filter(attendance_date=today).aggregate(
+            present=Count('pk', filter=Q(status=True)),
+            absent=Count('pk', filter=Q(status=False))
+        ),
+        'groups': lambda: list(Group.objects.all()),
+        'week': lambda: time_series('attendance', Attendance.objects.all(), 'day', week_start, today),
+    }
+def build_api_stats(today, results):
     stats = {
-        'total_students': Student.objects.filter(student_date_out__isnull=True).count(),
-        'total_teachers': Teacher.objects.count(),
-        'total_groups': Group.objects.count(),
-        'total_parents': Parent.objects.count(),
-        'attendance_today': Attendance.objects.filter(attendance_date=today, status=True).count(),
-        'absent_today': Attendance.objects.filter(attendance_date=today, status=False).count(),
+        'total_students': results['total_students'],
+        'total_teachers': results['total_teachers'],
+        'total_groups': results['total_groups'],
+        'total_parents': results['total_parents'],
+        'attendance_today': results['today']['present'],
+        'absent_today': results['today']['absent'],
     }
     groups_stats = []
-    for group in Group.objects.all():
+    for group in results['groups']:
         groups_stats.append({
             'name': group.group_name,
             'students_count': group.current_students_count(),
@@ -774,18 +1002,38 @@ def api_stats(request):
             'category': group.group_category,
         })
     stats['groups_stats'] = groups_stats
-    attendance_data = []
-    attendance_labels = []
-    for i in range(7):
-        day = today - timedelta(days=i)
-        present = Attendance.objects.filter(attendance_date=day, status=True).count()
-        absent = Attendance.objects.filter(attendance_date=day, status=False).count()
-        total = present + absent
-        attendance_labels.append(day.strftime('%d.%m'))
-        if total > 0:
-            attendance_data.append(round((present / total) * 100, 1))
-        else:
-            attendance_data.append(0)
-    stats['attendance_data'] = list(reversed(attendance_data))
-    stats['attendance_labels'] = list(reversed(attendance_labels))
-    return JsonResponse(stats)
\ No newline at end of file
+    stats['attendance_data'] = results['week']['percentage']
+    stats['attendance_labels'] = results['week']['labels']
+    return stats
+@use_report_replica
+@conditional_on_scope(stats_scope)
+async def api_stats(request):
+    today = date.today()
+    return JsonResponse(build_api_stats(today, await gather_queries(api_stats_queries(today))))
+@login_required
+def api_db_pool_stats(request):
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Доступ запрещен'}, status=403)
+    from .db_pool import pool_stats
+    return JsonResponse(pool_stats())
+@login_required
+@use_report_replica
+def api_export(request, dataset):
+    """Выгрузка посещаемости, учеников или групп в NDJSON для внешней аналитики (см. exports.py)."""
+    if get_user_role(request.user) not in ('superuser', 'director'):
+        return JsonResponse({'error': 'Доступ запрещен'}, status=403)
+    if dataset not in DATASETS:
+        return JsonResponse({'error': f'Неизвестный набор данных: {dataset}'}, status=404)
+    try:
+        filters, after = export_params(dataset, request.GET)
+    except ValidationError as e:
+        return JsonResponse({'error': e.messages[0]}, status=400)
+    queryset = export_queryset(dataset, filters)
+    # Поток читается уже после выхода из use_report_replica: БД (реплику или БД сада) выбираем сейчас
+    queryset = queryset.using(queryset.db)
+    stream = aexport_lines if isinstance(request, ASGIRequest) else export_lines
+    return StreamingHttpResponse(
+        stream(dataset, queryset, filters, after),
+        content_type='application/x-ndjson; charset=utf-8',
+        headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'},
+    )
@@ -4,7 +4,7 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.contrib.auth.models import User, Group
-from .models import Teacher, Parent
+from .models import KindergartenMember, Teacher, Parent
 def login_view(request):
     if request.user.is_authenticated:
         return redirect('home')
@@ -61,6 +61,9 @@ def register_view(request):
                     parent_number=request.POST.get('phone', '')
                 )
                 messages.success(request, 'Вы зарегистрированы как родитель!')
+            # Воспитателя и родителя в сад записывает привязка профиля, заведующего без профиля - здесь,
+            # иначе TenantMiddleware разлогинит его на следующем запросе
+            KindergartenMember.objects.get_or_create(user=user)
             login(request, user)
             return redirect('home')
     else:
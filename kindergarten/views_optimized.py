@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.db.models import Count, Q, Prefetch
 from datetime import date
 from .models import Student, Teacher, Group, Parent, Attendance, StudentParent
+from .timeseries import time_series
 @login_required
 def home_optimized(request):
     today = date.today()
@@ -112,16 +113,8 @@ def student_list_optimized(request):
         groups = Group.objects.all()
     else:
         groups = Group.objects.none()
-    students = students.order_by('student_fio')
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-    paginator = Paginator(students, 25)
-    page_number = request.GET.get('page')
-    try:
-        page_obj = paginator.get_page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.get_page(1)
-    except EmptyPage:
-        page_obj = paginator.get_page(paginator.num_pages)
+    from .pagination import paginate_keyset
+    page_obj = paginate_keyset(request, students, ('student_fio', 'pk'), 25)
     return render(request, 'kindergarten/student_list.html', {
         'students': page_obj,
         'groups': groups,
@@ -144,9 +137,7 @@ def api_stats_optimized(request):
         'attendance_today': attendance_stats['present'] or 0,
         'absent_today': attendance_stats['absent'] or 0,
     }
-    groups = Group.objects.select_related('teacher').annotate(
-        students_count=Count('student', filter=Q(student__student_date_out__isnull=True))
-    )
+    groups = Group.objects.select_related('teacher')
     groups_stats = []
     for group in groups:
         groups_stats.append({
@@ -157,31 +148,7 @@ def api_stats_optimized(request):
             'category': group.group_category,
         })
     stats['groups_stats'] = groups_stats
-    seven_days_ago = today - timedelta(days=6)
-    attendance_records = Attendance.objects.filter(
-        attendance_date__gte=seven_days_ago,
-        attendance_date__lte=today
-    ).values('attendance_date', 'status').annotate(count=Count('pk'))
-    attendance_by_date = {}
-    for record in attendance_records:
-        date_key = record['attendance_date']
-        if date_key not in attendance_by_date:
-            attendance_by_date[date_key] = {'present': 0, 'absent': 0}
-        if record['status']:
-            attendance_by_date[date_key]['present'] = record['count']
-        else:
-            attendance_by_date[date_key]['absent'] = record['count']
-    attendance_data = []
-    attendance_labels = []
-    for i in range(7):
-        day = today - timedelta(days=6-i)
-        day_stats = attendance_by_date.get(day, {'present': 0, 'absent': 0})
-        total = day_stats['present'] + day_stats['absent']
-        attendance_labels.append(day.strftime('%d.%m'))
-        if total > 0:
-            attendance_data.append(round((day_stats['present'] / total) * 100, 1))
-        else:
-            attendance_data.append(0)
-    stats['attendance_data'] = attendance_data
-    stats['attendance_labels'] = attendance_labels
+    week = time_series('attendance', Attendance.objects.all(), 'day', today - timedelta(days=6), today)
+    stats['attendance_data'] = week['percentage']
+    stats['attendance_labels'] = week['labels']
     return JsonResponse(stats)
@@ -0,0 +1,38 @@
+from django import forms
+from django.urls import reverse
+class AutocompleteSelect(forms.Select):
+    """Select, который рендерит только выбранное значение, а варианты подгружает с autocomplete-эндпоинта."""
+    def __init__(self, url_name, attrs=None, placeholder='Начните вводить...', min_chars=1, forward=None):
+        self.url_name = url_name
+        self.placeholder = placeholder
+        self.min_chars = min_chars
+        self.forward = forward or []
+        super().__init__(attrs=attrs)
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs=extra_attrs)
+        attrs.setdefault('class', 'form-control')
+        attrs['data-autocomplete-url'] = reverse(self.url_name)
+        attrs['data-placeholder'] = self.placeholder
+        attrs['data-min-chars'] = self.min_chars
+        if self.forward:
+            attrs['data-forward'] = ','.join(self.forward)
+        return attrs
+    def optgroups(self, name, value, attrs=None):
+        # Вместо перебора всего queryset достаем только выбранные записи по первичному ключу
+        field = getattr(self.choices, 'field', None)
+        empty_values = field.empty_values if field is not None else [None, '']
+        selected = [str(v) for v in value if v not in empty_values and str(v) != '']
+        options = []
+        if not self.is_required or not selected:
+            options.append(self.create_option(name, '', '---------', not selected, 0))
+        if selected and field is not None:
+            key = field.to_field_name or 'pk'
+            try:
+                objects = list(field.queryset.filter(**{f'{key}__in': selected}))
+            except (ValueError, TypeError):
+                objects = []
+            for index, obj in enumerate(objects, start=len(options)):
+                options.append(self.create_option(
+                    name, getattr(obj, key), field.label_from_instance(obj), True, index, attrs=attrs
+                ))
+        return [(None, options, 0)]
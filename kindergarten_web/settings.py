@@ -46,23 +46,38 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Сжимает HTML и JSON; ответы StaticAssetMiddleware уже сжаты заранее и пропускаются
+    'django.middleware.gzip.GZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'kindergarten.middleware.StaticAssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'kindergarten.middleware.SessionRefreshMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # Детский сад запроса (по домену): выборки моделей ограничиваются им, запросы идут в его БД
+    'kindergarten.middleware.TenantMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'kindergarten_web.urls'
 
+# Профиль шаблонов: в разработке шаблоны перечитываются с диска, в production
+# разобранные шаблоны держит cached loader (большие отчеты не парсятся на каждый запрос)
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -88,9 +103,60 @@ DATABASES = {
         'PASSWORD': os.getenv('DATABASE_PASSWORD', 'password'),
         'HOST': os.getenv('DATABASE_HOST', 'localhost'),
         'PORT': os.getenv('DATABASE_PORT', '5434'),
+        # Постоянные соединения: переиспользуются между запросами, проверяются перед использованием
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DATABASE_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'OPTIONS': {},
     }
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    # Пул соединений psycopg 3 (psycopg[pool]); несовместим с CONN_MAX_AGE, поэтому заменяет его
+    if os.getenv('DATABASE_POOL', 'False') == 'True':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', '10')),
+        }
+    # pgbouncer в режиме transaction не сохраняет серверные курсоры между транзакциями
+    if os.getenv('DATABASE_PGBOUNCER', 'False') == 'True':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Реплика для отчетов и выгрузок (только чтение). Для локальной проверки можно указать второй файл SQLite
+if os.getenv('DATABASE_REPLICA_HOST') or os.getenv('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DATABASE_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DATABASE_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DATABASE_REPLICA_PORT', DATABASES['default']['PORT']),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+# Отдельные БД крупных садов: TENANT_DATABASES=sad_1,sad_2; параметры берутся из default, имя БД и хост -
+# из DATABASE_NAME_<ПСЕВДОНИМ> и DATABASE_HOST_<ПСЕВДОНИМ>. Сад переносится в БД полем Kindergarten.database,
+# таблицы создаются командой manage.py migrate --database=<псевдоним>
+for alias in filter(None, os.getenv('TENANT_DATABASES', '').split(',')):
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.getenv(f'DATABASE_NAME_{alias.upper()}', f'kindergarten_{alias}'),
+        'HOST': os.getenv(f'DATABASE_HOST_{alias.upper()}', DATABASES['default']['HOST']),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+    }
+DATABASE_ROUTERS = ['kindergarten.db_router.TenantRouter', 'kindergarten.db_router.ReportReplicaRouter']
+# Сад для запросов с доменом, не привязанным ни к одному саду (Kindergarten.slug); если не задан,
+# такие запросы обслуживает единственный сад установки
+DEFAULT_TENANT = os.getenv('DEFAULT_TENANT', '')
+REPORTS_DATABASE = 'replica'
+# При большем отставании отчеты читают с основной БД
+REPLICA_MAX_LAG_SECONDS = int(os.getenv('REPLICA_MAX_LAG_SECONDS', '30'))
+REPLICA_LAG_CHECK_INTERVAL = 5
+# Сколько секунд после отметки посещаемости отчеты пользователя читают с основной БД
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '60'))
+
+# Живые дашборды (SSE): доставка событий между процессами через PostgreSQL LISTEN/NOTIFY
+LIVE_EVENTS_PG_NOTIFY = os.getenv('LIVE_EVENTS_PG_NOTIFY', 'False') == 'True'
+
 # Authentication
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
@@ -100,9 +166,29 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
+# Cache
+# По умолчанию локальная память процесса; для нескольких воркеров можно указать файловый кэш:
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/var/tmp/kindergarten_cache
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'kindergarten'),
+    }
+}
+# Входит в ETag страниц: смените при выкладке новой версии, чтобы браузеры не получали 304 со старой разметкой
+RELEASE_VERSION = os.getenv('RELEASE_VERSION', '')
+# Фрагмент навигации в base.html кэшируется по роли; смена роли пользователя сбрасывает кэш его роли
+NAVIGATION_CACHE_SECONDS = int(os.getenv('NAVIGATION_CACHE_SECONDS', '3600'))
+
 # Session settings
+# cached_db читает сессию из кэша и пишет в БД только при изменении;
+# django.contrib.sessions.backends.signed_cookies хранит сессию в подписанной cookie без обращений к БД
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
 SESSION_COOKIE_AGE = 1209600  # 2 weeks
-SESSION_SAVE_EVERY_REQUEST = True
+# Срок сессии продлевает SessionRefreshMiddleware, когда до истечения остается меньше порога,
+# то есть не чаще раза в сутки вместо записи на каждом запросе
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_THRESHOLD = int(os.getenv('SESSION_REFRESH_THRESHOLD', SESSION_COOKIE_AGE - 86400))
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = False  # Отключено для локальной работы
 SESSION_COOKIE_SAMESITE = 'Lax'
@@ -147,6 +233,11 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
 ]
+# Процессы для хеширования паролей при массовом создании учетных записей (0 - по числу ядер)
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '0'))
+# Выгрузка NDJSON отдает только строки старше этого числа секунд: больше самой долгой пишущей транзакции
+# (импорт посещаемости) и допустимого отставания реплики, иначе инкрементальный курсор их пропустит
+EXPORT_SETTLE_SECONDS = int(os.getenv('EXPORT_SETTLE_SECONDS', '300'))
 
 
 # Internationalization
@@ -172,6 +263,17 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'kindergarten/static'),
 ]
 
+# Bootstrap, иконки и Chart.js лежат в kindergarten/static/vendor (manage.py fetch_static_vendor),
+# collectstatic добавляет хеш содержимого в имена и готовит .gz/.br копии
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'kindergarten.storage.PrecompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 